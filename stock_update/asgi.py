@@ -13,4 +13,10 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'stock_update.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up; serves the streaming tick-ingestion
+# routes natively and hands every other request to Django.
+from stocks.ticks import TickRouter  # noqa: E402
+
+application = TickRouter(django_application)
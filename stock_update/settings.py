@@ -86,6 +86,23 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# Rendered portfolio reports are cached here. Use a shared backend (Redis,
+# Memcached, database) in production so concurrent report renders are
+# coalesced across workers rather than per process.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Seconds a rendered report stays cached. The cache key already changes
+# whenever the portfolio's trades change, so this only bounds memory use.
+STOCKS_REPORT_CACHE_TIMEOUT = 60 * 60
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -122,6 +139,48 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Published report snapshots (immutable, content-addressed HTML plus .gz/.br
+# variants). In production point the reverse proxy at this directory, or add
+# it to WhiteNoise, and serve it with far-future cache headers; the dev
+# server serves it when DEBUG is on.
+STOCKS_SNAPSHOT_ROOT = BASE_DIR / 'snapshots'
+STOCKS_SNAPSHOT_URL = '/snapshots/'
+
+# How ledger fills book realised profit/loss: 'average' cost or 'fifo' lots
+STOCKS_POSITION_COST_METHOD = 'average'
+
+# Streaming price ticks (ASGI only): seconds between batched ltp writes,
+# how many distinct symbols may wait for a flush before ingest backs off,
+# and failed attempts after which a flush batch is dropped
+STOCKS_TICK_FLUSH_INTERVAL = 0.5
+STOCKS_TICK_MAX_PENDING = 50000
+STOCKS_TICK_MAX_FLUSH_ATTEMPTS = 3
+
+# Price history day blocks (and minute-of-day offsets) use exchange time
+STOCKS_HISTORY_TIMEZONE = 'Asia/Kolkata'
+
+# Length of the rolling window behind wk_52_high / wk_52_low
+STOCKS_EXTREMES_WINDOW_WEEKS = 52
+
+# Portfolio event streams: channel class carrying events between workers
+# (LocalChannel delivers in-process only), events kept per portfolio for
+# Last-Event-ID resume, seconds between keep-alive comments, and seconds
+# each change read looks back for rows committed late (longer than any
+# write transaction should take)
+STOCKS_EVENTS_CHANNEL = 'stocks.events.LocalChannel'
+STOCKS_EVENTS_BUFFER_SIZE = 100
+STOCKS_EVENTS_HEARTBEAT = 15
+STOCKS_EVENTS_WATERMARK_MARGIN = 5
+
+# List endpoints page by cursor; default rows per page and the most a
+# client may ask for with ?page_size=
+STOCKS_PAGE_SIZE = 100
+STOCKS_MAX_PAGE_SIZE = 1000
+
+# Most symbols / names one by_symbol?symbols= or by_name?names= call may
+# resolve; the lookup is a single IN query
+STOCKS_MAX_LOOKUP_KEYS = 500
+
 # Custom User Model
 AUTH_USER_MODEL = 'authentication.User'
 
@@ -136,10 +195,15 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
+        'stocks.parsers.MessagePackParser',
     ],
+    # Same JSON bytes as rest_framework.renderers.JSONRenderer, faster;
+    # MessagePack on request (Accept: application/msgpack or ?format=msgpack)
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'stocks.renderers.ORJSONRenderer',
+        'stocks.renderers.MessagePackRenderer',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'stocks.pagination.KeysetPagination',
 }
 
 # CORS settings - Allow all origins for development
@@ -14,6 +14,8 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 
@@ -22,3 +24,6 @@ urlpatterns = [
     path('api/auth/', include('authentication.urls')),
     path('api/stocks/', include('stocks.urls')),
 ]
+
+# Report snapshots are served by the reverse proxy in production.
+urlpatterns += static(settings.STOCKS_SNAPSHOT_URL, document_root=settings.STOCKS_SNAPSHOT_ROOT)
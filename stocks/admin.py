@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import StockTrade, Portfolio
+from .models import StockTrade, Portfolio, PortfolioSummary, PriceBlock, Trade
 
 
 @admin.register(StockTrade)
@@ -26,6 +26,8 @@ class StockTradeAdmin(admin.ModelAdmin):
         'percent_holding',
         'current_value',
         'realised_profit_loss',
+        'unrealised_profit_loss',
+        'total_profit_loss',
         'date_time_field',
         'created_at',
         'updated_at',
@@ -47,6 +49,8 @@ class StockTradeAdmin(admin.ModelAdmin):
                 'percent_holding',
                 'current_value',
                 'realised_profit_loss',
+                'unrealised_profit_loss',
+                'total_profit_loss',
             )
         }),
         ('52 Week Data', {
@@ -62,3 +66,53 @@ class StockTradeAdmin(admin.ModelAdmin):
 class PortfolioAdmin(admin.ModelAdmin):
     list_display = ('name', 'created_at')
     search_fields = ('name',)
+
+
+@admin.register(PortfolioSummary)
+class PortfolioSummaryAdmin(admin.ModelAdmin):
+    """Read-only view of the maintained portfolio totals"""
+    list_display = (
+        'portfolio',
+        'position_count',
+        'total_buy_value',
+        'total_sell_value',
+        'realised_profit_loss',
+        'unrealised_profit_loss',
+        'updated_at',
+    )
+    readonly_fields = (
+        'portfolio',
+        'position_count',
+        'total_buy_qty',
+        'total_buy_value',
+        'total_sell_qty',
+        'total_sell_value',
+        'realised_profit_loss',
+        'total_acquisition_cost',
+        'total_current_value',
+        'unrealised_profit_loss',
+        'updated_at',
+    )
+
+
+@admin.register(Trade)
+class TradeAdmin(admin.ModelAdmin):
+    """Trade ledger; fills are recorded through the API, not edited here"""
+    list_display = ('symbol', 'portfolio', 'side', 'quantity', 'price', 'executed_at')
+    list_filter = ('side', 'executed_at')
+    search_fields = ('symbol',)
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PriceBlock)
+class PriceBlockAdmin(admin.ModelAdmin):
+    """Daily OHLC per symbol; the packed minute bars are not shown"""
+    list_display = ('symbol', 'day', 'open', 'high', 'low', 'close', 'bar_count')
+    list_filter = ('day',)
+    search_fields = ('symbol',)
+    exclude = ('bars',)
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,282 @@
+"""
+Server-Sent Events of portfolio valuation changes.
+
+Write paths call ``broadcaster.notify`` once their transaction commits (the
+valuation engine does after every revaluation). For each portfolio with
+listeners the broadcaster loads the positions updated since its last
+event, serializes them once with the trade API serializer, together with
+the portfolio summary, and fans the event out to every listener. Idle
+streams cost nothing: there is no polling, only a keep-alive comment.
+
+Events travel through a channel (``STOCKS_EVENTS_CHANNEL``). ``LocalChannel``
+delivers inside the process and is the stand-in for a shared pub/sub
+backend with the same ``publish`` / ``subscribe`` interface when several
+workers serve streams.
+
+The last ``STOCKS_EVENTS_BUFFER_SIZE`` events per portfolio are kept so a
+client reconnecting with ``Last-Event-ID`` receives what it missed; when
+that is not possible (unknown id, or a different process) it starts again
+from a snapshot of the whole portfolio.
+"""
+import asyncio
+import queue
+import secrets
+import threading
+from collections import defaultdict, deque
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .models import PortfolioSummary, StockTrade
+from .renderers import ORJSONRenderer
+from .serializers import PortfolioSummarySerializer, StockTradeSerializer
+
+EVENTS_CHANNEL = getattr(settings, 'STOCKS_EVENTS_CHANNEL', 'stocks.events.LocalChannel')
+EVENTS_BUFFER_SIZE = getattr(settings, 'STOCKS_EVENTS_BUFFER_SIZE', 100)
+# Seconds between keep-alive comments on an idle stream
+EVENTS_HEARTBEAT = getattr(settings, 'STOCKS_EVENTS_HEARTBEAT', 15)
+# Client reconnection delay sent in the stream's ``retry:`` field (ms)
+EVENTS_RETRY_MS = 3000
+# updated_at is stamped when a row is written, not when its transaction
+# commits, so each read looks back this far behind the last event
+EVENTS_WATERMARK_MARGIN = timedelta(seconds=getattr(settings, 'STOCKS_EVENTS_WATERMARK_MARGIN', 5))
+
+_HEARTBEAT = b': keep-alive\n\n'
+_CLOSE = object()
+
+
+class LocalChannel:
+    """In-process channel: ``publish`` calls every subscribed handler directly"""
+    is_local = True
+
+    def __init__(self):
+        self._handlers = []
+
+    def subscribe(self, handler):
+        self._handlers.append(handler)
+
+    def publish(self, message):
+        for handler in self._handlers:
+            handler(message)
+
+
+class _Subscription:
+    """One stream's queue of encoded events, bounded by the replay buffer"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.pending = 0
+
+    def put(self, event):
+        self.pending += 1
+        if self.pending > self.limit:
+            # Too far behind; end the stream so the client resumes from
+            # Last-Event-ID or a fresh snapshot.
+            self._put(_CLOSE)
+        else:
+            self._put(event)
+
+    def taken(self):
+        self.pending -= 1
+
+
+class _ThreadSubscription(_Subscription):
+    def __init__(self, limit):
+        super().__init__(limit)
+        self.queue = queue.SimpleQueue()
+
+    def _put(self, item):
+        self.queue.put(item)
+
+    def get(self, timeout):
+        try:
+            item = self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return _HEARTBEAT
+        self.taken()
+        return item
+
+
+class _AsyncSubscription(_Subscription):
+    def __init__(self, limit):
+        super().__init__(limit)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    def _put(self, item):
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, item)
+        except RuntimeError:
+            # The stream's event loop has already shut down
+            pass
+
+    async def get(self, timeout):
+        try:
+            item = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return _HEARTBEAT
+        self.taken()
+        return item
+
+
+def encode_event(event_id, name, data):
+    """Encode one SSE message; ``data`` is compact JSON (no newlines)"""
+    return b'id: %s\nevent: %s\ndata: %s\n\n' % (event_id.encode(), name.encode(), data)
+
+
+class Broadcaster:
+    """Fans portfolio change events out to the streams subscribed to them"""
+
+    def __init__(self, channel=None, buffer_size=EVENTS_BUFFER_SIZE):
+        # Event ids are "<token>-<sequence>"; the token identifies this
+        # process so ids from another worker or a restart force a snapshot.
+        self.token = secrets.token_hex(4)
+        self.buffer_size = buffer_size
+        self.channel = channel or import_string(EVENTS_CHANNEL)()
+        self.channel.subscribe(self._fan_out)
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._subscribers = defaultdict(set)
+        self._buffers = defaultdict(lambda: deque(maxlen=buffer_size))
+        self._watermarks = {}
+
+    def notify(self, portfolio_ids, removed=None):
+        """
+        Publish the positions of ``portfolio_ids`` updated since their last
+        event, plus ``removed`` ``{portfolio_id: [position ids]}``.
+        """
+        removed = removed or {}
+        for portfolio_id in set(portfolio_ids) | set(removed):
+            if self.channel.is_local and not self._subscribers.get(portfolio_id):
+                # Nobody is listening here; the next stream starts from a snapshot.
+                self._watermarks.pop(portfolio_id, None)
+                continue
+            data = self._changes(portfolio_id, removed.get(portfolio_id, ()))
+            if data is not None:
+                self.channel.publish({'portfolio_id': portfolio_id, 'event': 'positions', 'data': data})
+
+    def notify_on_commit(self, portfolio_ids, removed=None, using=None):
+        transaction.on_commit(lambda: self.notify(portfolio_ids, removed), using=using)
+
+    def stream(self, portfolio_id, last_event_id=None, heartbeat=EVENTS_HEARTBEAT):
+        """Yield SSE bytes for ``portfolio_id`` until the client goes away (WSGI)"""
+        subscription = _ThreadSubscription(self.buffer_size)
+        missed = self._subscribe(portfolio_id, subscription, last_event_id)
+        try:
+            yield b'retry: %d\n\n' % EVENTS_RETRY_MS
+            yield from missed if missed is not None else [self._snapshot(portfolio_id)]
+            while True:
+                item = subscription.get(heartbeat)
+                if item is _CLOSE:
+                    return
+                yield item
+        finally:
+            self._unsubscribe(portfolio_id, subscription)
+
+    async def astream(self, portfolio_id, last_event_id=None, heartbeat=EVENTS_HEARTBEAT):
+        """Async twin of ``stream`` for ASGI servers"""
+        subscription = _AsyncSubscription(self.buffer_size)
+        missed = self._subscribe(portfolio_id, subscription, last_event_id)
+        try:
+            yield b'retry: %d\n\n' % EVENTS_RETRY_MS
+            if missed is None:
+                missed = [await sync_to_async(self._snapshot)(portfolio_id)]
+            for item in missed:
+                yield item
+            while True:
+                item = await subscription.get(heartbeat)
+                if item is _CLOSE:
+                    return
+                yield item
+        finally:
+            self._unsubscribe(portfolio_id, subscription)
+
+    def _subscribe(self, portfolio_id, subscription, last_event_id):
+        """Register a stream; return the buffered events after ``last_event_id``, or None"""
+        with self._lock:
+            self._subscribers[portfolio_id].add(subscription)
+            token, _, sequence = (last_event_id or '').partition('-')
+            if token != self.token or not sequence.isdigit():
+                return None
+            sequence = int(sequence)
+            buffer = self._buffers[portfolio_id]
+            # Sequences are shared by all portfolios, so a full buffer that
+            # starts after ``sequence`` may have evicted events for this one
+            if len(buffer) == buffer.maxlen and buffer[0][0] > sequence:
+                return None
+            return [event for number, event in buffer if number > sequence]
+
+    def _unsubscribe(self, portfolio_id, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(portfolio_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[portfolio_id]
+
+    def _fan_out(self, message):
+        portfolio_id = message['portfolio_id']
+        with self._lock:
+            self._sequence += 1
+            event = encode_event(f'{self.token}-{self._sequence}', message['event'], message['data'])
+            self._buffers[portfolio_id].append((self._sequence, event))
+            subscribers = list(self._subscribers.get(portfolio_id, ()))
+        for subscription in subscribers:
+            subscription.put(event)
+
+    def _changes(self, portfolio_id, removed):
+        """Encoded payload of the positions changed since the last event, or None"""
+        positions = StockTrade.objects.filter(portfolio_id=portfolio_id)
+        since, sent = self._watermarks.get(portfolio_id, (None, {}))
+        if since is not None:
+            # A transaction that committed after the last event may hold rows
+            # stamped before it, so re-read a margin behind and skip the row
+            # versions already sent.
+            positions = positions.filter(updated_at__gte=since - EVENTS_WATERMARK_MARGIN)
+        rows = [
+            row for row in positions.select_related('portfolio').order_by('updated_at', 'id')
+            if sent.get(row.id) != row.updated_at
+        ]
+        if not rows and not removed:
+            return None
+        if rows:
+            self._watermarks[portfolio_id] = self._advance(since, sent, rows)
+        return self._payload(portfolio_id, rows, removed)
+
+    def _advance(self, since, sent, rows):
+        """New ``(watermark, {id: updated_at sent})`` after sending ``rows``"""
+        latest = rows[-1].updated_at if since is None else max(since, rows[-1].updated_at)
+        floor = latest - EVENTS_WATERMARK_MARGIN
+        sent = {pk: updated_at for pk, updated_at in sent.items() if updated_at >= floor}
+        sent.update((row.id, row.updated_at) for row in rows if row.updated_at >= floor)
+        return latest, sent
+
+    def _snapshot(self, portfolio_id):
+        """Encoded snapshot event of every position in the portfolio"""
+        rows = list(
+            StockTrade.objects.filter(portfolio_id=portfolio_id)
+            .select_related('portfolio')
+            .order_by('symbol')
+        )
+        with self._lock:
+            if rows:
+                self._watermarks.setdefault(
+                    portfolio_id, self._advance(None, {}, sorted(rows, key=lambda row: row.updated_at))
+                )
+            event_id = f'{self.token}-{self._sequence}'
+        return encode_event(event_id, 'snapshot', self._payload(portfolio_id, rows, ()))
+
+    def _payload(self, portfolio_id, rows, removed):
+        summary = PortfolioSummary.objects.filter(portfolio_id=portfolio_id).first()
+        return ORJSONRenderer().render({
+            'portfolio_id': portfolio_id,
+            'positions': StockTradeSerializer(rows, many=True).data,
+            'removed': list(removed),
+            'summary': PortfolioSummarySerializer(summary).data if summary else None,
+        })
+
+
+broadcaster = Broadcaster()
@@ -0,0 +1,97 @@
+"""
+Row encoders for the bulk trade export.
+
+Rows come straight from ``values_list(*EXPORT_FIELDS).iterator()`` and are
+encoded to bytes in chunks, without model instances or DRF serializers, so
+memory use stays constant regardless of table size.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+
+EXPORT_FIELDS = (
+    'id',
+    'portfolio_id',
+    'symbol',
+    'total_buy_qty',
+    'buy_price',
+    'total_buy_value',
+    'total_sell_qty',
+    'sell_price',
+    'total_sell_value',
+    'balance_qty',
+    'ltp',
+    'acquisition_cost',
+    'percent_holding',
+    'current_value',
+    'realised_profit_loss',
+    'unrealised_profit_loss',
+    'total_profit_loss',
+    'wk_52_high',
+    'wk_52_low',
+    'date_time_field',
+    'created_at',
+    'updated_at',
+)
+
+# Rows encoded per yielded chunk (and fetched per database round trip).
+EXPORT_CHUNK_SIZE = 2000
+
+_DATETIME_COLUMNS = tuple(
+    index for index, field in enumerate(EXPORT_FIELDS) if field in ('created_at', 'updated_at')
+)
+
+
+def _isoformat_datetimes(row):
+    row = list(row)
+    for index in _DATETIME_COLUMNS:
+        if row[index] is not None:
+            row[index] = row[index].isoformat()
+    return row
+
+
+def iter_csv(rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """Encode ``rows`` as CSV with a header line, yielding bytes chunks"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(_isoformat_datetimes(row))
+        if count % chunk_size == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode('utf-8')
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def iter_ndjson(rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """Encode ``rows`` as newline-delimited JSON objects, yielding bytes chunks"""
+    encode = json.JSONEncoder(
+        separators=(',', ':'),
+        ensure_ascii=False,
+        default=_json_default,
+    ).encode
+    lines = []
+
+    for row in rows:
+        lines.append(encode(dict(zip(EXPORT_FIELDS, row))))
+        if len(lines) >= chunk_size:
+            lines.append('')
+            yield '\n'.join(lines).encode('utf-8')
+            lines = []
+
+    if lines:
+        lines.append('')
+        yield '\n'.join(lines).encode('utf-8')
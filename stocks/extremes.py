@@ -0,0 +1,271 @@
+"""
+Rolling 52-week high/low for every symbol with price history.
+
+Each symbol keeps a ``RollingExtremes`` window over its daily highs and
+lows (the ``PriceBlock`` day columns). The window holds two monotonic
+deques, so a new day is folded in with amortized O(1) work instead of
+rescanning a year of bars, and the current extremes are the deque heads.
+
+``refresh_extremes`` runs after minute bars are written and pushes the
+new values into ``StockTrade.wk_52_high`` / ``wk_52_low``, from where the
+report and the trade API read them. Until a symbol's stored history spans
+the whole window the bars only widen the stored values, which may have
+been entered by hand from a longer history. ``backfill_extremes``
+recomputes every symbol from the stored history in one vectorized pass,
+with the same rule for short histories.
+"""
+import threading
+from collections import deque
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, Min, When
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+
+from .events import broadcaster
+from .models import PRICE_UPDATE_CHUNK_SIZE, CaseMapping, PriceBlock, StockTrade, _batched
+from .valuation import holding_portfolios
+
+# Days of history covered by the 52-week values
+WINDOW = timedelta(weeks=getattr(settings, 'STOCKS_EXTREMES_WINDOW_WEEKS', 52))
+
+
+class RollingExtremes:
+    """
+    Sliding-window maximum of daily highs and minimum of daily lows.
+
+    Days must be pushed in order. Pushing the current day again with its
+    widened high/low replaces it, which is how intraday updates arrive.
+    """
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.last_day = None
+        # First day of the symbol's history, which may predate the window
+        self.history_start = None
+        self._highs = deque()  # (day, high), highs strictly decreasing
+        self._lows = deque()  # (day, low), lows strictly increasing
+
+    def push(self, day, high, low):
+        """Add ``day``'s high and low; days older than the last one are ignored"""
+        if self.last_day is not None and day < self.last_day:
+            return False
+        if self.history_start is None or day < self.history_start:
+            self.history_start = day
+        while self._highs and self._highs[-1][1] <= high:
+            self._highs.pop()
+        self._highs.append((day, high))
+        while self._lows and self._lows[-1][1] >= low:
+            self._lows.pop()
+        self._lows.append((day, low))
+
+        cutoff = day - self.window
+        while self._highs[0][0] <= cutoff:
+            self._highs.popleft()
+        while self._lows[0][0] <= cutoff:
+            self._lows.popleft()
+        self.last_day = day
+        return True
+
+    @property
+    def high(self):
+        return self._highs[0][1] if self._highs else None
+
+    @property
+    def low(self):
+        return self._lows[0][1] if self._lows else None
+
+    @property
+    def complete(self):
+        """True when the history reaches back over the whole window"""
+        return (
+            self.last_day is not None
+            and self.history_start <= self.last_day - self.window + timedelta(days=1)
+        )
+
+
+class ExtremesTracker:
+    """
+    Per-process ``RollingExtremes`` for every symbol seen so far. A symbol's
+    window is loaded from ``PriceBlock`` the first time it is observed.
+    """
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.windows = {}
+        self._lock = threading.Lock()
+
+    def observe(self, days):
+        """
+        Fold ``(symbol, day, high, low)`` rows into the windows and return
+        ``{symbol: (wk_52_high, wk_52_low, complete)}`` for the symbols whose
+        values changed (or were loaded for the first time); ``complete`` is
+        False while the history is shorter than the window.
+        """
+        days = sorted(days, key=lambda row: (row[0], row[1]))
+        with self._lock:
+            first_days = {symbol: day for symbol, day, _, _ in reversed(days)}
+            previous = {
+                symbol: self._values(self.windows[symbol])
+                for symbol in first_days
+                if symbol in self.windows
+            }
+            self._load(first_days)
+            for symbol, day, high, low in days:
+                self.windows[symbol].push(day, high, low)
+            current = {symbol: self._values(self.windows[symbol]) for symbol in first_days}
+        return {symbol: values for symbol, values in current.items() if previous.get(symbol) != values}
+
+    @staticmethod
+    def _values(window):
+        return window.high, window.low, window.complete
+
+    def reset(self):
+        with self._lock:
+            self.windows.clear()
+
+    def _load(self, first_days):
+        """Load the stored window before ``first_days[symbol]`` for new symbols"""
+        missing = {symbol: day for symbol, day in first_days.items() if symbol not in self.windows}
+        if not missing:
+            return
+        starts = dict(
+            PriceBlock.objects.filter(symbol__in=missing)
+            .order_by()
+            .values_list('symbol')
+            .annotate(Min('day'))
+        )
+        for symbol in missing:
+            self.windows[symbol] = RollingExtremes(self.window)
+            self.windows[symbol].history_start = starts.get(symbol)
+        rows = (
+            PriceBlock.objects.filter(
+                symbol__in=missing,
+                day__gt=min(missing.values()) - self.window,
+            )
+            .order_by('symbol', 'day')
+            .values_list('symbol', 'day', 'high', 'low')
+        )
+        for symbol, day, high, low in rows.iterator(chunk_size=2000):
+            if day < missing[symbol]:
+                self.windows[symbol].push(day, high, low)
+
+
+tracker = ExtremesTracker()
+
+
+def refresh_extremes(days, skip_symbols=()):
+    """
+    Update the 52-week windows with ``(symbol, day, high, low)`` rows and
+    write the resulting values to every position in those symbols: as they
+    are when the history covers the window, otherwise only widening the
+    stored values. ``skip_symbols`` (set explicitly by the caller) are
+    tracked but not written. Returns ``{symbol: positions_updated}``.
+    """
+    changed = tracker.observe(days)
+    for symbol in skip_symbols:
+        changed.pop(symbol, None)
+    if not changed:
+        return {}
+    updated = StockTrade.objects.update_prices([
+        {'symbol': symbol, 'wk_52_high': high, 'wk_52_low': low}
+        for symbol, (high, low, complete) in changed.items()
+        if complete
+    ])
+    updated.update(widen_extremes({
+        symbol: (high, low)
+        for symbol, (high, low, complete) in changed.items()
+        if not complete
+    }))
+    broadcaster.notify_on_commit(holding_portfolios(changed))
+    return updated
+
+
+def widen_extremes(extremes, chunk_size=PRICE_UPDATE_CHUNK_SIZE):
+    """
+    Raise ``wk_52_high`` / lower ``wk_52_low`` of every position in each
+    symbol of ``{symbol: (high, low)}`` to include those values; a stored
+    low of 0.00 is the unset default and is replaced. Returns
+    ``{symbol: positions_updated}``.
+    """
+    now = timezone.now()
+    updated = {}
+    with transaction.atomic():
+        for chunk in _batched(extremes.items(), chunk_size):
+            values = dict(chunk)
+            positions = StockTrade.objects.filter(symbol__in=values)
+            updated.update(positions.order_by().values_list('symbol').annotate(count=Count('id')))
+
+            high, low = (
+                CaseMapping(
+                    'symbol',
+                    {symbol: pair[index] for symbol, pair in values.items()},
+                    default=field,
+                    output_field=StockTrade._meta.get_field(field),
+                )
+                for index, field in enumerate(('wk_52_high', 'wk_52_low'))
+            )
+            positions.update(
+                wk_52_high=Greatest('wk_52_high', high),
+                wk_52_low=Case(When(wk_52_low=0, then=low), default=Least('wk_52_low', low)),
+                updated_at=now,
+            )
+    return {symbol: updated.get(symbol, 0) for symbol in extremes}
+
+
+def compute_extremes(as_of, symbols=None):
+    """
+    Return ``{symbol: (wk_52_high, wk_52_low, complete)}`` over the window
+    ending on ``as_of``, computed from the stored day blocks with one
+    segmented numpy reduction across all symbols. ``complete`` is False
+    when the symbol's history starts inside the window.
+    """
+    blocks = PriceBlock.objects.filter(day__lte=as_of)
+    if symbols:
+        blocks = blocks.filter(symbol__in=symbols)
+    rows = list(
+        blocks.filter(day__gt=as_of - WINDOW)
+        .order_by('symbol')
+        .values_list('symbol', 'high', 'low')
+    )
+    if not rows:
+        return {}
+    window_start = as_of - WINDOW + timedelta(days=1)
+    starts_on = dict(blocks.order_by().values_list('symbol').annotate(Min('day')))
+
+    names, highs, lows = zip(*rows)
+    names = np.array(names, dtype=object)
+    starts = np.concatenate(([0], np.flatnonzero(names[1:] != names[:-1]) + 1))
+    highs = np.maximum.reduceat(np.array(highs, dtype=np.float64), starts)
+    lows = np.minimum.reduceat(np.array(lows, dtype=np.float64), starts)
+    return {
+        symbol: (Decimal(f'{high:.2f}'), Decimal(f'{low:.2f}'), starts_on[symbol] <= window_start)
+        for symbol, high, low in zip(names[starts], highs, lows)
+    }
+
+
+def backfill_extremes(as_of, symbols=None):
+    """
+    Recompute the 52-week values for every symbol with history (or only
+    ``symbols``) as of ``as_of`` and write them to the positions: as they
+    are when the history covers the window, otherwise only widening the
+    stored values. The in-process windows are dropped so they reload.
+    Returns ``(symbols_computed, positions_updated)``.
+    """
+    extremes = compute_extremes(as_of, symbols)
+    updated = StockTrade.objects.update_prices([
+        {'symbol': symbol, 'wk_52_high': high, 'wk_52_low': low}
+        for symbol, (high, low, complete) in extremes.items()
+        if complete
+    ])
+    updated.update(widen_extremes({
+        symbol: (high, low)
+        for symbol, (high, low, complete) in extremes.items()
+        if not complete
+    }))
+    tracker.reset()
+    return len(extremes), sum(updated.values())
@@ -0,0 +1,42 @@
+"""
+Sparse fieldsets for the read endpoints.
+
+``?fields=symbol,ltp`` keeps only the named fields of each row and
+``?exclude=created_at,updated_at`` drops the named ones (both may be
+given). Views pass the selection to the serializer and narrow the SQL
+projection to the same columns, so unselected columns are neither loaded
+nor serialized.
+"""
+
+
+class FieldSelectionError(ValueError):
+    """``?fields=`` / ``?exclude=`` names a field the endpoint does not have"""
+
+
+def _split(value):
+    if value is None:
+        return None
+    names = [name.strip() for name in value.split(',')]
+    return [name for name in names if name] or None
+
+
+def select_fields(query_params, available):
+    """
+    Return the ``available`` fields chosen by ``?fields=`` / ``?exclude=``,
+    in ``available`` order, or None when neither parameter is given.
+    """
+    fields = _split(query_params.get('fields'))
+    exclude = _split(query_params.get('exclude'))
+    if fields is None and exclude is None:
+        return None
+
+    unknown = [name for name in (fields or []) + (exclude or []) if name not in available]
+    if unknown:
+        raise FieldSelectionError(f"Unknown fields: {', '.join(unknown)}")
+    selected = [
+        name for name in available
+        if (fields is None or name in fields) and name not in (exclude or ())
+    ]
+    if not selected:
+        raise FieldSelectionError('No fields left to return')
+    return selected
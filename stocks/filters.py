@@ -0,0 +1,105 @@
+"""
+Server-side filtering and ordering for the trade list.
+
+Every filter maps to a condition an index can answer (see the StockTrade
+indexes): equality on ``portfolio_id`` or ``symbol``, and ranges on
+``symbol`` (prefix), ``ltp``, ``realised_profit_loss`` and ``updated_at``.
+A symbol prefix is sent as a range rather than ``LIKE`` so it stays an
+index search on every backend.
+
+``?ordering=`` picks one of ``ORDERING_FIELDS`` (``-`` for descending);
+``id`` is added as the tie-breaker so keyset pagination can page on it.
+A range filter is answered from its own index when the list is ordered by
+the same column; under the default ``-created_at`` order the database may
+instead walk the keyset index and stop once the page is full.
+"""
+from datetime import datetime, time
+from decimal import Decimal, InvalidOperation
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+ORDERING_FIELDS = ('created_at', 'updated_at', 'symbol', 'ltp', 'realised_profit_loss')
+
+# Query param -> lookup; values are decimal numbers
+RANGE_FILTERS = {
+    'ltp_min': 'ltp__gte',
+    'ltp_max': 'ltp__lte',
+    'realised_profit_loss_min': 'realised_profit_loss__gte',
+    'realised_profit_loss_max': 'realised_profit_loss__lte',
+}
+
+
+def parse_moment(value):
+    """Parse an ISO date/datetime query param; None if absent, False if invalid"""
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            return False
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _invalid(message):
+    return ValidationError({'error': message})
+
+
+class StockTradeFilterBackend(BaseFilterBackend):
+    """
+    Filters: ``portfolio_id``, ``symbol`` (exact), ``symbol_prefix``,
+    ``ltp_min`` / ``ltp_max``, ``realised_profit_loss_min`` / ``_max`` and
+    ``updated_since`` / ``updated_before`` (ISO date or datetime).
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        portfolio_id = params.get('portfolio_id')
+        if portfolio_id:
+            try:
+                queryset = queryset.filter(portfolio_id=int(portfolio_id))
+            except ValueError:
+                raise _invalid('portfolio_id must be an integer')
+
+        symbol = params.get('symbol')
+        if symbol:
+            queryset = queryset.filter(symbol=symbol.upper())
+        prefix = params.get('symbol_prefix', '').upper()
+        if prefix:
+            # Every string starting with ``prefix`` sorts in [prefix, next)
+            following = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+            queryset = queryset.filter(symbol__gte=prefix, symbol__lt=following)
+
+        for param, lookup in RANGE_FILTERS.items():
+            value = params.get(param)
+            if value:
+                try:
+                    number = Decimal(value)
+                except InvalidOperation:
+                    number = None
+                if number is None or not number.is_finite():
+                    raise _invalid(f'{param} must be a number')
+                queryset = queryset.filter(**{lookup: number})
+
+        for param, lookup in (('updated_since', 'updated_at__gte'), ('updated_before', 'updated_at__lt')):
+            moment = parse_moment(params.get(param))
+            if moment is False:
+                raise _invalid(f'{param} must be an ISO date or datetime')
+            if moment is not None:
+                queryset = queryset.filter(**{lookup: moment})
+
+        ordering = params.get('ordering')
+        if ordering:
+            field = ordering[1:] if ordering.startswith('-') else ordering
+            if field not in ORDERING_FIELDS:
+                raise _invalid(f"ordering must be one of: {', '.join(ORDERING_FIELDS)} (prefix - to reverse)")
+            direction = '-' if ordering.startswith('-') else ''
+            queryset = queryset.order_by(f'{direction}{field}', f'{direction}id')
+        return queryset
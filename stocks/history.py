@@ -0,0 +1,241 @@
+"""
+Compact per-symbol price history with OHLC rollups.
+
+Minute bars are stored as one ``PriceBlock`` row per symbol and day. The
+row packs fixed-width records (``BAR_STRUCT``: minute of day, then open,
+high, low and close in paise as 64-bit integers, so any price the ltp
+column holds fits), 34 bytes per minute, so a 375-minute trading day is
+under 13 KB. A year of minute data for thousands of symbols therefore
+stays within a few GB in one table.
+
+Hour bars are rolled up from the minute records when read. Day bars come
+straight from each block's OHLC columns, so long daily charts never decode
+a block; they also feed the 52-week high/low (see stocks.extremes).
+"""
+import struct
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .extremes import refresh_extremes
+from .models import PriceBlock
+
+# minute of day, open, high, low, close (prices in paise)
+BAR_STRUCT = struct.Struct('<Hqqqq')
+
+# Trading days (and minute-of-day offsets) are in exchange time.
+HISTORY_TIMEZONE = ZoneInfo(getattr(settings, 'STOCKS_HISTORY_TIMEZONE', 'Asia/Kolkata'))
+
+# Bar interval name -> minutes per bar
+INTERVALS = {'1m': 1, '1h': 60, '1d': 1440}
+
+BLOCK_WRITE_BATCH_SIZE = 500
+
+
+def to_paise(price):
+    return int(Decimal(price) * 100)
+
+
+def from_paise(value):
+    return Decimal(value).scaleb(-2)
+
+
+def decode_bars(data):
+    """Return ``{minute_of_day: [open, high, low, close]}`` for a packed block"""
+    return {minute: [o, h, l, c] for minute, o, h, l, c in BAR_STRUCT.iter_unpack(bytes(data))}
+
+
+def encode_bars(bars):
+    """Pack ``{minute_of_day: (open, high, low, close)}`` ordered by minute"""
+    return b''.join(BAR_STRUCT.pack(minute, *bars[minute]) for minute in sorted(bars))
+
+
+def merge_bar(bars, minute, o, h, l, c):
+    """Fold a (later) bar for ``minute`` into ``bars``"""
+    bar = bars.get(minute)
+    if bar is None:
+        bars[minute] = [o, h, l, c]
+    else:
+        bar[1] = max(bar[1], h)
+        bar[2] = min(bar[2], l)
+        bar[3] = c
+
+
+class MinuteBarBuffer:
+    """
+    Builds minute bars from an ordered tick stream, keeping one open bar per
+    symbol. A bar is closed by a tick in a later minute or by ``drain``.
+    """
+
+    def __init__(self):
+        self.open_bars = {}
+        self.closed = []
+
+    def __bool__(self):
+        return bool(self.open_bars or self.closed)
+
+    def record(self, symbol, price, ts):
+        minute = int(ts // 60)
+        paise = to_paise(price)
+        bar = self.open_bars.get(symbol)
+        if bar is not None and bar[0] == minute:
+            bar[2] = max(bar[2], paise)
+            bar[3] = min(bar[3], paise)
+            bar[4] = paise
+            return
+        if bar is not None and bar[0] > minute:
+            # Out-of-order tick for an earlier minute
+            self.closed.append((symbol, minute, paise, paise, paise, paise))
+            return
+        if bar is not None:
+            self.closed.append((symbol, *bar))
+        self.open_bars[symbol] = [minute, paise, paise, paise, paise]
+
+    def drain(self, now=None):
+        """
+        Return and forget the finished bars ``(symbol, epoch_minute, o, h, l, c)``.
+
+        Bars for minutes before ``now`` are finished; with ``now=None`` every
+        open bar is included too.
+        """
+        current = None if now is None else int(now // 60)
+        for symbol, bar in list(self.open_bars.items()):
+            if current is None or bar[0] < current:
+                self.closed.append((symbol, *bar))
+                del self.open_bars[symbol]
+        closed, self.closed = self.closed, []
+        return closed
+
+
+def write_minute_bars(bars, keep_extremes=()):
+    """
+    Merge minute bars ``(symbol, epoch_minute, open, high, low, close)``
+    (prices in paise) into their day blocks: one read of the affected
+    blocks and one batched upsert. The 52-week values of symbols in
+    ``keep_extremes`` are left alone. Returns the number of blocks written.
+    """
+    if not bars:
+        return 0
+
+    incoming = defaultdict(dict)
+    for symbol, epoch_minute, o, h, l, c in bars:
+        local = datetime.fromtimestamp(epoch_minute * 60, HISTORY_TIMEZONE)
+        merge_bar(incoming[(symbol, local.date())], local.hour * 60 + local.minute, o, h, l, c)
+
+    now = timezone.now()
+    with transaction.atomic():
+        existing = {
+            (symbol, day): data
+            for symbol, day, data in PriceBlock.objects.select_for_update()
+            .filter(symbol__in={key[0] for key in incoming}, day__in={key[1] for key in incoming})
+            .values_list('symbol', 'day', 'bars')
+        }
+
+        blocks = []
+        for (symbol, day), new_bars in incoming.items():
+            merged = decode_bars(existing[(symbol, day)]) if (symbol, day) in existing else {}
+            for minute in sorted(new_bars):
+                merge_bar(merged, minute, *new_bars[minute])
+            ordered = sorted(merged)
+            blocks.append(PriceBlock(
+                symbol=symbol,
+                day=day,
+                bars=encode_bars(merged),
+                bar_count=len(merged),
+                open=from_paise(merged[ordered[0]][0]),
+                high=from_paise(max(bar[1] for bar in merged.values())),
+                low=from_paise(min(bar[2] for bar in merged.values())),
+                close=from_paise(merged[ordered[-1]][3]),
+                updated_at=now,
+            ))
+
+        PriceBlock.objects.bulk_create(
+            blocks,
+            update_conflicts=True,
+            unique_fields=['symbol', 'day'],
+            update_fields=['bars', 'bar_count', 'open', 'high', 'low', 'close', 'updated_at'],
+            batch_size=BLOCK_WRITE_BATCH_SIZE,
+        )
+
+    refresh_extremes(
+        ((block.symbol, block.day, block.high, block.low) for block in blocks),
+        skip_symbols=keep_extremes,
+    )
+    return len(blocks)
+
+
+def record_prices(prices, ts, keep_extremes=()):
+    """Record ``{symbol: price}`` observed at epoch seconds ``ts`` as minute bars"""
+    minute = int(ts // 60)
+    return write_minute_bars(
+        [(symbol, minute, *(to_paise(price),) * 4) for symbol, price in prices.items()],
+        keep_extremes,
+    )
+
+
+def query_bars(symbol, interval, start, end):
+    """
+    Return ``[(bar_start, open, high, low, close), ...]`` for ``symbol``.
+
+    Bars start at or after the aware datetime ``start`` and before ``end``
+    (day bars from ``start``'s trading day). ``interval`` is one of
+    ``INTERVALS``; hour bars roll up the minute bars inside the range.
+    """
+    start = start.astimezone(HISTORY_TIMEZONE)
+    end = end.astimezone(HISTORY_TIMEZONE)
+    blocks = PriceBlock.objects.filter(
+        symbol=symbol, day__gte=start.date(), day__lte=end.date()
+    ).order_by('day')
+
+    if interval == '1d':
+        result = []
+        for day, o, h, l, c in blocks.values_list('day', 'open', 'high', 'low', 'close'):
+            bar_start = datetime.combine(day, time.min, HISTORY_TIMEZONE)
+            if bar_start < end:
+                result.append((bar_start, o, h, l, c))
+        return result
+
+    span = INTERVALS[interval]
+    result = []
+    for day, data in blocks.values_list('day', 'bars'):
+        midnight = datetime.combine(day, time.min, HISTORY_TIMEZONE)
+        first = max(0, _minutes_between(midnight, start))
+        last = _minutes_between(midnight, end)
+
+        group = None
+        for minute, o, h, l, c in BAR_STRUCT.iter_unpack(bytes(data)):
+            if minute < first or minute >= last:
+                continue
+            bucket = minute - minute % span
+            if group is not None and group[0] == bucket:
+                group[2] = max(group[2], h)
+                group[3] = min(group[3], l)
+                group[4] = c
+                continue
+            if group is not None:
+                result.append(_bar_row(midnight, group))
+            group = [bucket, o, h, l, c]
+        if group is not None:
+            result.append(_bar_row(midnight, group))
+    return result
+
+
+def _minutes_between(midnight, moment):
+    """Index of the first minute bar starting at or after ``moment``"""
+    return -int(-(moment - midnight).total_seconds() // 60)
+
+
+def _bar_row(midnight, group):
+    bucket, o, h, l, c = group
+    return (
+        midnight + timedelta(minutes=bucket),
+        from_paise(o),
+        from_paise(h),
+        from_paise(l),
+        from_paise(c),
+    )
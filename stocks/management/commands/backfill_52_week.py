@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from stocks.extremes import backfill_extremes
+from stocks.history import HISTORY_TIMEZONE
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute wk_52_high / wk_52_low for every symbol with price history '
+        'from the stored day blocks and write them to all positions.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--symbol', nargs='+', dest='symbols')
+        parser.add_argument(
+            '--as-of',
+            help='Last trading day of the window (YYYY-MM-DD, default today).',
+        )
+
+    def handle(self, *args, **options):
+        if options['as_of']:
+            as_of = parse_date(options['as_of'])
+            if as_of is None:
+                raise CommandError('--as-of must be a date in YYYY-MM-DD format')
+        else:
+            as_of = timezone.now().astimezone(HISTORY_TIMEZONE).date()
+
+        symbols = [symbol.upper() for symbol in options['symbols'] or []]
+        computed, updated = backfill_extremes(as_of, symbols)
+        self.stdout.write(self.style.SUCCESS(
+            f'Computed 52-week values for {computed} symbols as of {as_of}; '
+            f'updated {updated} positions'
+        ))
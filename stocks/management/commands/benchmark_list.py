@@ -0,0 +1,103 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.renderers import JSONRenderer
+
+from stocks.management.commands.benchmark_report import make_rows
+from stocks.models import Portfolio, StockTrade
+from stocks.serializers import StockTradeReadSerializer, StockTradeSerializer
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark trade list serialization: StockTradeSerializer over model '
+        'instances (one portfolio query per row) against StockTradeReadSerializer '
+        'over values() rows. Synthetic rows are created in a transaction that is '
+        'rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+        parser.add_argument('--portfolios', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        for count in options['rows']:
+            try:
+                with transaction.atomic():
+                    self._run(count, options['portfolios'], options['repeat'])
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+    def _run(self, count, portfolio_count, repeat):
+        portfolios = Portfolio.objects.bulk_create(
+            Portfolio(name=f'Benchmark {index}') for index in range(portfolio_count)
+        )
+        fields = ('symbol', 'total_buy_qty', 'buy_price', 'total_sell_qty', 'sell_price', 'ltp',
+                  'balance_qty', 'acquisition_cost', 'current_value', 'unrealised_profit_loss',
+                  'wk_52_high', 'wk_52_low')
+        StockTrade.objects.bulk_create(
+            (
+                StockTrade(
+                    portfolio=portfolios[index % portfolio_count],
+                    buy_price=row['total_buy_value'] / row['total_buy_qty'],
+                    sell_price=(
+                        row['total_sell_value'] / row['total_sell_qty']
+                        if row['total_sell_qty'] else Decimal('0.00')
+                    ),
+                    **{field: row[field] for field in fields if field in row},
+                )
+                for index, row in enumerate(make_rows(count))
+            ),
+            batch_size=1000,
+        )
+        queryset = StockTrade.objects.order_by('-created_at', '-id')
+
+        def original():
+            return JSONRenderer().render(StockTradeSerializer(queryset.all(), many=True).data)
+
+        def fast():
+            rows = StockTradeReadSerializer.values(queryset.all())
+            return JSONRenderer().render(StockTradeReadSerializer(rows, many=True).data)
+
+        original_queries, original_body = self._counting_queries(original)
+        fast_queries, fast_body = self._counting_queries(fast)
+        if original_body != fast_body:
+            self.stderr.write(self.style.ERROR(f'{count} rows: output differs from StockTradeSerializer'))
+            return
+
+        original_time = self._best_of(repeat, original)
+        fast_time = self._best_of(repeat, fast)
+        self.stdout.write(
+            f'{count:>8} rows  '
+            f'original {original_time * 1000:>9,.1f} ms ({original_queries} queries)  '
+            f'values {fast_time * 1000:>9,.1f} ms ({fast_queries} queries)  '
+            f'speedup {original_time / fast_time:.1f}x'
+        )
+
+    def _counting_queries(self, func):
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            result = func()
+        return len(queries), result
+
+    def _best_of(self, repeat, func):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
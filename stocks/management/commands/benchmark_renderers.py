@@ -0,0 +1,90 @@
+import json
+import time
+from datetime import timedelta
+
+import msgpack
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from stocks.management.commands.benchmark_report import make_rows
+from stocks.renderers import MessagePackRenderer, ORJSONRenderer
+from stocks.serializers import StockTradeReadSerializer
+
+
+def make_list_response(count):
+    """A trade list response body for ``count`` synthetic positions"""
+    now = timezone.now()
+    rows = []
+    for index, row in enumerate(make_rows(count)):
+        rows.append({
+            **row,
+            'id': index + 1,
+            'buy_price': row['ltp'],
+            'sell_price': row['ltp'],
+            'realised_profit_loss': row['unrealised_profit_loss'],
+            'booked_profit_loss': row['unrealised_profit_loss'],
+            'total_profit_loss': row['unrealised_profit_loss'],
+            'portfolio_id': index % 50 + 1,
+            'portfolio__name': f'Portfolio {index % 50} – long term',
+            'date_time_field': 'As on Nov 28, 2025 16:00:27 Hours IST',
+            'created_at': now - timedelta(seconds=index),
+            'updated_at': now,
+        })
+    data = StockTradeReadSerializer(rows, many=True).data
+    return {
+        'message': 'Stock trades retrieved successfully',
+        'count': len(data),
+        'next': None,
+        'previous': None,
+        'data': data,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark response encoding on large trade lists: DRF's JSONRenderer "
+        'against the orjson renderer (checked byte for byte) and MessagePack.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        for count in options['rows']:
+            data = make_list_response(count)
+            body = JSONRenderer().render(data)
+            if ORJSONRenderer().render(data) != body:
+                self.stderr.write(self.style.ERROR(f'{count} rows: orjson output differs from JSONRenderer'))
+                continue
+            if msgpack.unpackb(MessagePackRenderer().render(data)) != json.loads(body):
+                self.stderr.write(self.style.ERROR(f'{count} rows: MessagePack values differ from JSON'))
+                continue
+
+            timings = {
+                name: self._best_of(options['repeat'], lambda renderer=renderer: renderer.render(data))
+                for name, renderer in (
+                    ('json', JSONRenderer()),
+                    ('orjson', ORJSONRenderer()),
+                    ('msgpack', MessagePackRenderer()),
+                )
+            }
+            self.stdout.write(
+                f'{count:>8} rows  '
+                f"json {timings['json'] * 1000:>8,.1f} ms  "
+                f"orjson {timings['orjson'] * 1000:>8,.1f} ms "
+                f"({timings['json'] / timings['orjson']:.1f}x)  "
+                f"msgpack {timings['msgpack'] * 1000:>8,.1f} ms "
+                f"({timings['json'] / timings['msgpack']:.1f}x, "
+                f'{len(MessagePackRenderer().render(data)) / len(body):.0%} of JSON size)'
+            )
+
+    def _best_of(self, repeat, func):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
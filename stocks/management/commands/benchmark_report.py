@@ -0,0 +1,133 @@
+import random
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+
+from stocks.models import StockTrade
+from stocks.report_renderer import render_rows
+from stocks.views import format_number, to_decimal, to_int
+
+CENT = Decimal('0.01')
+
+
+def make_rows(count, seed=0):
+    """Build ``count`` synthetic report rows shaped like values(*REPORT_ROW_FIELDS)"""
+    rng = random.Random(seed)
+    rows = []
+    for index in range(count):
+        buy_qty = rng.randint(1, 5000)
+        sell_qty = rng.randint(0, buy_qty)
+        buy_price = Decimal(rng.randint(100, 500000)) * CENT
+        sell_price = Decimal(rng.randint(100, 500000)) * CENT if sell_qty else Decimal('0.00')
+        ltp = Decimal(rng.randint(100, 500000)) * CENT
+        balance_qty, acquisition_cost, current_value, unrealised, _ = StockTrade.valuation_values(
+            buy_qty, buy_price, sell_qty, sell_price, ltp
+        )
+        rows.append({
+            'symbol': f'SYM{index:06d}',
+            'total_buy_qty': buy_qty,
+            'total_buy_value': (buy_qty * buy_price).quantize(CENT),
+            'total_sell_qty': sell_qty,
+            'total_sell_value': (sell_qty * sell_price).quantize(CENT),
+            'balance_qty': balance_qty,
+            'acquisition_cost': acquisition_cost,
+            'percent_holding': Decimal('0.00'),
+            'ltp': ltp,
+            'current_value': current_value,
+            'unrealised_profit_loss': unrealised,
+            'wk_52_high': Decimal(rng.randint(100, 500000)) * CENT,
+            'wk_52_low': Decimal(rng.randint(100, 500000)) * CENT,
+        })
+    return rows
+
+
+def legacy_render_rows(stocks):
+    """
+    The row loop of the original _generate_html_report, kept as the baseline
+    (with the stored unrealised P/L in place of the old hardcoded zero)
+    """
+    html = ""
+    for stock in stocks:
+        buy_qty = to_int(stock.total_buy_qty)
+        sell_qty = to_int(stock.total_sell_qty)
+        buy_value = to_decimal(stock.total_buy_value)
+        sell_value = to_decimal(stock.total_sell_value)
+
+        if buy_qty > 0 and sell_qty > 0:
+            avg_buy_price = buy_value / buy_qty
+            buy_value_for_sold = avg_buy_price * sell_qty
+            realised_pl = sell_value - buy_value_for_sold
+        else:
+            realised_pl = Decimal('0.00')
+
+        unrealised_pl = to_decimal(stock.unrealised_profit_loss)
+        total_pl = realised_pl + unrealised_pl
+
+        profit_class = "positive" if total_pl >= 0 else "negative"
+        profit_sign = "+" if total_pl >= 0 else ""
+
+        html += f"""
+                    <tr>
+                        <td class="symbol">{stock.symbol}</td>
+                        <td class="cell-color">{to_int(stock.total_buy_qty):,}</td>
+                        <td class="cell-color">{format_number(stock.total_buy_value)}</td>
+                        <td class="cell-color">{to_int(stock.total_sell_qty):,}</td>
+                        <td class="cell-color">{format_number(stock.total_sell_value)}</td>
+                        <td class="cell-color">{to_int(stock.balance_qty):,}</td>
+                        <td class="cell-color">{format_number(stock.acquisition_cost)}</td>
+                        <td class="cell-color">{format_number(stock.percent_holding)}</td>
+                        <td style="text-align:center" class="ltp">{format_number(stock.ltp)}</td>
+                        <td class="cell-color">{format_number(stock.current_value)}</td>
+                        <td class="cell-color">{profit_sign}{format_number(realised_pl)}</td>
+                        <td class="cell-color unrealised">{format_number(unrealised_pl)}</td>
+                        <td style="text-align:center" class="{profit_class}">{profit_sign}{format_number(total_pl)}</td>
+                        <td class="cell-color">{format_number(stock.wk_52_high)}</td>
+                        <td class="cell-color">{format_number(stock.wk_52_low)}</td>
+                    </tr>"""
+    return html.encode('utf-8')
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark report row rendering: the original per-cell format_number '
+        'loop against the precompiled stocks.report_renderer templates.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 50000])
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        for count in options['rows']:
+            rows = make_rows(count)
+            stocks = [SimpleNamespace(**row) for row in rows]
+
+            legacy = legacy_render_rows(stocks)
+            current = b"".join(render_rows(rows, options['chunk_size']))
+            if legacy != current:
+                self.stderr.write(self.style.ERROR(f'{count} rows: output differs from the original renderer'))
+                continue
+
+            legacy_time = self._best_of(options['repeat'], lambda: legacy_render_rows(stocks))
+            current_time = self._best_of(
+                options['repeat'],
+                lambda: b"".join(render_rows(rows, options['chunk_size'])),
+            )
+            self.stdout.write(
+                f'{count:>8} rows  '
+                f'original {count / legacy_time:>12,.0f} rows/s  '
+                f'precompiled {count / current_time:>12,.0f} rows/s  '
+                f'speedup {legacy_time / current_time:.1f}x'
+            )
+
+    def _best_of(self, repeat, func):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
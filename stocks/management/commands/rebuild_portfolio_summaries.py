@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from stocks.models import SUMMARY_FIELDS, VALUATION_SUMMARY_FIELDS, PortfolioSummary
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute PortfolioSummary rows from StockTrade data. With --verify, '
+        'only compare the stored summaries against a fresh computation.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--portfolio', type=int, nargs='+', dest='portfolio_ids')
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Report drift between stored and recomputed summaries without writing.',
+        )
+
+    def handle(self, *args, **options):
+        portfolio_ids = options['portfolio_ids']
+
+        if not options['verify']:
+            summaries = PortfolioSummary.objects.rebuild(portfolio_ids)
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(summaries)} portfolio summaries'))
+            return
+
+        expected = PortfolioSummary.objects.compute(portfolio_ids)
+        stored = {
+            summary.portfolio_id: summary
+            for summary in PortfolioSummary.objects.filter(portfolio_id__in=expected)
+        }
+        drifted = 0
+        for portfolio_id, totals in expected.items():
+            summary = stored.get(portfolio_id)
+            if summary is None:
+                drifted += 1
+                self.stdout.write(f'Portfolio {portfolio_id}: summary missing')
+                continue
+            for field in (*SUMMARY_FIELDS, *VALUATION_SUMMARY_FIELDS):
+                if getattr(summary, field) != totals[field]:
+                    drifted += 1
+                    self.stdout.write(
+                        f'Portfolio {portfolio_id}: {field} stored {getattr(summary, field)} '
+                        f'expected {totals[field]}'
+                    )
+
+        if drifted:
+            raise CommandError(f'{drifted} mismatches found')
+        self.stdout.write(self.style.SUCCESS(f'{len(expected)} portfolio summaries match'))
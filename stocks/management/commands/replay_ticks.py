@@ -0,0 +1,156 @@
+import asyncio
+import csv
+import http.client
+import json
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from stocks.ticks import TickCoalescer, TickError, parse_tick
+
+
+def read_tick_lines(path):
+    """
+    Yield NDJSON tick lines (bytes) from a recorded file.
+
+    The file is either NDJSON or CSV with a ``symbol,price,ts`` header.
+    """
+    with open(path, newline='', encoding='utf-8') as handle:
+        first = handle.readline()
+        handle.seek(0)
+        if first.lstrip().startswith('{'):
+            for line in handle:
+                if line.strip():
+                    yield line.strip().encode('utf-8')
+            return
+        for row in csv.DictReader(handle):
+            tick = {'symbol': row['symbol'], 'price': row['price']}
+            if row.get('ts'):
+                tick['ts'] = float(row['ts'])
+            yield json.dumps(tick).encode('utf-8')
+
+
+def schedule(lines, speed):
+    """
+    Yield ``(line, due)`` where ``due`` is the offset in seconds at which the
+    line should be sent to replay the recording at ``speed`` x its original
+    pace (always 0 when ``speed`` is 0).
+    """
+    first_ts = None
+    for line in lines:
+        due = 0
+        if speed:
+            ts = json.loads(line).get('ts')
+            if isinstance(ts, (int, float)):
+                first_ts = ts if first_ts is None else first_ts
+                due = (ts - first_ts) / speed
+        yield line, due
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay a recorded tick file (NDJSON or CSV symbol,price,ts) into the '
+        'streaming tick ingestion endpoint, or with --direct into an '
+        'in-process coalescer, and report the resulting counters.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--url', default='http://127.0.0.1:8000/api/stocks/ticks/ingest/')
+        parser.add_argument('--token', help='DRF auth token for the endpoint.')
+        parser.add_argument(
+            '--speed',
+            type=float,
+            default=0,
+            help='Replay at this multiple of the recorded pace (0 = as fast as possible).',
+        )
+        parser.add_argument('--chunk-lines', type=int, default=500)
+        parser.add_argument(
+            '--direct',
+            action='store_true',
+            help='Feed an in-process coalescer instead of an HTTP endpoint.',
+        )
+        parser.add_argument('--flush-interval', type=float, default=None)
+
+    def handle(self, *args, **options):
+        lines = schedule(read_tick_lines(options['path']), options['speed'])
+        started = time.monotonic()
+        if options['direct']:
+            stats = asyncio.run(self._feed_direct(lines, started, options))
+        else:
+            stats = self._feed_http(lines, started, options)
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(json.dumps(stats, indent=2, default=str))
+        received = stats.get('received', 0)
+        self.stdout.write(self.style.SUCCESS(
+            f'{received} ticks in {elapsed:.2f}s ({received / elapsed if elapsed else 0:,.0f} ticks/s)'
+        ))
+
+    def _feed_http(self, lines, started, options):
+        if not options['token']:
+            raise CommandError('--token is required unless --direct is used')
+        url = urlsplit(options['url'])
+        connection_class = (
+            http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+        )
+        connection = connection_class(url.hostname, url.port)
+
+        def chunks():
+            batch = []
+            for line, due in lines:
+                delay = started + due - time.monotonic()
+                if delay > 0:
+                    if batch:
+                        yield b'\n'.join(batch) + b'\n'
+                        batch = []
+                    time.sleep(delay)
+                batch.append(line)
+                if len(batch) >= options['chunk_lines']:
+                    yield b'\n'.join(batch) + b'\n'
+                    batch = []
+            if batch:
+                yield b'\n'.join(batch) + b'\n'
+
+        # No Content-Length, so http.client sends the body chunked.
+        connection.request(
+            'POST',
+            url.path,
+            body=chunks(),
+            headers={
+                'Authorization': f"Token {options['token']}",
+                'Content-Type': 'application/x-ndjson',
+            },
+        )
+        response = connection.getresponse()
+        body = json.loads(response.read() or b'{}')
+        if response.status != 200:
+            raise CommandError(f'Ingest failed with {response.status}: {body}')
+
+        connection.request('GET', url.path.replace('/ingest/', '/stats/'), headers={
+            'Authorization': f"Token {options['token']}",
+        })
+        stats = json.loads(connection.getresponse().read())
+        return {**body['data'], 'server': stats.get('data')}
+
+    async def _feed_direct(self, lines, started, options):
+        coalescer = TickCoalescer()
+        if options['flush_interval'] is not None:
+            coalescer.flush_interval = options['flush_interval']
+
+        for count, (line, due) in enumerate(lines, start=1):
+            delay = started + due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                coalescer.offer(*parse_tick(line))
+            except TickError:
+                coalescer.reject()
+            await coalescer.wait_for_capacity()
+            if count % options['chunk_lines'] == 0:
+                # Let the flusher run between chunks, as a server would.
+                await asyncio.sleep(0)
+
+        await coalescer.close()
+        return coalescer.stats()
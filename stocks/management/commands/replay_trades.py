@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from stocks.positions import COST_METHODS, PositionError, replay_trades
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild StockTrade positions (and FIFO lots) from the Trade ledger '
+        'in one streaming pass.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--portfolio', type=int, nargs='+', dest='portfolio_ids')
+        parser.add_argument(
+            '--method',
+            choices=COST_METHODS,
+            help='Cost method for booked P/L (default: STOCKS_POSITION_COST_METHOD).',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            count = replay_trades(options['portfolio_ids'], options['method'])
+        except PositionError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f'Replayed {count} positions from the ledger'))
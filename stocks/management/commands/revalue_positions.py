@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from stocks.valuation import revalue_portfolios
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute balance, acquisition cost, current value, unrealised/total '
+        'P/L and % holding for every position (or only --portfolio ...).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--portfolio', type=int, nargs='+', dest='portfolio_ids')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        valued, written = revalue_portfolios(options['portfolio_ids'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Valued {valued} positions in {elapsed:.2f}s; {written} changed'
+        ))
@@ -0,0 +1,88 @@
+# Generated by Django 6.0 on 2026-10-17 06:08
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+# Frozen copies of stocks.models.SUMMARY_FIELDS / position_totals as of this
+# migration, so later changes to the model code cannot alter the backfill.
+SUMMARY_FIELDS = (
+    'position_count',
+    'total_buy_qty',
+    'total_buy_value',
+    'total_sell_qty',
+    'total_sell_value',
+    'realised_profit_loss',
+)
+
+REALISED_PRECISION = Decimal('0.000001')
+
+
+def position_totals(total_buy_qty, total_buy_value, total_sell_qty, total_sell_value):
+    """One position's contribution to its portfolio summary"""
+    if total_buy_qty > 0 and total_sell_qty > 0:
+        realised = total_sell_value - total_buy_value / total_buy_qty * total_sell_qty
+        realised = realised.quantize(REALISED_PRECISION)
+    else:
+        realised = Decimal('0')
+    return {
+        'position_count': 1,
+        'total_buy_qty': total_buy_qty,
+        'total_buy_value': total_buy_value,
+        'total_sell_qty': total_sell_qty,
+        'total_sell_value': total_sell_value,
+        'realised_profit_loss': realised,
+    }
+
+
+def backfill_summaries(apps, schema_editor):
+    """Create a summary row for every existing portfolio"""
+    Portfolio = apps.get_model('stocks', 'Portfolio')
+    PortfolioSummary = apps.get_model('stocks', 'PortfolioSummary')
+    StockTrade = apps.get_model('stocks', 'StockTrade')
+
+    summaries = {
+        portfolio_id: {field: 0 for field in SUMMARY_FIELDS}
+        for portfolio_id in Portfolio.objects.values_list('id', flat=True)
+    }
+    rows = StockTrade.objects.filter(portfolio__isnull=False).values_list(
+        'portfolio_id', 'total_buy_qty', 'total_buy_value', 'total_sell_qty', 'total_sell_value',
+    )
+    for portfolio_id, *position in rows.iterator(chunk_size=2000):
+        summary = summaries[portfolio_id]
+        for field, value in position_totals(*position).items():
+            summary[field] += value
+
+    PortfolioSummary.objects.bulk_create(
+        [PortfolioSummary(portfolio_id=pk, **totals) for pk, totals in summaries.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0004_stocktrade_ltp'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioSummary',
+            fields=[
+                ('portfolio', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='stocks.portfolio')),
+                ('position_count', models.IntegerField(default=0)),
+                ('total_buy_qty', models.BigIntegerField(default=0)),
+                ('total_buy_value', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18)),
+                ('total_sell_qty', models.BigIntegerField(default=0)),
+                ('total_sell_value', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18)),
+                ('realised_profit_loss', models.DecimalField(decimal_places=6, default=Decimal('0'), help_text='Average-cost realised profit/loss across all positions', max_digits=22)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Portfolio Summary',
+                'verbose_name_plural': 'Portfolio Summaries',
+            },
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
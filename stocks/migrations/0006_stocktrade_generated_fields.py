@@ -0,0 +1,49 @@
+# Generated by Django 6.0 on 2026-10-17 06:12
+
+import django.db.models.expressions
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Turn the derived StockTrade columns into stored generated columns.
+
+    A regular field cannot be altered into a GeneratedField, so each column
+    is dropped and re-added; the database computes (backfills) the values
+    for existing rows when the column is added.
+    """
+
+    dependencies = [
+        ('stocks', '0005_portfoliosummary'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='stocktrade',
+            name='realised_profit_loss',
+        ),
+        migrations.RemoveField(
+            model_name='stocktrade',
+            name='total_buy_value',
+        ),
+        migrations.RemoveField(
+            model_name='stocktrade',
+            name='total_sell_value',
+        ),
+        migrations.AddField(
+            model_name='stocktrade',
+            name='total_buy_value',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('total_buy_qty'), '*', models.F('buy_price')), help_text='Total buy value (calculated: total_buy_qty * buy_price)', output_field=models.DecimalField(decimal_places=2, max_digits=12)),
+        ),
+        migrations.AddField(
+            model_name='stocktrade',
+            name='total_sell_value',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('total_sell_qty'), '*', models.F('sell_price')), help_text='Total sell value (calculated: total_sell_qty * sell_price)', output_field=models.DecimalField(decimal_places=2, max_digits=12)),
+        ),
+        migrations.AddField(
+            model_name='stocktrade',
+            name='realised_profit_loss',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(buy_price__gt=0, sell_price__gt=0, then=django.db.models.expressions.CombinedExpression(models.F('sell_price'), '-', models.F('buy_price'))), default=models.Value(Decimal('0.00'))), help_text='Realised profit/loss (calculated: sell_price - buy_price)', output_field=models.DecimalField(decimal_places=2, max_digits=12)),
+        ),
+    ]
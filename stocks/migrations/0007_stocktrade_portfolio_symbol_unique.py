@@ -0,0 +1,26 @@
+# Generated by Django 6.0 on 2026-10-17 06:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0006_stocktrade_generated_fields'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='stocktrade',
+            name='symbol',
+            field=models.CharField(db_index=True, help_text='Stock symbol (unique within a portfolio)', max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='stocktrade',
+            index=models.Index(fields=['portfolio', '-created_at'], name='stocks_trade_pf_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='stocktrade',
+            constraint=models.UniqueConstraint(fields=('portfolio', 'symbol'), name='stocks_trade_portfolio_symbol_uniq'),
+        ),
+    ]
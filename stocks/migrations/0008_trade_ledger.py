@@ -0,0 +1,59 @@
+# Generated by Django 6.0 on 2026-10-17 06:20
+
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0007_stocktrade_portfolio_symbol_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stocktrade',
+            name='booked_profit_loss',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Realised profit/loss booked from ledger fills (average cost or FIFO)', max_digits=14),
+        ),
+        migrations.CreateModel(
+            name='Trade',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(help_text='Stock symbol', max_length=50)),
+                ('side', models.CharField(choices=[('BUY', 'Buy'), ('SELL', 'Sell')], max_length=4)),
+                ('quantity', models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1)])),
+                ('price', models.DecimalField(decimal_places=2, help_text='Fill price per share', max_digits=10, validators=[django.core.validators.MinValueValidator(0)])),
+                ('executed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('portfolio', models.ForeignKey(help_text='Portfolio the fill belongs to', on_delete=django.db.models.deletion.CASCADE, related_name='trades', to='stocks.portfolio')),
+            ],
+            options={
+                'verbose_name': 'Trade',
+                'verbose_name_plural': 'Trades',
+                'ordering': ['executed_at', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Lot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('remaining_qty', models.PositiveIntegerField()),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('position', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lots', to='stocks.stocktrade')),
+                ('trade', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lots', to='stocks.trade')),
+            ],
+            options={
+                'verbose_name': 'Lot',
+                'verbose_name_plural': 'Lots',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['portfolio', 'symbol', 'executed_at', 'id'], name='stocks_trade_ledger_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-17 06:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0008_trade_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceBlock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=50)),
+                ('day', models.DateField()),
+                ('bars', models.BinaryField(help_text='Packed minute bars, ordered by minute')),
+                ('bar_count', models.PositiveSmallIntegerField(default=0)),
+                ('open', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('high', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('low', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('close', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Price Block',
+                'verbose_name_plural': 'Price Blocks',
+                'constraints': [models.UniqueConstraint(fields=('symbol', 'day'), name='stocks_priceblock_symbol_day_uniq')],
+            },
+        ),
+    ]
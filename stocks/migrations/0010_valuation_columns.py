@@ -0,0 +1,143 @@
+# Generated by Django 6.0 on 2026-10-17 06:30
+
+import numpy as np
+from decimal import Decimal
+from django.db import migrations, models
+
+# Frozen copies of stocks.valuation.VALUATION_FIELDS / value_positions as of
+# this migration, so later changes to the engine cannot alter the backfill.
+VALUATION_FIELDS = (
+    'balance_qty',
+    'acquisition_cost',
+    'current_value',
+    'unrealised_profit_loss',
+    'total_profit_loss',
+    'percent_holding',
+)
+
+PERCENT_LIMIT = 99999
+
+
+def value_positions(portfolio_ids, total_buy_qty, total_sell_qty, buy_price, sell_price, ltp):
+    """Value positions given as parallel int64 arrays (prices in paise)"""
+    balance = total_buy_qty - total_sell_qty
+    acquisition_cost = balance * buy_price
+    current_value = balance * ltp
+    unrealised = current_value - acquisition_cost
+    realised = np.where(
+        (total_buy_qty > 0) & (total_sell_qty > 0),
+        total_sell_qty * (sell_price - buy_price),
+        0,
+    )
+
+    _, group = np.unique(portfolio_ids, return_inverse=True)
+    portfolio_value = np.bincount(group, weights=current_value)[group]
+    weight = np.divide(
+        current_value * 10000.0,
+        portfolio_value,
+        out=np.zeros(len(current_value)),
+        where=portfolio_value != 0,
+    )
+    return {
+        'balance_qty': balance,
+        'acquisition_cost': acquisition_cost,
+        'current_value': current_value,
+        'unrealised_profit_loss': unrealised,
+        'total_profit_loss': realised + unrealised,
+        'percent_holding': np.clip(np.rint(weight), -PERCENT_LIMIT, PERCENT_LIMIT).astype(np.int64),
+    }
+
+
+def backfill_valuation(apps, schema_editor):
+    """Value every existing position and store the portfolio totals"""
+    PortfolioSummary = apps.get_model('stocks', 'PortfolioSummary')
+    StockTrade = apps.get_model('stocks', 'StockTrade')
+
+    positions = list(StockTrade.objects.filter(portfolio__isnull=False).order_by('portfolio_id', 'id'))
+    if not positions:
+        return
+
+    def paise(field):
+        return np.array([int(getattr(p, field) * 100) for p in positions], dtype=np.int64)
+
+    values = value_positions(
+        np.array([p.portfolio_id for p in positions], dtype=np.int64),
+        np.array([p.total_buy_qty for p in positions], dtype=np.int64),
+        np.array([p.total_sell_qty for p in positions], dtype=np.int64),
+        paise('buy_price'),
+        paise('sell_price'),
+        paise('ltp'),
+    )
+    totals = {}
+    for index, position in enumerate(positions):
+        for field in VALUATION_FIELDS:
+            value = int(values[field][index])
+            setattr(position, field, value if field == 'balance_qty' else Decimal(value).scaleb(-2))
+        summary = totals.setdefault(position.portfolio_id, [Decimal('0.00')] * 3)
+        summary[0] += position.acquisition_cost
+        summary[1] += position.current_value
+        summary[2] += position.unrealised_profit_loss
+    StockTrade.objects.bulk_update(positions, VALUATION_FIELDS, batch_size=500)
+
+    for portfolio_id, (acquisition, current, unrealised) in totals.items():
+        PortfolioSummary.objects.filter(portfolio_id=portfolio_id).update(
+            total_acquisition_cost=acquisition,
+            total_current_value=current,
+            unrealised_profit_loss=unrealised,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0009_priceblock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='portfoliosummary',
+            name='total_acquisition_cost',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18),
+        ),
+        migrations.AddField(
+            model_name='portfoliosummary',
+            name='total_current_value',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18),
+        ),
+        migrations.AddField(
+            model_name='portfoliosummary',
+            name='unrealised_profit_loss',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18),
+        ),
+        migrations.AddField(
+            model_name='stocktrade',
+            name='total_profit_loss',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Average-cost realised plus unrealised profit/loss', max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='stocktrade',
+            name='unrealised_profit_loss',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Unrealised profit/loss (current_value - acquisition_cost)', max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='stocktrade',
+            name='acquisition_cost',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Acquisition cost of the balance at the average buy price', max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='stocktrade',
+            name='balance_qty',
+            field=models.IntegerField(default=0, help_text='Balance quantity (total_buy_qty - total_sell_qty)'),
+        ),
+        migrations.AlterField(
+            model_name='stocktrade',
+            name='current_value',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Current value of the balance at ltp', max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='stocktrade',
+            name='percent_holding',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text="Share of the portfolio's current value (set by stocks.valuation)", max_digits=5),
+        ),
+        migrations.RunPython(backfill_valuation, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-17 06:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0010_valuation_columns'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='portfolio',
+            index=models.Index(fields=['-created_at', '-id'], name='stocks_pf_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stocktrade',
+            index=models.Index(fields=['-created_at', '-id'], name='stocks_trade_created_id_idx'),
+        ),
+    ]
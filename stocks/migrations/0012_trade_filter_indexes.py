@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-17 06:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0011_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='stocktrade',
+            name='stocks_trade_pf_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='stocktrade',
+            index=models.Index(fields=['portfolio', '-created_at', '-id'], name='stocks_trade_pf_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stocktrade',
+            index=models.Index(fields=['ltp', 'id'], name='stocks_trade_ltp_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stocktrade',
+            index=models.Index(fields=['realised_profit_loss', 'id'], name='stocks_trade_realised_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stocktrade',
+            index=models.Index(fields=['updated_at', 'id'], name='stocks_trade_updated_id_idx'),
+        ),
+    ]
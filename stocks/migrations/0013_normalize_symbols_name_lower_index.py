@@ -0,0 +1,44 @@
+# Generated by Django 6.0 on 2026-10-17 06:52
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models.functions import Upper
+
+
+def uppercase_symbols(apps, schema_editor):
+    """
+    Store existing symbols uppercase, as StockTrade.save() now does.
+
+    A position whose uppercase symbol is already held in the same portfolio
+    would break the (portfolio, symbol) constraint; it is left as is for a
+    manual merge. Ledger fills are all uppercased, so a replay folds them
+    into one position.
+    """
+    StockTrade = apps.get_model('stocks', 'StockTrade')
+    Trade = apps.get_model('stocks', 'Trade')
+
+    held = set(StockTrade.objects.values_list('portfolio_id', 'symbol'))
+    lowercase = StockTrade.objects.exclude(symbol=Upper('symbol')).values_list('id', 'portfolio_id', 'symbol')
+    for pk, portfolio_id, symbol in list(lowercase):
+        key = (portfolio_id, symbol.upper())
+        if portfolio_id is not None and key in held:
+            continue
+        StockTrade.objects.filter(pk=pk).update(symbol=key[1])
+        held.add(key)
+
+    Trade.objects.exclude(symbol=Upper('symbol')).update(symbol=Upper('symbol'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0012_trade_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(uppercase_symbols, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='portfolio',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='stocks_pf_name_lower_idx'),
+        ),
+    ]
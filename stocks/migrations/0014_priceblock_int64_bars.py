@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-17 07:20
+
+import struct
+
+from django.db import migrations
+
+OLD_BAR_STRUCT = struct.Struct('<Hiiii')
+NEW_BAR_STRUCT = struct.Struct('<Hqqqq')
+
+
+def _repack(apps, source, target):
+    PriceBlock = apps.get_model('stocks', 'PriceBlock')
+    ids = list(PriceBlock.objects.order_by('id').values_list('id', flat=True))
+    for start in range(0, len(ids), 500):
+        blocks = list(PriceBlock.objects.filter(id__in=ids[start:start + 500]).only('id', 'bars'))
+        for block in blocks:
+            block.bars = b''.join(target.pack(*bar) for bar in source.iter_unpack(bytes(block.bars)))
+        PriceBlock.objects.bulk_update(blocks, ['bars'])
+
+
+def widen_bars(apps, schema_editor):
+    """Repack stored minute bars with 64-bit prices (stocks.history.BAR_STRUCT)"""
+    _repack(apps, OLD_BAR_STRUCT, NEW_BAR_STRUCT)
+
+
+def narrow_bars(apps, schema_editor):
+    _repack(apps, NEW_BAR_STRUCT, OLD_BAR_STRUCT)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0013_normalize_symbols_name_lower_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(widen_bars, narrow_bars),
+    ]
@@ -1,9 +1,24 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, Count, DecimalField, F, Func, Max, Sum, Value, When
+from django.db.models.functions import Lower
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from decimal import Decimal
 from datetime import datetime
 import pytz
 
+class PortfolioQuerySet(models.QuerySet):
+    def named(self, *names):
+        """
+        Portfolios whose name matches any of ``names`` ignoring case, in one
+        ``IN`` query on the ``Lower('name')`` index. Both sides are folded
+        by the database so they compare the same way on every backend.
+        """
+        return self.alias(name_lower=Lower('name')).filter(
+            name_lower__in=[Lower(Value(name)) for name in names]
+        )
+
+
 class Portfolio(models.Model):
     name = models.CharField(
         max_length=255,
@@ -16,16 +31,251 @@ class Portfolio(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = PortfolioQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Portfolio"
         verbose_name_plural = "Portfolios"
+        indexes = [
+            # Keyset pagination order (stocks.pagination)
+            models.Index(fields=['-created_at', '-id'], name='stocks_pf_created_id_idx'),
+            # Case-insensitive name lookups (PortfolioQuerySet.named)
+            models.Index(Lower('name'), name='stocks_pf_name_lower_idx'),
+        ]
 
     def __str__(self):
         return self.name
-    
+
+
+class Divide(Func):
+    """
+    Decimal division of two expressions.
+
+    SQLite stores whole-number decimals with INTEGER affinity, so a plain
+    ``/`` there truncates (401 / 4 == 100). Promote the dividend to REAL.
+    """
+    arg_joiner = ' / '
+    template = '(%(expressions)s)'
+    output_field = DecimalField(max_digits=20, decimal_places=6)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, arg_joiner=' * 1.0 / ', **extra_context)
+
+
+class CaseMapping(Func):
+    """
+    ``CASE <key> WHEN k1 THEN v1 ... ELSE <default> END`` for a plain
+    ``{key value: value}`` mapping.
+
+    Equivalent to ``Case(When(key=k1, then=Value(v1)), ..., default=...)``,
+    but rendered directly instead of resolving a lookup per branch, which
+    dominates the cost of updates with hundreds of branches.
+    """
+    def __init__(self, key, mapping, default, output_field):
+        self.mapping = mapping
+        super().__init__(F(key), F(default), output_field=output_field)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        key_sql, key_params = compiler.compile(self.source_expressions[0])
+        default_sql, default_params = compiler.compile(self.source_expressions[1])
+        params = [*key_params]
+        for key, value in self.mapping.items():
+            params.extend((key, self.output_field.get_db_prep_save(value, connection)))
+        whens = ' '.join(['WHEN %s THEN %s'] * len(self.mapping))
+        return f'CASE {key_sql} {whens} ELSE {default_sql} END', (*params, *default_params)
+
+
+# Rows per bulk_create call (and per transaction) in bulk_ingest.
+BULK_INGEST_BATCH_SIZE = 1000
+
+BULK_INGEST_UNIQUE_FIELDS = ['portfolio', 'symbol']
+
+# Everything save() writes, except the key, created_at, the columns
+# generated by the database and percent_holding (see stocks.valuation).
+BULK_INGEST_UPDATE_FIELDS = [
+    'total_buy_qty',
+    'buy_price',
+    'total_sell_qty',
+    'sell_price',
+    'balance_qty',
+    'ltp',
+    'acquisition_cost',
+    'current_value',
+    'unrealised_profit_loss',
+    'total_profit_loss',
+    'wk_52_high',
+    'wk_52_low',
+    'date_time_field',
+    'updated_at',
+]
+
+
+# Symbols per CASE WHEN update statement in update_prices.
+PRICE_UPDATE_CHUNK_SIZE = 500
+
+PRICE_UPDATE_FIELDS = ('ltp', 'wk_52_high', 'wk_52_low')
+
+
+def _batched(iterable, size):
+    """Yield lists of up to ``size`` items from ``iterable``"""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class StockTradeQuerySet(models.QuerySet):
+    """QuerySet for StockTrade with database-side report helpers"""
+
+    def realised_profit_loss_expression(self):
+        """Average-cost realised P/L of the sold quantity, per row"""
+        return Case(
+            When(
+                total_buy_qty__gt=0,
+                total_sell_qty__gt=0,
+                then=F('total_sell_value') - Divide(
+                    F('total_buy_value') * F('total_sell_qty'),
+                    F('total_buy_qty'),
+                ),
+            ),
+            default=Value(Decimal('0.00')),
+            output_field=DecimalField(max_digits=20, decimal_places=2),
+        )
+
+    def _report_aggregates(self):
+        """Aggregate expressions shared by the report total helpers"""
+        return {
+            'buy_qty': Sum('total_buy_qty', default=0),
+            'buy_value': Sum('total_buy_value', default=Decimal('0.00')),
+            'sell_qty': Sum('total_sell_qty', default=0),
+            'sell_value': Sum('total_sell_value', default=Decimal('0.00')),
+            'realised_profit_loss': Sum(
+                self.realised_profit_loss_expression(),
+                default=Decimal('0.00'),
+            ),
+            'acquisition_cost': Sum('acquisition_cost', default=Decimal('0.00')),
+            'current_value': Sum('current_value', default=Decimal('0.00')),
+            'unrealised_profit_loss': Sum('unrealised_profit_loss', default=Decimal('0.00')),
+        }
+
+    def report_totals(self):
+        """
+        Compute the report totals in one aggregate query: buy/sell quantity
+        and value, the average-cost realised profit/loss and the valuation
+        totals.
+        """
+        totals = self.order_by().aggregate(**self._report_aggregates())
+        # Aggregate aliases cannot shadow model fields, so rename afterwards.
+        return {f'total_{key}': value for key, value in totals.items()}
+
+    def report_totals_by_portfolio(self):
+        """
+        Compute ``report_totals()`` for every portfolio in one
+        ``GROUP BY portfolio_id`` query, keyed by portfolio id.
+        """
+        rows = self.order_by().values('portfolio_id').annotate(**self._report_aggregates())
+        return {
+            row.pop('portfolio_id'): {f'total_{key}': value for key, value in row.items()}
+            for row in rows
+        }
+
+    def bulk_ingest(self, rows, batch_size=BULK_INGEST_BATCH_SIZE):
+        """
+        Insert or update many positions without calling save() per row.
+
+        ``rows`` is an iterable of dicts keyed by StockTrade field names
+        (``portfolio_id`` for the portfolio). Derived fields are computed
+        with the same code as save(), with one "As on ..." stamp for the
+        whole call. Rows are upserted on ``(portfolio, symbol)`` with one
+        ``bulk_create`` per ``batch_size`` rows, each batch in its own
+        transaction, and the affected portfolio summaries are rebuilt once
+        at the end. Returns the number of rows written.
+        """
+        model = self.model
+        date_time_field = model.format_date_time()
+        portfolio_ids = set()
+        written = 0
+
+        try:
+            for batch in _batched(rows, batch_size):
+                trades = []
+                for row in batch:
+                    trade = model(**row)
+                    trade.compute_derived_fields(date_time_field)
+                    trades.append(trade)
+
+                with transaction.atomic(using=self.db):
+                    model.objects.using(self.db).bulk_create(
+                        trades,
+                        update_conflicts=True,
+                        unique_fields=BULK_INGEST_UNIQUE_FIELDS,
+                        update_fields=BULK_INGEST_UPDATE_FIELDS,
+                    )
+                portfolio_ids.update(trade.portfolio_id for trade in trades)
+                written += len(trades)
+        finally:
+            portfolio_ids.discard(None)
+            if portfolio_ids:
+                PortfolioSummary.objects.db_manager(self.db).rebuild(portfolio_ids)
+
+        return written
+
+    def update_prices(self, prices, chunk_size=PRICE_UPDATE_CHUNK_SIZE):
+        """
+        Set ``ltp`` (and optionally ``wk_52_high`` / ``wk_52_low``) for every
+        position in the queryset holding each symbol.
+
+        ``prices`` is a list of dicts with ``symbol`` and any of
+        ``PRICE_UPDATE_FIELDS``; fields that are missing or None are left
+        as they are. Each chunk of symbols is one ``UPDATE ... SET ltp =
+        CASE symbol WHEN ...`` statement; all chunks run in one transaction.
+        Returns ``{symbol: positions_updated}``.
+        """
+        now = timezone.now()
+        date_time_field = self.model.format_date_time()
+        updated = {}
+
+        with transaction.atomic(using=self.db):
+            for chunk in _batched(prices, chunk_size):
+                symbols = [entry['symbol'] for entry in chunk]
+                positions = self.filter(symbol__in=symbols)
+                updated.update(
+                    positions.order_by()
+                    .values_list('symbol')
+                    .annotate(count=Count('id'))
+                )
+
+                changes = {'updated_at': now, 'date_time_field': date_time_field}
+                for field in PRICE_UPDATE_FIELDS:
+                    mapping = {
+                        entry['symbol']: entry[field]
+                        for entry in chunk
+                        if entry.get(field) is not None
+                    }
+                    if mapping:
+                        changes[field] = CaseMapping(
+                            'symbol', mapping, default=field,
+                            output_field=self.model._meta.get_field(field),
+                        )
+                positions.update(**changes)
+
+        return {symbol: updated.get(symbol, 0) for symbol in (entry['symbol'] for entry in prices)}
+
+    def report_version(self):
+        """Return a cheap version stamp: row count and latest ``updated_at``"""
+        return self.order_by().aggregate(
+            row_count=Count('id'),
+            last_modified=Max('updated_at'),
+        )
+
+
 class StockTrade(models.Model):
     """Model to store stock trading information"""
-    symbol = models.CharField(max_length=50, unique=True, help_text="Stock symbol")
+    symbol = models.CharField(max_length=50, db_index=True, help_text="Stock symbol (unique within a portfolio)")
     total_buy_qty = models.IntegerField(validators=[MinValueValidator(0)], help_text="Total buy quantity")
     buy_price = models.DecimalField(
         max_digits=10, 
@@ -33,10 +283,10 @@ class StockTrade(models.Model):
         validators=[MinValueValidator(0)],
         help_text="Buy price per share"
     )
-    total_buy_value = models.DecimalField(
-        max_digits=12, 
-        decimal_places=2, 
-        default=Decimal('0.00'),
+    total_buy_value = models.GeneratedField(
+        expression=F('total_buy_qty') * F('buy_price'),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        db_persist=True,
         help_text="Total buy value (calculated: total_buy_qty * buy_price)"
     )
     total_sell_qty = models.IntegerField(
@@ -51,15 +301,15 @@ class StockTrade(models.Model):
         validators=[MinValueValidator(0)],
         help_text="Sell price per share"
     )
-    total_sell_value = models.DecimalField(
-        max_digits=12, 
-        decimal_places=2, 
-        default=Decimal('0.00'),
+    total_sell_value = models.GeneratedField(
+        expression=F('total_sell_qty') * F('sell_price'),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        db_persist=True,
         help_text="Total sell value (calculated: total_sell_qty * sell_price)"
     )
     balance_qty = models.IntegerField(
         default=0,
-        help_text="Balance quantity (always saved as 0)"
+        help_text="Balance quantity (total_buy_qty - total_sell_qty)"
     )
     ltp = models.DecimalField(
         max_digits=10, 
@@ -72,26 +322,47 @@ class StockTrade(models.Model):
         max_digits=12, 
         decimal_places=2, 
         default=Decimal('0.00'),
-        help_text="Acquisition cost (always 0.00)"
+        help_text="Acquisition cost of the balance at the average buy price"
     )
     percent_holding = models.DecimalField(
         max_digits=5, 
         decimal_places=2, 
         default=Decimal('0.00'),
-        help_text="Percentage holding (always 0.00)"
+        help_text="Share of the portfolio's current value (set by stocks.valuation)"
     )
     current_value = models.DecimalField(
         max_digits=12, 
         decimal_places=2, 
         default=Decimal('0.00'),
-        help_text="Current value (always 0.00)"
+        help_text="Current value of the balance at ltp"
     )
-    realised_profit_loss = models.DecimalField(
-        max_digits=12, 
-        decimal_places=2, 
+    unrealised_profit_loss = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
         default=Decimal('0.00'),
+        help_text="Unrealised profit/loss (current_value - acquisition_cost)"
+    )
+    total_profit_loss = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text="Average-cost realised plus unrealised profit/loss"
+    )
+    realised_profit_loss = models.GeneratedField(
+        expression=Case(
+            When(sell_price__gt=0, buy_price__gt=0, then=F('sell_price') - F('buy_price')),
+            default=Value(Decimal('0.00')),
+        ),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        db_persist=True,
         help_text="Realised profit/loss (calculated: sell_price - buy_price)"
     )
+    booked_profit_loss = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text="Realised profit/loss booked from ledger fills (average cost or FIFO)"
+    )
     wk_52_high = models.DecimalField(
         max_digits=10, 
         decimal_places=2, 
@@ -122,15 +393,35 @@ class StockTrade(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = StockTradeQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Stock Trade'
         verbose_name_plural = 'Stock Trades'
         ordering = ['-created_at']
+        constraints = [
+            # Also serves as the (portfolio, symbol) index for per-portfolio
+            # reports and symbol lookups.
+            models.UniqueConstraint(
+                fields=['portfolio', 'symbol'],
+                name='stocks_trade_portfolio_symbol_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['portfolio', '-created_at', '-id'], name='stocks_trade_pf_created_idx'),
+            # Keyset pagination order (stocks.pagination)
+            models.Index(fields=['-created_at', '-id'], name='stocks_trade_created_id_idx'),
+            # Range filters and orderings of the trade list (stocks.filters)
+            models.Index(fields=['ltp', 'id'], name='stocks_trade_ltp_id_idx'),
+            models.Index(fields=['realised_profit_loss', 'id'], name='stocks_trade_realised_id_idx'),
+            models.Index(fields=['updated_at', 'id'], name='stocks_trade_updated_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.symbol} - Buy: {self.total_buy_qty} @ {self.buy_price}"
 
-    def format_date_time(self):
+    @staticmethod
+    def format_date_time():
         """Format datetime as 'As on Nov 28, 5025 16:00:27 Hours IST'"""
         # Get current datetime in IST timezone
         ist = pytz.timezone('Asia/Kolkata')
@@ -145,40 +436,383 @@ class StockTrade(models.Model):
         
         return f"As on {month_abbr} {day}, {year} {time_str} Hours IST"
 
-    def save(self, *args, **kwargs):
-        """Override save to calculate computed fields"""
-        # Calculate total_buy_value
-        self.total_buy_value = Decimal(str(self.total_buy_qty)) * Decimal(str(self.buy_price))
-        
-        # Calculate total_sell_value
-        self.total_sell_value = Decimal(str(self.total_sell_qty)) * Decimal(str(self.sell_price))
-        
-        # Always set balance_qty to 0
-        self.balance_qty = 0
-        
-        # Always set acquisition_cost to 0.00
-        self.acquisition_cost = Decimal('0.00')
-        
-        # Always set percent_holding to 0.00
-        self.percent_holding = Decimal('0.00')
-        
-        # Always set current_value to 0.00
-        self.current_value = Decimal('0.00')
-        
-        # Calculate realised_profit_loss (sell_price - buy_price)
-        if self.sell_price > 0 and self.buy_price > 0:
-            self.realised_profit_loss = Decimal(str(self.sell_price)) - Decimal(str(self.buy_price))
-        else:
-            self.realised_profit_loss = Decimal('0.00')
-        
+    def compute_derived_fields(self, date_time_field=None):
+        """
+        Set the calculated columns exactly as save() stores them.
+
+        Bulk callers pass ``date_time_field`` so the "As on ..." stamp is
+        formatted once per batch instead of once per row.
+        """
+        # Symbols are stored uppercase so exact lookups hit the symbol index
+        self.symbol = self.symbol.upper()
+
+        # Prices are stored with 2 decimal places; round them first so the
+        # generated columns below are computed from the stored values
+        self.buy_price = Decimal(str(self.buy_price)).quantize(Decimal('0.01'))
+        self.sell_price = Decimal(str(self.sell_price)).quantize(Decimal('0.01'))
+
+        self.ltp = Decimal(str(self.ltp)).quantize(Decimal('0.01'))
+
+        # Per-row valuation; percent_holding depends on the whole portfolio
+        # and is kept by stocks.valuation
+        (
+            self.balance_qty,
+            self.acquisition_cost,
+            self.current_value,
+            self.unrealised_profit_loss,
+            self.total_profit_loss,
+        ) = self.valuation_values(
+            self.total_buy_qty, self.buy_price, self.total_sell_qty, self.sell_price, self.ltp
+        )
+
         # Format and set date_time_field (always update to current time)
-        self.date_time_field = self.format_date_time()
+        self.date_time_field = date_time_field or self.format_date_time()
         
         # Round all decimal fields to 2 decimal places
-        self.total_buy_value = self.total_buy_value.quantize(Decimal('0.01'))
-        self.total_sell_value = self.total_sell_value.quantize(Decimal('0.01'))
-        self.realised_profit_loss = self.realised_profit_loss.quantize(Decimal('0.01'))
         self.wk_52_high = Decimal(str(self.wk_52_high)).quantize(Decimal('0.01'))
         self.wk_52_low = Decimal(str(self.wk_52_low)).quantize(Decimal('0.01'))
-        
-        super().save(*args, **kwargs)
+
+        # total_buy_value, total_sell_value and realised_profit_loss are
+        # generated by the database; mirror them so the instance is current
+        # without a refresh_from_db()
+        self.total_buy_value, self.total_sell_value, self.realised_profit_loss = (
+            self.generated_values(self.total_buy_qty, self.buy_price, self.total_sell_qty, self.sell_price)
+        )
+
+    @staticmethod
+    def generated_values(total_buy_qty, buy_price, total_sell_qty, sell_price):
+        """
+        Return ``(total_buy_value, total_sell_value, realised_profit_loss)``
+        as the database computes them for the given inputs.
+        """
+        total_buy_value = (Decimal(total_buy_qty) * buy_price).quantize(Decimal('0.01'))
+        total_sell_value = (Decimal(total_sell_qty) * sell_price).quantize(Decimal('0.01'))
+        if sell_price > 0 and buy_price > 0:
+            realised_profit_loss = sell_price - buy_price
+        else:
+            realised_profit_loss = Decimal('0.00')
+        return total_buy_value, total_sell_value, realised_profit_loss
+
+    @staticmethod
+    def valuation_values(total_buy_qty, buy_price, total_sell_qty, sell_price, ltp):
+        """
+        Return ``(balance_qty, acquisition_cost, current_value,
+        unrealised_profit_loss, total_profit_loss)`` for one position.
+
+        The balance is valued at the average buy price and at ltp; total P/L
+        adds the report's average-cost realised P/L of the sold quantity.
+        stocks.valuation computes the same values for many rows at once.
+        """
+        balance_qty = total_buy_qty - total_sell_qty
+        acquisition_cost = balance_qty * buy_price
+        current_value = balance_qty * ltp
+        unrealised = current_value - acquisition_cost
+        if total_buy_qty > 0 and total_sell_qty > 0:
+            realised = total_sell_qty * (sell_price - buy_price)
+        else:
+            realised = Decimal('0.00')
+        return balance_qty, acquisition_cost, current_value, unrealised, realised + unrealised
+
+    def save(self, *args, **kwargs):
+        """Override save to calculate computed fields"""
+        self.compute_derived_fields()
+
+        # Save and apply the change to the portfolio summary in one transaction
+        with transaction.atomic(using=kwargs.get('using')):
+            old = None
+            if self.pk is not None:
+                old = (
+                    StockTrade.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values('portfolio_id', *POSITION_TOTAL_FIELDS)
+                    .first()
+                )
+
+            # Read by the post_save valuation signal, which fires inside
+            # super().save(), to revalue both sides of a move
+            self._previous_portfolio_id = old['portfolio_id'] if old else None
+            super().save(*args, **kwargs)
+
+            new_totals = position_totals(
+                self.total_buy_qty,
+                self.total_buy_value,
+                self.total_sell_qty,
+                self.total_sell_value,
+            )
+            if old is None:
+                PortfolioSummary.objects.apply_delta(self.portfolio_id, new=new_totals)
+            else:
+                old_portfolio_id = old.pop('portfolio_id')
+                old_totals = position_totals(**old)
+                if old_portfolio_id == self.portfolio_id:
+                    PortfolioSummary.objects.apply_delta(self.portfolio_id, old=old_totals, new=new_totals)
+                else:
+                    # Moved between portfolios
+                    PortfolioSummary.objects.apply_delta(old_portfolio_id, old=old_totals)
+                    PortfolioSummary.objects.apply_delta(self.portfolio_id, new=new_totals)
+
+
+# StockTrade columns a position's summary contribution is derived from.
+POSITION_TOTAL_FIELDS = ('total_buy_qty', 'total_buy_value', 'total_sell_qty', 'total_sell_value')
+
+# Summary columns maintained incrementally from position deltas.
+SUMMARY_FIELDS = (
+    'position_count',
+    'total_buy_qty',
+    'total_buy_value',
+    'total_sell_qty',
+    'total_sell_value',
+    'realised_profit_loss',
+)
+
+# Summary columns written by stocks.valuation (and by rebuild) as sums of
+# the positions' valuation columns.
+VALUATION_SUMMARY_FIELDS = ('total_acquisition_cost', 'total_current_value', 'unrealised_profit_loss')
+
+REALISED_PRECISION = Decimal('0.000001')
+
+
+def position_totals(total_buy_qty, total_buy_value, total_sell_qty, total_sell_value):
+    """
+    Return one position's contribution to its portfolio summary.
+
+    Realised P/L uses the same average-cost formula as download_report and
+    is quantized to 6 places so incremental sums and rebuilds agree exactly.
+    """
+    if total_buy_qty > 0 and total_sell_qty > 0:
+        realised = total_sell_value - total_buy_value / total_buy_qty * total_sell_qty
+        realised = realised.quantize(REALISED_PRECISION)
+    else:
+        realised = Decimal('0')
+    return {
+        'position_count': 1,
+        'total_buy_qty': total_buy_qty,
+        'total_buy_value': total_buy_value,
+        'total_sell_qty': total_sell_qty,
+        'total_sell_value': total_sell_value,
+        'realised_profit_loss': realised,
+    }
+
+
+class PortfolioSummaryManager(models.Manager):
+    """Manager for PortfolioSummary with incremental and full-rebuild helpers"""
+
+    def apply_delta(self, portfolio_id, old=None, new=None):
+        """
+        Move a portfolio's summary from ``old`` to ``new`` position totals with
+        a single F() update. Either side may be None (create/delete).
+        """
+        if portfolio_id is None:
+            return
+        delta = {
+            field: (new[field] if new else 0) - (old[field] if old else 0)
+            for field in SUMMARY_FIELDS
+        }
+        if not any(delta.values()):
+            return
+
+        updated = self.filter(portfolio_id=portfolio_id).update(
+            updated_at=timezone.now(),
+            **{field: F(field) + value for field, value in delta.items()},
+        )
+        if not updated:
+            # No summary row yet; derive it from the (already written) trades.
+            self.rebuild([portfolio_id])
+
+    def compute(self, portfolio_ids=None):
+        """
+        Recompute summary totals from StockTrade rows in one streaming pass.
+
+        Returns ``{portfolio_id: totals}`` including empty portfolios.
+        """
+        portfolios = Portfolio.objects.all()
+        trades = StockTrade.objects.filter(portfolio__isnull=False)
+        if portfolio_ids is not None:
+            portfolios = portfolios.filter(id__in=portfolio_ids)
+            trades = trades.filter(portfolio_id__in=portfolio_ids)
+
+        summaries = {
+            portfolio_id: {field: 0 for field in (*SUMMARY_FIELDS, *VALUATION_SUMMARY_FIELDS)}
+            for portfolio_id in portfolios.values_list('id', flat=True)
+        }
+        rows = trades.order_by().values_list(
+            'portfolio_id',
+            *POSITION_TOTAL_FIELDS,
+            'acquisition_cost',
+            'current_value',
+            'unrealised_profit_loss',
+        )
+        for portfolio_id, *position in rows.iterator(chunk_size=2000):
+            summary = summaries[portfolio_id]
+            for field, value in position_totals(*position[:4]).items():
+                summary[field] += value
+            for field, value in zip(VALUATION_SUMMARY_FIELDS, position[4:]):
+                summary[field] += value
+        return summaries
+
+    def rebuild(self, portfolio_ids=None):
+        """Recompute and store summaries for the given (or all) portfolios"""
+        summaries = self.compute(portfolio_ids)
+        with transaction.atomic():
+            self.bulk_create(
+                [
+                    self.model(portfolio_id=portfolio_id, **totals)
+                    for portfolio_id, totals in summaries.items()
+                ],
+                update_conflicts=True,
+                unique_fields=['portfolio'],
+                update_fields=[*SUMMARY_FIELDS, *VALUATION_SUMMARY_FIELDS, 'updated_at'],
+                batch_size=500,
+            )
+        return summaries
+
+    def report_totals(self, portfolio_ids):
+        """
+        Return ``{portfolio_id: totals}`` shaped like
+        ``StockTradeQuerySet.report_totals()`` for portfolios that have a summary.
+        """
+        return {
+            summary.portfolio_id: summary.report_totals()
+            for summary in self.filter(portfolio_id__in=portfolio_ids)
+        }
+
+
+class PortfolioSummary(models.Model):
+    """
+    Per-portfolio totals, maintained incrementally whenever a StockTrade is
+    created, updated, deleted or moved, so reports and listings read one row
+    instead of scanning every holding. The valuation totals are written by
+    stocks.valuation whenever the portfolio is revalued.
+    """
+    portfolio = models.OneToOneField(
+        Portfolio,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='summary',
+    )
+    position_count = models.IntegerField(default=0)
+    total_buy_qty = models.BigIntegerField(default=0)
+    total_buy_value = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+    total_sell_qty = models.BigIntegerField(default=0)
+    total_sell_value = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+    realised_profit_loss = models.DecimalField(
+        max_digits=22,
+        decimal_places=6,
+        default=Decimal('0'),
+        help_text="Average-cost realised profit/loss across all positions"
+    )
+    total_acquisition_cost = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+    total_current_value = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+    unrealised_profit_loss = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = PortfolioSummaryManager()
+
+    class Meta:
+        verbose_name = 'Portfolio Summary'
+        verbose_name_plural = 'Portfolio Summaries'
+
+    def __str__(self):
+        return f"Summary of portfolio {self.portfolio_id}"
+
+    def report_totals(self):
+        """Totals in the shape used by the HTML report footer"""
+        return {
+            'total_buy_qty': self.total_buy_qty,
+            'total_buy_value': self.total_buy_value,
+            'total_sell_qty': self.total_sell_qty,
+            'total_sell_value': self.total_sell_value,
+            'total_realised_profit_loss': self.realised_profit_loss,
+            'total_acquisition_cost': self.total_acquisition_cost,
+            'total_current_value': self.total_current_value,
+            'total_unrealised_profit_loss': self.unrealised_profit_loss,
+        }
+
+
+class Trade(models.Model):
+    """
+    Append-only ledger of fills. StockTrade rows are the running positions
+    derived from it (see stocks.positions).
+    """
+    BUY = 'BUY'
+    SELL = 'SELL'
+    SIDE_CHOICES = [
+        (BUY, 'Buy'),
+        (SELL, 'Sell'),
+    ]
+
+    portfolio = models.ForeignKey(
+        Portfolio,
+        on_delete=models.CASCADE,
+        related_name='trades',
+        help_text="Portfolio the fill belongs to"
+    )
+    symbol = models.CharField(max_length=50, help_text="Stock symbol")
+    side = models.CharField(max_length=4, choices=SIDE_CHOICES)
+    quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        validators=[MinValueValidator(0)],
+        help_text="Fill price per share"
+    )
+    executed_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Trade'
+        verbose_name_plural = 'Trades'
+        ordering = ['executed_at', 'id']
+        indexes = [
+            # Replay order: one position at a time, in execution order
+            models.Index(
+                fields=['portfolio', 'symbol', 'executed_at', 'id'],
+                name='stocks_trade_ledger_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.side} {self.quantity} {self.symbol} @ {self.price}"
+
+
+class Lot(models.Model):
+    """An open FIFO lot: the unsold remainder of one buy fill"""
+    position = models.ForeignKey(StockTrade, on_delete=models.CASCADE, related_name='lots')
+    trade = models.ForeignKey(Trade, on_delete=models.CASCADE, related_name='lots')
+    remaining_qty = models.PositiveIntegerField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        verbose_name = 'Lot'
+        verbose_name_plural = 'Lots'
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.remaining_qty} {self.position.symbol} @ {self.price}"
+
+
+class PriceBlock(models.Model):
+    """
+    One symbol's minute OHLC bars for one trading day, packed into a single
+    fixed-width binary block (see stocks.history) instead of a row per bar.
+    The day's own OHLC is kept in columns so daily bars need no decoding.
+    """
+    symbol = models.CharField(max_length=50)
+    day = models.DateField()
+    bars = models.BinaryField(help_text="Packed minute bars, ordered by minute")
+    bar_count = models.PositiveSmallIntegerField(default=0)
+    open = models.DecimalField(max_digits=10, decimal_places=2)
+    high = models.DecimalField(max_digits=10, decimal_places=2)
+    low = models.DecimalField(max_digits=10, decimal_places=2)
+    close = models.DecimalField(max_digits=10, decimal_places=2)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Price Block'
+        verbose_name_plural = 'Price Blocks'
+        constraints = [
+            models.UniqueConstraint(fields=['symbol', 'day'], name='stocks_priceblock_symbol_day_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.symbol} {self.day} ({self.bar_count} bars)"
@@ -0,0 +1,164 @@
+"""
+Keyset pagination for the list endpoints.
+
+Pages follow the queryset's ``(field, id)`` ordering (``(-created_at,
+-id)`` unless a filter backend chose another, see stocks.filters) and each
+page is fetched with ``WHERE (field, id) < (cursor)`` from the matching
+index, so the cost of a page does not depend on how deep it is and nothing
+but the page is loaded. Cursors are opaque base64 tokens holding the
+boundary row's key and direction; a page links to the next and previous
+pages with them.
+
+There is no total in the page; ``count`` is the number of rows returned.
+The list endpoints expose the table total separately (``.../count/``).
+"""
+import base64
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+from django.core.exceptions import ValidationError
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+PAGE_SIZE = getattr(settings, 'STOCKS_PAGE_SIZE', 100)
+MAX_PAGE_SIZE = getattr(settings, 'STOCKS_MAX_PAGE_SIZE', 1000)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on ``(created_at, id)``, newest first.
+
+    ``?page_size=`` overrides the default up to ``max_page_size``. The
+    response keeps the list envelope: ``message``, ``count``, ``next``,
+    ``previous`` and ``data``.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = PAGE_SIZE
+    max_page_size = MAX_PAGE_SIZE
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.message = getattr(view, 'pagination_message', 'Results retrieved successfully')
+        self.model = queryset.model
+        self.field, descending = self.get_ordering(queryset)
+        size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor[2]
+
+        # Walking backwards flips the order and the comparisons
+        before = descending != reverse
+        direction = '-' if before else ''
+        queryset = queryset.order_by(f'{direction}{self.field}', f'{direction}id')
+        if cursor is not None:
+            value, pk, _ = cursor
+            # The outer bound keeps the plan an index range search; the OR
+            # alone is evaluated row by row from the start of the index.
+            strict, bound, tie = ('lt', 'lte', 'lt') if before else ('gt', 'gte', 'gt')
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__{strict}': value}) | Q(**{f'id__{tie}': pk}),
+                **{f'{self.field}__{bound}': value},
+            )
+
+        # One extra row tells whether there is another page in this direction
+        rows = list(queryset[:size + 1])
+        more = len(rows) > size
+        rows = rows[:size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, more
+        else:
+            self.has_next, self.has_previous = more, cursor is not None
+        self.page = rows
+        return rows
+
+    def get_ordering(self, queryset):
+        """
+        ``(field, descending)`` of a queryset ordered by ``(field, id)`` in
+        one direction; anything else is paged by ``(-created_at, -id)``.
+        """
+        ordering = queryset.query.order_by
+        if len(ordering) == 2 and all(isinstance(name, str) for name in ordering):
+            first, second = ordering
+            if second.lstrip('-') in ('id', 'pk') and first.startswith('-') == second.startswith('-'):
+                return first.lstrip('-'), first.startswith('-')
+        return 'created_at', True
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('message', self.message),
+            ('count', len(data)),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('data', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'message': {'type': 'string'},
+                'count': {'type': 'integer'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'data': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(size, self.max_page_size) if size > 0 else self.page_size
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # Paged past the newest row; the first page is the previous one
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, row, reverse):
+        if isinstance(row, dict):
+            # values() rows; they must include the ordering field and id
+            value, pk = row[self.field], row['id']
+        else:
+            value, pk = getattr(row, self.field), row.pk
+        value = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        token = json.dumps([self.field, value, pk, int(reverse)], separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(token.encode()).decode().rstrip('=')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        """Return ``(value, id, reverse)`` from the request, or None"""
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            token = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            field, value, pk, reverse = json.loads(token)
+            # A cursor only continues the ordering it was issued for
+            if field != self.field or not isinstance(value, str) or not isinstance(pk, int):
+                raise ValueError
+            value = self.parse_value(value)
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk, bool(reverse)
+
+    def parse_value(self, value):
+        """Convert a cursor's text back to the ordering field's type"""
+        model_field = self.model._meta.get_field(self.field)
+        # GeneratedField converts through its output field
+        return getattr(model_field, 'output_field', model_field).to_python(value)
@@ -0,0 +1,294 @@
+"""
+Position engine: applies ledger fills (``Trade``) to ``StockTrade`` positions.
+
+Recording a fill is one ledger insert plus one ``F()`` update of the
+position row, so its cost does not depend on how many fills came before.
+``buy_price`` / ``sell_price`` are kept as running averages over all buys
+and sells, which is what the report's realised P/L is derived from.
+
+``booked_profit_loss`` is realised as fills arrive, either against the
+average buy price or, with the FIFO method, against the oldest open ``Lot``.
+``replay_trades`` rebuilds the same state from the ledger in one pass.
+"""
+from collections import deque
+from decimal import ROUND_HALF_UP, Decimal
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Round
+from django.utils import timezone
+
+from .models import (
+    POSITION_TOTAL_FIELDS,
+    Divide,
+    Lot,
+    PortfolioSummary,
+    StockTrade,
+    Trade,
+    position_totals,
+)
+from .valuation import revalue_portfolios, schedule_revaluation
+
+AVERAGE = 'average'
+FIFO = 'fifo'
+COST_METHODS = (AVERAGE, FIFO)
+
+COST_METHOD = getattr(settings, 'STOCKS_POSITION_COST_METHOD', AVERAGE)
+
+REPLAY_BATCH_SIZE = 1000
+
+CENT = Decimal('0.01')
+
+
+class PositionError(ValueError):
+    """Raised when a fill cannot be applied to its position"""
+
+
+def _check_method(method):
+    method = method or COST_METHOD
+    if method not in COST_METHODS:
+        raise ValueError(f'Unknown cost method {method!r}; expected one of {COST_METHODS}')
+    return method
+
+
+def _running_average(qty_field, price_field, quantity, price):
+    """Expression for the average price after adding ``quantity`` @ ``price``"""
+    return Round(
+        Divide(F(qty_field) * F(price_field) + quantity * price, F(qty_field) + quantity),
+        2,
+    )
+
+
+def _average(qty, avg_price, quantity, price):
+    """Python counterpart of ``_running_average`` used by replay"""
+    return ((qty * avg_price + quantity * price) / (qty + quantity)).quantize(CENT, ROUND_HALF_UP)
+
+
+def _consume_lots(position_id, quantity, price):
+    """Sell ``quantity`` from the oldest open lots; return the booked P/L"""
+    booked = Decimal('0.00')
+    remaining = quantity
+    lots = Lot.objects.select_for_update().filter(position_id=position_id).order_by('id')
+    for lot in lots.iterator(chunk_size=100):
+        take = min(remaining, lot.remaining_qty)
+        booked += (price - lot.price) * take
+        remaining -= take
+        if take == lot.remaining_qty:
+            lot.delete()
+        else:
+            Lot.objects.filter(pk=lot.pk).update(remaining_qty=F('remaining_qty') - take)
+        if not remaining:
+            return booked
+    raise PositionError(
+        'Open lots do not cover this sell; run replay_trades --method fifo to rebuild them'
+    )
+
+
+def record_fill(portfolio_id, symbol, side, quantity, price, executed_at=None, method=None):
+    """
+    Append a fill to the ledger and apply it to its position.
+
+    Returns ``(trade, position)``. Raises PositionError when selling more
+    than the position holds; the ledger is left unchanged in that case.
+    """
+    method = _check_method(method)
+    symbol = symbol.upper()
+    price = Decimal(str(price)).quantize(CENT)
+
+    with transaction.atomic():
+        position, _ = StockTrade.objects.get_or_create(
+            portfolio_id=portfolio_id,
+            symbol=symbol,
+            defaults={'total_buy_qty': 0, 'buy_price': Decimal('0.00')},
+        )
+        old = (
+            StockTrade.objects.select_for_update()
+            .filter(pk=position.pk)
+            .values(*POSITION_TOTAL_FIELDS)
+            .get()
+        )
+
+        if side == Trade.SELL and quantity > old['total_buy_qty'] - old['total_sell_qty']:
+            raise PositionError(
+                f'Cannot sell {quantity} {symbol}: only '
+                f"{old['total_buy_qty'] - old['total_sell_qty']} held"
+            )
+
+        trade = Trade.objects.create(
+            portfolio_id=portfolio_id,
+            symbol=symbol,
+            side=side,
+            quantity=quantity,
+            price=price,
+            executed_at=executed_at or timezone.now(),
+        )
+
+        changes = {
+            'updated_at': timezone.now(),
+            'date_time_field': StockTrade.format_date_time(),
+        }
+        if side == Trade.BUY:
+            changes['total_buy_qty'] = F('total_buy_qty') + quantity
+            changes['buy_price'] = _running_average('total_buy_qty', 'buy_price', quantity, price)
+            if method == FIFO:
+                Lot.objects.create(position=position, trade=trade, remaining_qty=quantity, price=price)
+        else:
+            changes['total_sell_qty'] = F('total_sell_qty') + quantity
+            changes['sell_price'] = _running_average('total_sell_qty', 'sell_price', quantity, price)
+            if method == FIFO:
+                booked = _consume_lots(position.pk, quantity, price)
+                changes['booked_profit_loss'] = F('booked_profit_loss') + booked
+            else:
+                changes['booked_profit_loss'] = (
+                    F('booked_profit_loss') + (price - F('buy_price')) * quantity
+                )
+
+        StockTrade.objects.filter(pk=position.pk).update(**changes)
+        position.refresh_from_db()
+
+        PortfolioSummary.objects.apply_delta(
+            portfolio_id,
+            old=position_totals(**old),
+            new=position_totals(*(getattr(position, field) for field in POSITION_TOTAL_FIELDS)),
+        )
+        schedule_revaluation([portfolio_id])
+
+    # Pick up the valuation written when the fill committed
+    position.refresh_from_db()
+    return trade, position
+
+
+def replay_position(fills, method=None):
+    """
+    Fold one position's fills, in execution order, into its final state.
+
+    ``fills`` yields ``(trade_id, side, quantity, price)``. Returns
+    ``(state, open_lots)`` where ``state`` holds the StockTrade position
+    columns and ``open_lots`` is a list of ``(trade_id, remaining_qty, price)``.
+    """
+    method = _check_method(method)
+    buy_qty, buy_price = 0, Decimal('0.00')
+    sell_qty, sell_price = 0, Decimal('0.00')
+    booked = Decimal('0.00')
+    lots = deque()
+
+    for trade_id, side, quantity, price in fills:
+        if side == Trade.BUY:
+            buy_price = _average(buy_qty, buy_price, quantity, price)
+            buy_qty += quantity
+            if method == FIFO:
+                lots.append([trade_id, quantity, price])
+            continue
+
+        if quantity > buy_qty - sell_qty:
+            raise PositionError(f'Trade {trade_id} sells {quantity} but only {buy_qty - sell_qty} held')
+        if method == FIFO:
+            remaining = quantity
+            while remaining:
+                lot = lots[0]
+                take = min(remaining, lot[1])
+                booked += (price - lot[2]) * take
+                remaining -= take
+                lot[1] -= take
+                if not lot[1]:
+                    lots.popleft()
+        else:
+            booked += (price - buy_price) * quantity
+        sell_price = _average(sell_qty, sell_price, quantity, price)
+        sell_qty += quantity
+
+    state = {
+        'total_buy_qty': buy_qty,
+        'buy_price': buy_price,
+        'total_sell_qty': sell_qty,
+        'sell_price': sell_price,
+        'booked_profit_loss': booked,
+    }
+    return state, [tuple(lot) for lot in lots]
+
+
+def replay_trades(portfolio_ids=None, method=None, batch_size=REPLAY_BATCH_SIZE):
+    """
+    Rebuild every position that has ledger entries from the ledger alone.
+
+    Trades are streamed once in (portfolio, symbol, executed_at, id) order;
+    positions are upserted and their open lots replaced in batches. Positions
+    without any ledger entries are left as they are. Returns the number of
+    positions rebuilt.
+    """
+    method = _check_method(method)
+    trades = Trade.objects.all()
+    if portfolio_ids is not None:
+        trades = trades.filter(portfolio_id__in=portfolio_ids)
+    rows = (
+        trades.order_by('portfolio_id', 'symbol', 'executed_at', 'id')
+        .values_list('portfolio_id', 'symbol', 'id', 'side', 'quantity', 'price')
+        .iterator(chunk_size=2000)
+    )
+
+    date_time_field = StockTrade.format_date_time()
+    touched_portfolios = set()
+    batch = []
+    replayed = 0
+
+    try:
+        for key, group in groupby(rows, key=itemgetter(0, 1)):
+            state, open_lots = replay_position((row[2:] for row in group), method)
+            batch.append((key, state, open_lots))
+            touched_portfolios.add(key[0])
+            if len(batch) >= batch_size:
+                replayed += _write_replayed_positions(batch, date_time_field)
+                batch = []
+        if batch:
+            replayed += _write_replayed_positions(batch, date_time_field)
+    finally:
+        if touched_portfolios:
+            revalue_portfolios(touched_portfolios)
+            PortfolioSummary.objects.rebuild(touched_portfolios)
+
+    return replayed
+
+
+def _write_replayed_positions(batch, date_time_field):
+    """Upsert a batch of replayed positions and replace their open lots"""
+    positions = []
+    for (portfolio_id, symbol), state, _ in batch:
+        position = StockTrade(portfolio_id=portfolio_id, symbol=symbol, **state)
+        position.compute_derived_fields(date_time_field)
+        positions.append(position)
+
+    with transaction.atomic():
+        StockTrade.objects.bulk_create(
+            positions,
+            update_conflicts=True,
+            unique_fields=['portfolio', 'symbol'],
+            update_fields=[
+                'total_buy_qty',
+                'buy_price',
+                'total_sell_qty',
+                'sell_price',
+                'booked_profit_loss',
+                'date_time_field',
+                'updated_at',
+            ],
+        )
+        position_ids = {
+            (portfolio_id, symbol): pk
+            for pk, portfolio_id, symbol in StockTrade.objects.filter(
+                portfolio_id__in={key[0] for key, _, _ in batch},
+                symbol__in={key[1] for key, _, _ in batch},
+            ).values_list('id', 'portfolio_id', 'symbol')
+        }
+        Lot.objects.filter(position_id__in=[position_ids[key] for key, _, _ in batch]).delete()
+        Lot.objects.bulk_create(
+            [
+                Lot(position_id=position_ids[key], trade_id=trade_id, remaining_qty=remaining, price=price)
+                for key, _, open_lots in batch
+                for trade_id, remaining, price in open_lots
+            ],
+            batch_size=500,
+        )
+    return len(batch)
@@ -0,0 +1,106 @@
+import json
+import re
+from decimal import Decimal
+
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+_JSON_ENCODER = JSONEncoder()
+
+# orjson spells floats below 1e-4 as 0.00001 / 1e-7 where the stdlib writes
+# 1e-05 / 1e-07; strings that happen to match only cost a fallback.
+_SMALL_FLOAT = re.compile(rb'0\.0000\d|\de-\d(?!\d)')
+
+
+def _orjson_default(obj):
+    """DRF's JSONEncoder fallbacks; Decimals keep the stdlib float spelling"""
+    if isinstance(obj, Decimal):
+        return orjson.Fragment(json.dumps(float(obj), allow_nan=False))
+    return _JSON_ENCODER.default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer producing the same bytes through orjson.
+
+    Serializer output (strings, ints, dicts, lists) is encoded natively;
+    dates, Decimals and the other types DRF's encoder knows go through its
+    ``default``. Indented output (``; indent=``) and values orjson cannot
+    encode (e.g. ints beyond 64 bits, NaN Decimals) fall back to
+    JSONRenderer, as does output holding floats below 1e-4, which orjson
+    spells differently. The one remaining difference: a float NaN or
+    Infinity is rendered as ``null``, where JSONRenderer raises.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_orjson_default, option=_ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if _SMALL_FLOAT.search(ret):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escape U+2028 / U+2029 like JSONRenderer so the output stays a
+        # strict JavaScript subset.
+        if b'\xe2\x80' in ret:
+            ret = ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    MessagePack for internal services; the same values as the JSON body
+    (dates and Decimals converted as JSONRenderer does).
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_JSON_ENCODER.default, use_bin_type=True)
+
+
+class ExportRenderer(BaseRenderer):
+    """
+    Renderer for formats whose body the view streams itself.
+
+    It exists so content negotiation (``?format=`` or ``Accept``) can select
+    the export format. Streaming responses bypass it; error payloads from
+    the same view are still rendered, and labelled, as JSON.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, bytes):
+            return data
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = 'application/json'
+        return JSONRenderer().render(data, renderer_context=renderer_context)
+
+
+class CSVExportRenderer(ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONExportRenderer(ExportRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class EventStreamRenderer(ExportRenderer):
+    """Server-Sent Events; the stream itself comes from stocks.events"""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
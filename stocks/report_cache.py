@@ -0,0 +1,76 @@
+"""
+Server-side cache for rendered portfolio reports.
+
+Reports are cached under a key derived from the portfolio and a version
+stamp (row count and latest ``StockTrade.updated_at``), so any write to the
+portfolio naturally produces a new key and stale entries simply expire.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Bump when the report markup changes so previously cached HTML is not served.
+REPORT_TEMPLATE_VERSION = 1
+
+REPORT_CACHE_TIMEOUT = getattr(settings, 'STOCKS_REPORT_CACHE_TIMEOUT', 60 * 60)
+
+# How long a worker may hold the render lock, and how often waiting
+# workers poll the cache for the result.
+REPORT_LOCK_TIMEOUT = getattr(settings, 'STOCKS_REPORT_LOCK_TIMEOUT', 30)
+REPORT_LOCK_POLL_INTERVAL = 0.05
+
+
+def report_fingerprint(scope, version, portfolio_name, description):
+    """Return a stable hash of everything that affects the rendered report"""
+    last_modified = version['last_modified']
+    parts = [
+        str(REPORT_TEMPLATE_VERSION),
+        str(scope),
+        str(version['row_count']),
+        last_modified.isoformat() if last_modified else '',
+        portfolio_name,
+        description,
+    ]
+    return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+def report_cache_key(scope, fingerprint):
+    return f'stocks:report:{scope}:{fingerprint}'
+
+
+def get_or_render_report(key, render):
+    """
+    Return the cached report for ``key``, rendering it with ``render()`` on a miss.
+
+    Concurrent misses for the same key are coalesced: the first worker takes
+    a lock via ``cache.add`` and renders, the others poll the cache until the
+    result appears. If the lock holder dies or times out, waiters fall back to
+    rendering the report themselves.
+    """
+    content = cache.get(key)
+    if content is not None:
+        return content
+
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, REPORT_LOCK_TIMEOUT):
+        try:
+            content = render()
+            cache.set(key, content, REPORT_CACHE_TIMEOUT)
+        finally:
+            cache.delete(lock_key)
+        return content
+
+    deadline = time.monotonic() + REPORT_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(REPORT_LOCK_POLL_INTERVAL)
+        locked = cache.get(lock_key) is not None
+        content = cache.get(key)
+        if content is not None:
+            return content
+        if not locked:
+            # The lock holder finished without storing a result (it failed).
+            break
+
+    return render()
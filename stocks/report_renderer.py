@@ -0,0 +1,550 @@
+"""
+Precompiled HTML renderer for portfolio reports.
+
+The static document head (about 300 lines of CSS) and closing markup are
+encoded to bytes once at import time. Rows are rendered with a single
+precompiled ``str.format`` template per row that formats the already
+quantized ``Decimal`` values inline, instead of calling ``format_number``
+for every cell.
+"""
+from decimal import Decimal
+
+DOCUMENT_HEAD = """<!DOCTYPE html>
+    <html lang="en">
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>Stock Portfolio Report</title>
+        <style>
+            * {
+                margin: 0;
+                padding: 0;
+                box-sizing: border-box;
+            }
+            body {
+                font-family: Arial, sans-serif;
+                background-color: #f5f5f5;
+                width: 100%;
+                overflow-x: hidden;
+            }
+            .container {
+                width: 100%;
+                background-color: white;
+                padding: 15px;
+            }
+            .header {
+                margin-bottom: 20px;
+                padding-bottom: 15px;
+                
+            }
+            .portfolio-title {
+                font-size: 18px;
+                color: #331866;
+                margin-bottom: 8px;
+                font-weight: bold;
+                word-break: break-word;
+            }
+            .portfolio-description {
+                font-size: 14px;
+                color: #666;
+                margin-bottom: 5px;
+                line-height: 1.4;
+                word-break: break-word;
+            }
+            .date {
+                font-size: 12px;
+                color: #999;
+                text-align: right;
+            }
+            table {
+                width: 100%;
+                border-collapse: collapse;
+                table-layout: fixed;
+            }
+            th {
+                background-color: #331866;
+                color: white;
+                padding: 10px 4px;
+                text-align: center;
+                font-weight: bold;
+                border: 1px solid #444;
+                font-size: 10px;
+                word-wrap: break-word;
+                overflow-wrap: break-word;
+                line-height: 1.2;
+            }
+            td {
+                padding: 8px 4px;
+                text-align: right;
+                border: 1px solid #ddd;
+                font-size: 10px;
+                word-wrap: break-word;
+                overflow-wrap: break-word;
+                line-height: 1.2;
+            }
+            .symbol {
+                text-align: left;
+                font-weight: bold;
+                color: #0d6efd;
+            }
+            tr:nth-child(even) {
+                background-color: #f9f9f9;
+            }
+            .total-row {
+                background-color: #e8f4f8 !important;
+                font-weight: bold;
+                border-top: 2px solid #333;
+            }
+            .total-row td {
+                font-weight: bold;
+            }
+            .positive {
+                color: #28a745;
+            }
+            .negative {
+                color: #dc3545;
+            }
+            .cell-color {
+                text-align: center;
+                color: #3B3B3D;
+            }
+            .ltp {
+                color: #0d6efd;
+            }
+            .unrealised {
+                color: #28a745;
+            }
+            
+            /* Set specific column widths for better fit */
+            th:nth-child(1), td:nth-child(1) { /* SYMBOL */
+                width: 8%;
+                min-width: 60px;
+                max-width: 80px;
+            }
+            th:nth-child(2), td:nth-child(2) { /* TOTAL BUY QTY */
+                width: 6%;
+                min-width: 50px;
+            }
+            th:nth-child(3), td:nth-child(3) { /* TOTAL BUY VALUE */
+                width: 9%;
+                min-width: 60px;
+            }
+            th:nth-child(4), td:nth-child(4) { /* TOTAL SELL QTY */
+                width: 6%;
+                min-width: 50px;
+            }
+            th:nth-child(5), td:nth-child(5) { /* TOTAL SELL VALUE */
+                width: 9%;
+                min-width: 60px;
+            }
+            th:nth-child(6), td:nth-child(6) { /* BALANCE QTY */
+                width: 6%;
+                min-width: 50px;
+            }
+            th:nth-child(7), td:nth-child(7) { /* ACQUISITION COST */
+                width: 6%;
+                min-width: 60px;
+            }
+            th:nth-child(8), td:nth-child(8) { /* % HOLDING */
+                width: 5%;
+                min-width: 40px;
+            }
+            th:nth-child(9), td:nth-child(9) { /* LTP */
+                width: 5%;
+                min-width: 40px;
+            }
+            th:nth-child(10), td:nth-child(10) { /* CURRENT VALUE */
+                width: 7%;
+                min-width: 60px;
+            }
+            th:nth-child(11), td:nth-child(11) { /* REALISED PROFIT/LOSS */
+                width: 8%;
+                min-width: 70px;
+            }
+            th:nth-child(12), td:nth-child(12) { /* UN-REALISED PROFIT/LOSS */
+                width: 8%;
+                min-width: 70px;
+            }
+            th:nth-child(13), td:nth-child(13) { /* TOTAL PROFIT/LOSS */
+                width: 7%;
+                min-width: 60px;
+            }
+            th:nth-child(14), td:nth-child(14) { /* 52WK HIGH */
+                width: 6%;
+                min-width: 50px;
+            }
+            th:nth-child(15), td:nth-child(15) { /* 52WK LOW */
+                width: 6%;
+                min-width: 50px;
+            }
+            
+            /* Mobile-specific optimizations */
+            @media screen and (max-width: 768px) {
+                body {
+                    padding: 5px;
+                }
+                .container {
+                    padding: 8px;
+                }
+                .portfolio-title {
+                    font-size: 16px;
+                }
+                table {
+                    font-size: 9px;
+                }
+                th, td {
+                    padding: 6px 2px;
+                    font-size: 9px;
+                }
+                th {
+                    font-size: 9px;
+                    padding: 8px 2px;
+                }
+                
+                /* Shorter column headers for mobile */
+                th:nth-child(11):before { content: "R P/L"; }
+                th:nth-child(12):before { content: "UR P/L"; }
+                th:nth-child(13):before { content: "T P/L"; }
+                th:nth-child(14):before { content: "52H"; }
+                th:nth-child(15):before { content: "52L"; }
+                
+                th:nth-child(11) span,
+                th:nth-child(12) span,
+                th:nth-child(13) span,
+                th:nth-child(14) span,
+                th:nth-child(15) span {
+                    display: none;
+                }
+            }
+            
+            /* Tablet optimizations */
+            @media screen and (min-width: 769px) and (max-width: 1024px) {
+                body {
+                    padding: 10px;
+                }
+                .container {
+                    padding: 15px;
+                }
+                table {
+                    font-size: 10px;
+                }
+                th, td {
+                    padding: 8px 3px;
+                    font-size: 10px;
+                }
+            }
+            
+            /* Desktop */
+            @media screen and (min-width: 1025px) {
+                body {
+                    padding: 20px;
+                }
+                .container {
+                    max-width: 1800px;
+                    margin: 0 auto;
+                    padding: 25px;
+                    box-shadow: 0 0 10px rgba(0,0,0,0.1);
+                }
+                table {
+                    font-size: 11px;
+                }
+                th, td {
+                    padding: 10px 5px;
+                    font-size: 11px;
+                }
+                
+                /* Show full column headers on desktop */
+                th:nth-child(11):before,
+                th:nth-child(12):before,
+                th:nth-child(13):before,
+                th:nth-child(14):before,
+                th:nth-child(15):before {
+                    display: none;
+                }
+                th:nth-child(11) span,
+                th:nth-child(12) span,
+                th:nth-child(13) span,
+                th:nth-child(14) span,
+                th:nth-child(15) span {
+                    display: inline;
+                }
+            }
+            
+            /* Very small phones */
+            @media screen and (max-width: 480px) {
+                body {
+                    padding: 2px;
+                }
+                .container {
+                    padding: 5px;
+                }
+                table {
+                    font-size: 8px;
+                }
+                th, td {
+                    padding: 4px 1px;
+                    font-size: 8px;
+                }
+                th {
+                    padding: 6px 1px;
+                }
+                
+                /* Even shorter headers for very small screens */
+                th:nth-child(3):before { content: "B VAL"; }
+                th:nth-child(5):before { content: "S VAL"; }
+                th:nth-child(7):before { content: "ACQ"; }
+                th:nth-child(10):before { content: "C VAL"; }
+                
+                th:nth-child(3) span,
+                th:nth-child(5) span,
+                th:nth-child(7) span,
+                th:nth-child(10) span {
+                    display: none;
+                }
+            }
+            
+            /* Print styles */
+            @media print {
+                body {
+                    background-color: white;
+                    padding: 0;
+                    margin: 0;
+                }
+                .container {
+                    box-shadow: none;
+                    padding: 10px;
+                    width: 100%;
+                }
+                table {
+                    width: 100%;
+                    font-size: 8pt;
+                }
+                th, td {
+                    padding: 4px 2px;
+                    border: 1px solid #000;
+                }
+            }
+        </style>
+    </head>
+    <body>
+        <div class="container">""".encode('utf-8')
+
+DOCUMENT_END = """
+        </div>
+    </body>
+    </html>""".encode('utf-8')
+
+# Vertical gap between portfolio sections in a batch report.
+SECTION_SPACER = """
+            <div style="height:30px"></div>""".encode('utf-8')
+
+_SECTION_HEAD = """
+            <div class="header">
+                <div>CURRENT PORTFOLIO: {portfolio_name}</div>
+                <div style="text-align:right">{description}</div>
+            </div>
+            
+            <table>
+                <thead>
+                    <tr>
+                        <th>SYMBOL</th>
+                        <th>TOTAL BUY QTY</th>
+                        <th><span>TOTAL BUY VALUE</span></th>
+                        <th>TOTAL SELL QTY</th>
+                        <th><span>TOTAL SELL VALUE</span></th>
+                        <th>BALANCE QTY</th>
+                        <th><span>ACQUISITION COST</span></th>
+                        <th>% HOLDING</th>
+                        <th>LTP</th>
+                        <th><span>CURRENT VALUE</span></th>
+                        <th><span>REALISED PROFIT/ LOSS</span></th>
+                        <th><span>UN-REALISED PROFIT/ LOSS</span></th>
+                        <th><span>TOTAL PROFIT/ LOSS</span></th>
+                        <th><span>52WK HIGH</span></th>
+                        <th><span>52WK LOW</span></th>
+                    </tr>
+                </thead>
+                <tbody>""".format
+
+_ROW = """
+                    <tr>
+                        <td class="symbol">{0}</td>
+                        <td class="cell-color">{1:,}</td>
+                        <td class="cell-color">{2:,.2f}</td>
+                        <td class="cell-color">{3:,}</td>
+                        <td class="cell-color">{4:,.2f}</td>
+                        <td class="cell-color">{5:,}</td>
+                        <td class="cell-color">{6:,.2f}</td>
+                        <td class="cell-color">{7:,.2f}</td>
+                        <td style="text-align:center" class="ltp">{8:,.2f}</td>
+                        <td class="cell-color">{9:,.2f}</td>
+                        <td class="cell-color">{10}{11:,.2f}</td>
+                        <td class="cell-color unrealised">{12:,.2f}</td>
+                        <td style="text-align:center" class="{13}">{10}{14:,.2f}</td>
+                        <td class="cell-color">{15:,.2f}</td>
+                        <td class="cell-color">{16:,.2f}</td>
+                    </tr>""".format
+
+_SECTION_FOOTER = """
+                    <tr class="total-row">
+                        <td class="symbol">TOTAL</td>
+                        <td style="text-align: center">{0:,}</td>
+                        <td style="text-align: center">{1:,.2f}</td>
+                        <td style="text-align: center">{2:,}</td>
+                        <td style="text-align: center">{3:,.2f}</td>
+                        <td style="text-align: center">{4:,}</td>
+                        <td style="text-align: center">{5:,.2f}</td>
+                        <td></td>
+                        <td></td>
+                        <td style="text-align: center">{6:,.2f}</td>
+                        <td style="text-align: center">{7}{8:,.2f}</td>
+                        <td style="text-align: center" class="unrealised">{9:,.2f}</td>
+                        <td style="text-align: center" class="{10}">{7}{11:,.2f}</td>
+                        <td></td>
+                        <td></td>
+                    </tr>
+                </tbody>
+            </table>""".format
+
+ZERO = Decimal('0.00')
+
+# Columns read by the row renderer; fetch them with a single values() query.
+REPORT_ROW_FIELDS = (
+    'symbol',
+    'total_buy_qty',
+    'total_buy_value',
+    'total_sell_qty',
+    'total_sell_value',
+    'balance_qty',
+    'acquisition_cost',
+    'percent_holding',
+    'ltp',
+    'current_value',
+    'unrealised_profit_loss',
+    'wk_52_high',
+    'wk_52_low',
+)
+
+# Totals used for a portfolio section that has no trades.
+EMPTY_REPORT_TOTALS = {
+    'total_buy_qty': 0,
+    'total_buy_value': ZERO,
+    'total_sell_qty': 0,
+    'total_sell_value': ZERO,
+    'total_realised_profit_loss': ZERO,
+    'total_acquisition_cost': ZERO,
+    'total_current_value': ZERO,
+    'total_unrealised_profit_loss': ZERO,
+}
+
+
+def render_section_head(portfolio_name, description):
+    """Render a portfolio header and table, up to the opening <tbody>"""
+    return _SECTION_HEAD(
+        portfolio_name=portfolio_name.upper(),
+        description=description,
+    ).encode('utf-8')
+
+
+def render_row(row):
+    """Render a single <tr> from a ``values(*REPORT_ROW_FIELDS)`` row"""
+    buy_qty = row['total_buy_qty']
+    sell_qty = row['total_sell_qty']
+
+    # Average-cost realised profit/loss of the sold quantity
+    if buy_qty > 0 and sell_qty > 0:
+        realised_pl = row['total_sell_value'] - row['total_buy_value'] / buy_qty * sell_qty
+    else:
+        realised_pl = ZERO
+
+    unrealised_pl = row['unrealised_profit_loss']
+    total_pl = realised_pl + unrealised_pl
+    if total_pl >= 0:
+        profit_sign, profit_class = "+", "positive"
+    else:
+        profit_sign, profit_class = "", "negative"
+
+    return _ROW(
+        row['symbol'],
+        buy_qty,
+        row['total_buy_value'],
+        sell_qty,
+        row['total_sell_value'],
+        row['balance_qty'],
+        row['acquisition_cost'],
+        row['percent_holding'],
+        row['ltp'],
+        row['current_value'],
+        profit_sign,
+        realised_pl,
+        unrealised_pl,
+        profit_class,
+        total_pl,
+        row['wk_52_high'],
+        row['wk_52_low'],
+    )
+
+
+def render_rows(rows, chunk_size):
+    """Render report rows, yielding UTF-8 chunks of ``chunk_size`` rows"""
+    chunk = []
+    for row in rows:
+        chunk.append(render_row(row))
+        if len(chunk) >= chunk_size:
+            yield "".join(chunk).encode('utf-8')
+            chunk = []
+
+    if chunk:
+        yield "".join(chunk).encode('utf-8')
+
+
+def render_section_footer(totals):
+    """Render the totals row and close the table"""
+    total_realised_profit_loss = totals['total_realised_profit_loss']
+    total_unrealised_pl = totals['total_unrealised_profit_loss']
+    total_profit_loss = total_realised_profit_loss + total_unrealised_pl
+    if total_profit_loss >= 0:
+        profit_sign, profit_class = "+", "positive"
+    else:
+        profit_sign, profit_class = "", "negative"
+
+    return _SECTION_FOOTER(
+        totals['total_buy_qty'],
+        totals['total_buy_value'],
+        totals['total_sell_qty'],
+        totals['total_sell_value'],
+        totals['total_buy_qty'] - totals['total_sell_qty'],
+        totals['total_acquisition_cost'],
+        totals['total_current_value'],
+        profit_sign,
+        total_realised_profit_loss,
+        total_unrealised_pl,
+        profit_class,
+        total_profit_loss,
+    ).encode('utf-8')
+
+
+def iter_report(rows, totals, portfolio_name, description, chunk_size):
+    """Yield a single-portfolio report as UTF-8 byte chunks"""
+    yield DOCUMENT_HEAD
+    yield render_section_head(portfolio_name, description)
+    yield from render_rows(rows, chunk_size)
+    yield render_section_footer(totals)
+    yield DOCUMENT_END
+
+
+def iter_batch_report(sections, chunk_size):
+    """
+    Yield a multi-portfolio report as UTF-8 byte chunks.
+
+    ``sections`` yields ``(portfolio_name, description, rows, totals)``
+    tuples; each is rendered as its own table.
+    """
+    yield DOCUMENT_HEAD
+    for index, (portfolio_name, description, rows, totals) in enumerate(sections):
+        if index:
+            yield SECTION_SPACER
+        yield render_section_head(portfolio_name, description)
+        yield from render_rows(rows, chunk_size)
+        yield render_section_footer(totals)
+    yield DOCUMENT_END
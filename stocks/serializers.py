@@ -1,15 +1,45 @@
+from django.utils import timezone
+from django.utils.functional import cached_property
 from rest_framework import serializers
-from .models import StockTrade, Portfolio
+from .models import StockTrade, Portfolio, PortfolioSummary, Trade
 from decimal import Decimal
 
 
+class PortfolioSummarySerializer(serializers.ModelSerializer):
+    """Serializer for the incrementally maintained PortfolioSummary"""
+
+    class Meta:
+        model = PortfolioSummary
+        fields = [
+            'position_count',
+            'total_buy_qty',
+            'total_buy_value',
+            'total_sell_qty',
+            'total_sell_value',
+            'realised_profit_loss',
+            'total_acquisition_cost',
+            'total_current_value',
+            'unrealised_profit_loss',
+            'updated_at',
+        ]
+        read_only_fields = fields
+
+
 class PortfolioSerializer(serializers.ModelSerializer):
     """Serializer for Portfolio model"""
+    summary = PortfolioSummarySerializer(read_only=True)
 
     class Meta:
         model = Portfolio
-        fields = ['id', 'name', 'description', 'created_at']
-        read_only_fields = ['id', 'created_at']
+        fields = ['id', 'name', 'description', 'created_at', 'summary']
+        read_only_fields = ['id', 'created_at', 'summary']
+
+    def __init__(self, *args, fields=None, **kwargs):
+        # ``fields``: output only these (see stocks.fieldsets)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
 
 
 class StockTradeSerializer(serializers.ModelSerializer):
@@ -21,6 +51,10 @@ class StockTradeSerializer(serializers.ModelSerializer):
     )
     portfolio_name = serializers.SerializerMethodField(read_only=True)
     portfolio_id = serializers.IntegerField(source='portfolio.id', read_only=True)  # Add this
+    # Generated columns; declared so they render like the other decimals
+    total_buy_value = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    total_sell_value = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    realised_profit_loss = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
 
     class Meta:
         model = StockTrade
@@ -39,6 +73,9 @@ class StockTradeSerializer(serializers.ModelSerializer):
             'percent_holding',
             'current_value',
             'realised_profit_loss',
+            'booked_profit_loss',
+            'unrealised_profit_loss',
+            'total_profit_loss',
             'wk_52_high',
             'wk_52_low',
             'portfolio',  # This is write-only
@@ -57,6 +94,9 @@ class StockTradeSerializer(serializers.ModelSerializer):
             'percent_holding',
             'current_value',
             'realised_profit_loss',
+            'booked_profit_loss',
+            'unrealised_profit_loss',
+            'total_profit_loss',
             'date_time_field',
             'created_at',
             'updated_at',
@@ -67,6 +107,10 @@ class StockTradeSerializer(serializers.ModelSerializer):
     def get_portfolio_name(self, obj):
         return obj.portfolio.name if obj.portfolio else None
 
+    def validate_symbol(self, value):
+        # Before the (portfolio, symbol) unique check, which compares stored values
+        return value.upper()
+
     def validate(self, attrs):
         """Validate the data and quantize decimals"""
         # Check if portfolio is provided during creation
@@ -107,4 +151,149 @@ class StockTradeSerializer(serializers.ModelSerializer):
             setattr(instance, attr, value)
         
         instance.save()
-        return instance
\ No newline at end of file
+        return instance
+
+class StockTradeReadSerializer(serializers.BaseSerializer):
+    """
+    Read-only serializer producing the same output as StockTradeSerializer
+    from ``values()`` rows (see ``values``), with the portfolio name joined
+    in the same query. Fields are formatted directly instead of through
+    each DRF field's ``to_representation``; used by list and retrieve.
+    """
+    # Output keys in StockTradeSerializer order ('portfolio' is write-only)
+    fields = [field for field in StockTradeSerializer.Meta.fields if field != 'portfolio']
+    decimal_fields = frozenset([
+        'buy_price',
+        'total_buy_value',
+        'sell_price',
+        'total_sell_value',
+        'ltp',
+        'acquisition_cost',
+        'percent_holding',
+        'current_value',
+        'realised_profit_loss',
+        'booked_profit_loss',
+        'unrealised_profit_loss',
+        'total_profit_loss',
+        'wk_52_high',
+        'wk_52_low',
+    ])
+    datetime_fields = frozenset(['created_at', 'updated_at'])
+
+    def __init__(self, *args, fields=None, **kwargs):
+        # ``fields``: output only these (see stocks.fieldsets)
+        super().__init__(*args, **kwargs)
+        self.selected_fields = fields
+
+    @classmethod
+    def values(cls, queryset, fields=None):
+        """
+        Restrict ``queryset`` to the columns this serializer reads for
+        ``fields`` (default all). ``id``, ``created_at`` and the ordering
+        columns are always fetched, as keyset pagination needs them.
+        """
+        columns = {'id': None, 'created_at': None}
+        columns.update(
+            (name.lstrip('-'), None) for name in queryset.query.order_by if isinstance(name, str)
+        )
+        columns.update((column, None) for _, column, _ in cls._layout(fields))
+        return queryset.values(*columns)
+
+    @classmethod
+    def _layout(cls, fields=None):
+        """``(output key, values() column, kind)`` for every output field"""
+        return [
+            (
+                field,
+                'portfolio__name' if field == 'portfolio_name' else field,
+                'decimal' if field in cls.decimal_fields
+                else 'datetime' if field in cls.datetime_fields
+                else None,
+            )
+            for field in cls.fields
+            if fields is None or field in fields
+        ]
+
+    @cached_property
+    def _bound_layout(self):
+        # Shared by every row when many=True; the child instance serves the list
+        return self._layout(self.selected_fields), timezone.get_current_timezone()
+
+    def to_representation(self, row):
+        layout, tz = self._bound_layout
+        data = {}
+        for field, column, kind in layout:
+            value = row[column]
+            if value is None:
+                if field == 'portfolio_id':
+                    # The 'portfolio.id' source is skipped without a portfolio
+                    continue
+            elif kind == 'decimal':
+                value = f'{value:.2f}'
+            elif kind == 'datetime':
+                value = value.astimezone(tz).isoformat()
+                if value.endswith('+00:00'):
+                    value = value[:-6] + 'Z'
+            data[field] = value
+        return data
+
+
+class StockTradeIngestSerializer(serializers.ModelSerializer):
+    """
+    Input validation for bulk ingestion.
+
+    Only the user-supplied columns are accepted; derived fields are computed
+    by ``StockTrade.objects.bulk_ingest``. Symbols are upserted, so the
+    unique validator on ``symbol`` is dropped.
+    """
+    portfolio_id = serializers.IntegerField()
+
+    class Meta:
+        model = StockTrade
+        fields = [
+            'symbol',
+            'total_buy_qty',
+            'buy_price',
+            'total_sell_qty',
+            'sell_price',
+            'ltp',
+            'wk_52_high',
+            'wk_52_low',
+            'portfolio_id',
+        ]
+        extra_kwargs = {'symbol': {'validators': []}}
+
+    def validate_symbol(self, value):
+        return value.upper()
+
+
+class TradeSerializer(serializers.ModelSerializer):
+    """Serializer for ledger fills"""
+    portfolio_id = serializers.PrimaryKeyRelatedField(
+        source='portfolio',
+        queryset=Portfolio.objects.all(),
+    )
+
+    class Meta:
+        model = Trade
+        fields = ['id', 'portfolio_id', 'symbol', 'side', 'quantity', 'price', 'executed_at', 'created_at']
+        read_only_fields = ['id', 'created_at']
+        extra_kwargs = {'executed_at': {'required': False}}
+
+    def validate_symbol(self, value):
+        return value.upper()
+
+
+class PriceUpdateSerializer(serializers.Serializer):
+    """One entry of a bulk last-traded-price update"""
+    symbol = serializers.CharField(max_length=50)
+    ltp = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0'))
+    wk_52_high = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=Decimal('0'), required=False
+    )
+    wk_52_low = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=Decimal('0'), required=False
+    )
+
+    def validate_symbol(self, value):
+        return value.upper()
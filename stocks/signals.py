@@ -0,0 +1,43 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Portfolio, PortfolioSummary, StockTrade, position_totals
+from .events import broadcaster
+from .valuation import schedule_revaluation
+
+
+@receiver(post_save, sender=Portfolio)
+def create_portfolio_summary(sender, instance, created, raw=False, **kwargs):
+    """Give every new portfolio an empty summary row"""
+    if created and not raw:
+        PortfolioSummary.objects.get_or_create(portfolio=instance)
+
+
+@receiver(post_save, sender=StockTrade)
+def revalue_saved_position(sender, instance, raw=False, using=None, **kwargs):
+    """Refresh portfolio weights and valuation totals once the save commits"""
+    if raw:
+        return
+    previous_portfolio_id = getattr(instance, '_previous_portfolio_id', None)
+    schedule_revaluation({instance.portfolio_id, previous_portfolio_id}, using=using)
+    if previous_portfolio_id not in (None, instance.portfolio_id):
+        broadcaster.notify_on_commit((), removed={previous_portfolio_id: [instance.pk]}, using=using)
+
+
+@receiver(post_delete, sender=StockTrade)
+def remove_position_from_summary(sender, instance, origin=None, using=None, **kwargs):
+    """Subtract a deleted position, unless its whole portfolio is being deleted"""
+    if isinstance(origin, Portfolio) or getattr(origin, 'model', None) is Portfolio:
+        return
+    PortfolioSummary.objects.apply_delta(
+        instance.portfolio_id,
+        old=position_totals(
+            instance.total_buy_qty,
+            instance.total_buy_value,
+            instance.total_sell_qty,
+            instance.total_sell_value,
+        ),
+    )
+    schedule_revaluation({instance.portfolio_id}, using=using)
+    if instance.portfolio_id is not None:
+        broadcaster.notify_on_commit((), removed={instance.portfolio_id: [instance.pk]}, using=using)
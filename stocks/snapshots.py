@@ -0,0 +1,66 @@
+"""
+Immutable, precompressed report snapshots.
+
+A snapshot is a rendered report written once to a content-addressed file
+(``report-<scope>.<hash>.html``) next to ``.gz`` and ``.br`` variants. The
+hash in the name means a snapshot never changes, so the files can be served
+by WhiteNoise or a reverse proxy with far-future cache headers, without
+going through Django or the database.
+"""
+import gzip
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+import brotli
+from django.conf import settings
+
+SNAPSHOT_ROOT = Path(getattr(settings, 'STOCKS_SNAPSHOT_ROOT', settings.BASE_DIR / 'snapshots'))
+SNAPSHOT_URL = getattr(settings, 'STOCKS_SNAPSHOT_URL', '/snapshots/')
+
+# 12 hex characters matches WhiteNoise's default immutable-file pattern
+# (``name.<12 hex>.ext``), so it serves snapshots with a one-year max-age.
+SNAPSHOT_HASH_LENGTH = 12
+
+
+def _write_once(path, content):
+    """Atomically write ``content`` to ``path`` unless it already exists"""
+    if path.exists():
+        return
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(content)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def write_snapshot(scope, content):
+    """
+    Write the rendered report bytes ``content`` as an immutable snapshot
+    for ``scope``.
+
+    Publishing identical content again is a no-op that returns the same
+    name and URL.
+    """
+    digest = hashlib.sha256(content).hexdigest()
+    name = f'report-{scope}.{digest[:SNAPSHOT_HASH_LENGTH]}.html'
+
+    SNAPSHOT_ROOT.mkdir(parents=True, exist_ok=True)
+    path = SNAPSHOT_ROOT / name
+    _write_once(path, content)
+    # mtime=0 keeps the gzip bytes deterministic for identical content.
+    _write_once(path.with_name(name + '.gz'), gzip.compress(content, compresslevel=9, mtime=0))
+    _write_once(path.with_name(name + '.br'), brotli.compress(content, mode=brotli.MODE_TEXT))
+
+    return {
+        'name': name,
+        'url': f'{SNAPSHOT_URL}{name}',
+        'sha256': digest,
+        'size': len(content),
+        'encodings': ['identity', 'gzip', 'br'],
+    }
@@ -1,3 +1,865 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import brotli
+import numpy as np
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Q
+from django.http import QueryDict
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from .events import Broadcaster, LocalChannel, _ThreadSubscription, broadcaster
+from .extremes import RollingExtremes, tracker
+from .fieldsets import FieldSelectionError, select_fields
+from .filters import ORDERING_FIELDS, StockTradeFilterBackend
+from .history import (
+    HISTORY_TIMEZONE, MinuteBarBuffer, decode_bars, encode_bars, merge_bar, query_bars, record_prices,
+)
+from .management.commands.benchmark_report import legacy_render_rows, make_rows
+from .models import Lot, Portfolio, PortfolioSummary, PriceBlock, StockTrade, Trade
+from .positions import AVERAGE, FIFO, PositionError, record_fill, replay_trades
+from .renderers import ORJSONRenderer
+from .report_cache import get_or_render_report, report_cache_key
+from .report_renderer import (
+    DOCUMENT_END, DOCUMENT_HEAD, REPORT_ROW_FIELDS, SECTION_SPACER, render_rows, render_section_footer,
+)
+from .serializers import StockTradeReadSerializer, StockTradeSerializer
+from .ticks import MAX_PRICE, TickCoalescer, TickError, _write_batch, parse_tick
+from .valuation import correct_positions, revalue_symbols, value_positions
+from .views import StockTradeViewSet
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plan assertions use SQLite EXPLAIN QUERY PLAN output')
+class StockTradeQueryPlanTests(TestCase):
+    """Hot per-portfolio queries must be served by an index, not a scan + sort"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.portfolio = Portfolio.objects.create(name='Plans')
+        other = Portfolio.objects.create(name='Other')
+        for portfolio in (cls.portfolio, other):
+            for symbol in ('TCS', 'INFY', 'HDFC'):
+                StockTrade.objects.create(
+                    symbol=symbol,
+                    total_buy_qty=10,
+                    buy_price=Decimal('100.00'),
+                    portfolio=portfolio,
+                )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def assertIndexedPlan(self, queryset, index_name=None):
+        plan = queryset.explain()
+        self.assertRegex(plan, r'SEARCH stocks_stocktrade USING (COVERING )?INDEX')
+        self.assertNotIn('TEMP B-TREE', plan)
+        if index_name:
+            self.assertIn(index_name, plan)
+        return plan
+
+    def test_report_rows_use_portfolio_symbol_index(self):
+        queryset = (
+            StockTrade.objects.filter(portfolio=self.portfolio)
+            .order_by('symbol')
+            .values(*REPORT_ROW_FIELDS)
+        )
+        plan = self.assertIndexedPlan(queryset)
+        self.assertIn('portfolio_id=?', plan)
+
+    def test_latest_trades_use_portfolio_created_index(self):
+        queryset = StockTrade.objects.filter(portfolio=self.portfolio).order_by('-created_at')
+        self.assertIndexedPlan(queryset, 'stocks_trade_pf_created_idx')
+
+    def test_keyset_page_uses_created_id_index(self):
+        boundary = StockTrade.objects.order_by('-created_at', '-id')[2]
+        queryset = (
+            StockTrade.objects.filter(
+                Q(created_at__lt=boundary.created_at) | Q(id__lt=boundary.id),
+                created_at__lte=boundary.created_at,
+            )
+            .order_by('-created_at', '-id')[:100]
+        )
+        plan = self.assertIndexedPlan(queryset, 'stocks_trade_created_id_idx')
+        self.assertIn('created_at<?', plan)
+
+    def filtered(self, query):
+        request = Request(APIRequestFactory().get('/', query))
+        queryset = StockTrade.objects.order_by('-created_at', '-id')
+        return StockTradeFilterBackend().filter_queryset(request, queryset, None)[:100]
+
+    def test_list_filters_search_an_index(self):
+        for query in (
+            {'portfolio_id': self.portfolio.id},
+            {'symbol': 'tcs'},
+            {'symbol_prefix': 'IN'},
+            {'ltp_min': '10', 'ltp_max': '20', 'ordering': 'ltp'},
+            {'realised_profit_loss_min': '0.01', 'ordering': '-realised_profit_loss'},
+            {'updated_since': '2020-01-01', 'updated_before': '2020-02-01', 'ordering': 'updated_at'},
+        ):
+            with self.subTest(query=query):
+                plan = self.filtered(query).explain()
+                self.assertRegex(plan, r'SEARCH stocks_stocktrade USING (COVERING )?INDEX')
+                self.assertNotRegex(plan, r'SCAN stocks_stocktrade(?! USING)')
+
+    def test_portfolio_filter_follows_keyset_order(self):
+        plan = self.filtered({'portfolio_id': self.portfolio.id}).explain()
+        self.assertIn('stocks_trade_pf_created_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_list_orderings_follow_an_index(self):
+        for field in ORDERING_FIELDS:
+            for ordering in (field, f'-{field}'):
+                with self.subTest(ordering=ordering):
+                    plan = self.filtered({'ordering': ordering}).explain()
+                    self.assertRegex(plan, r'stocks_stocktrade USING (COVERING )?INDEX')
+                    self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_by_symbol_within_portfolio_uses_unique_index(self):
+        queryset = StockTrade.objects.filter(portfolio=self.portfolio, symbol='TCS')
+        plan = self.assertIndexedPlan(queryset)
+        self.assertIn('portfolio_id=? AND symbol=?', plan)
+
+    def test_by_symbol_across_portfolios_uses_symbol_index(self):
+        plan = self.assertIndexedPlan(StockTrade.objects.filter(symbol='TCS').order_by())
+        self.assertIn('symbol=?', plan)
+
+    def test_symbol_is_unique_per_portfolio(self):
+        self.assertEqual(StockTrade.objects.filter(symbol='TCS').count(), 2)
+
+
+class StockTradeReadSerializerTests(TestCase):
+    def test_matches_model_serializer(self):
+        portfolio = Portfolio.objects.create(name='Read')
+        StockTrade.objects.create(
+            symbol='TCS', total_buy_qty=10, buy_price=Decimal('3500.50'), total_sell_qty=4,
+            sell_price=Decimal('3700.25'), ltp=Decimal('3800'), portfolio=portfolio,
+        )
+        StockTrade.objects.create(symbol='INFY', total_buy_qty=5, buy_price=Decimal('12.34'))
+        queryset = StockTrade.objects.order_by('id')
+
+        self.assertEqual(
+            JSONRenderer().render(StockTradeReadSerializer(StockTradeReadSerializer.values(queryset), many=True).data),
+            JSONRenderer().render(StockTradeSerializer(queryset, many=True).data),
+        )
+
+    def test_orjson_renderer_matches_json_renderer_on_payload(self):
+        StockTrade.objects.create(
+            symbol='TCS', total_buy_qty=10, buy_price=Decimal('3500.50'), total_sell_qty=4,
+            sell_price=Decimal('3700.25'), ltp=Decimal('3800'),
+        )
+        trades = StockTradeSerializer(StockTrade.objects.all(), many=True).data
+        for extra in ([], [1e16, 1.5e16, 0.0001], [1e-05], [-1.234e-05, 0.5], [1.5e-07], [Decimal('0.00001')]):
+            with self.subTest(extra=extra):
+                payload = {'message': 'Stock trades retrieved', 'data': trades, 'extra': extra}
+                self.assertEqual(ORJSONRenderer().render(payload), JSONRenderer().render(payload))
+
+        for value in (Decimal('NaN'), Decimal('Infinity')):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                ORJSONRenderer().render({'data': trades, 'extra': value})
+        # Documented difference: JSONRenderer rejects float NaN, orjson writes null
+        with self.assertRaises(ValueError):
+            JSONRenderer().render({'extra': float('nan')})
+        self.assertEqual(ORJSONRenderer().render({'extra': float('nan')}), b'{"extra":null}')
+
+    def test_sparse_fields_narrow_projection_and_output(self):
+        StockTrade.objects.create(symbol='TCS', total_buy_qty=10, buy_price=Decimal('3500.50'))
+        fields = select_fields(QueryDict('fields=symbol,ltp&exclude=ltp'), StockTradeReadSerializer.fields)
+        queryset = StockTradeReadSerializer.values(StockTrade.objects.all(), fields)
+
+        self.assertEqual(set(queryset.query.values_select), {'id', 'created_at', 'symbol'})
+        self.assertEqual(StockTradeReadSerializer(queryset, many=True, fields=fields).data, [{'symbol': 'TCS'}])
+        with self.assertRaises(FieldSelectionError):
+            select_fields(QueryDict('fields=nope'), StockTradeReadSerializer.fields)
+
+
+class RendererTests(SimpleTestCase):
+    def test_orjson_matches_json_renderer(self):
+        data = {
+            'message': 'Line\u2028separator\u2029 \u00e9',
+            'price': Decimal('4100.50'),
+            'at': datetime(2025, 1, 2, 3, 4, 5, 123456, tzinfo=dt_timezone.utc),
+            'day': date(2025, 1, 2),
+            1: [None, True, 2.5],
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_precompiled_rows_match_legacy_loop(self):
+        rows = make_rows(500)
+        rows[0].update(unrealised_profit_loss=Decimal('-1234567.89'), total_sell_qty=0)
+        legacy = legacy_render_rows([SimpleNamespace(**row) for row in rows])
+        for chunk_size in (1, 7, 500):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(b''.join(render_rows(rows, chunk_size)), legacy)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(email='export@example.com', password='x'))
+
+    def test_invalid_filter_is_a_json_400(self):
+        for query in ('portfolio_id=abc', 'updated_since=soon'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/stocks/trades/export/?{query}')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response['Content-Type'], 'application/json')
+                self.assertIn('error', response.json())
+
+    def test_streams_csv(self):
+        StockTrade.objects.create(symbol='TCS', total_buy_qty=1, buy_price=Decimal('1.00'))
+        response = self.client.get('/api/stocks/trades/export/')
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        self.assertIn('TCS', b''.join(response.streaming_content).decode())
+
+
+class BulkIngestTests(TestCase):
+    def setUp(self):
+        self.portfolio = Portfolio.objects.create(name='Bulk')
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(email='bulk@example.com', password='x'))
+        self.rows = [
+            {'symbol': 'TCS', 'total_buy_qty': 10, 'buy_price': '100.00', 'portfolio_id': self.portfolio.id},
+            {'symbol': 'INFY', 'total_buy_qty': 5, 'buy_price': '50.00', 'portfolio_id': 999},
+            {'symbol': 'TCS', 'total_buy_qty': 1, 'buy_price': '1.00', 'portfolio_id': self.portfolio.id},
+        ]
+
+    def test_atomic_mode_rejects_batch_with_item_errors(self):
+        response = self.client.post('/api/stocks/trades/bulk/', self.rows, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.json()['errors']], [1, 2])
+        self.assertFalse(StockTrade.objects.exists())
+
+    def test_partial_mode_writes_valid_items(self):
+        response = self.client.post('/api/stocks/trades/bulk/?mode=partial', self.rows, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['count'], response.json()['failed']), (1, 2))
+        self.assertEqual(StockTrade.objects.get().total_buy_qty, 10)
+
+    def test_bulk_ingest_matches_per_row_save(self):
+        rows = [
+            {'symbol': 'tcs', 'total_buy_qty': 10, 'buy_price': Decimal('100.33'),
+             'total_sell_qty': 4, 'sell_price': Decimal('120.10'), 'ltp': Decimal('110.00')},
+            {'symbol': 'INFY', 'total_buy_qty': 7, 'buy_price': Decimal('51.15'), 'ltp': Decimal('49.99')},
+            {'symbol': 'HDFC', 'total_buy_qty': 3, 'buy_price': Decimal('10.00'),
+             'total_sell_qty': 3, 'sell_price': Decimal('9.50')},
+        ]
+        saved = Portfolio.objects.create(name='Saved')
+        ingested = Portfolio.objects.create(name='Ingested')
+        with self.captureOnCommitCallbacks(execute=True):
+            for row in rows:
+                StockTrade(portfolio=saved, **row).save()
+        # The endpoint pairs bulk_ingest with one revaluation for the weights
+        response = self.client.post(
+            '/api/stocks/trades/bulk/',
+            [{'portfolio_id': ingested.id, **row} for row in rows],
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+
+        ignored = {'id', 'portfolio', 'created_at', 'updated_at', 'date_time_field'}
+        fields = [field.attname for field in StockTrade._meta.concrete_fields if field.name not in ignored]
+        self.assertEqual(
+            list(StockTrade.objects.filter(portfolio=ingested).order_by('symbol').values(*fields)),
+            list(StockTrade.objects.filter(portfolio=saved).order_by('symbol').values(*fields)),
+        )
+        summary_fields = [
+            field.attname for field in PortfolioSummary._meta.concrete_fields
+            if field.name not in ('portfolio', 'updated_at')
+        ]
+        self.assertEqual(
+            PortfolioSummary.objects.filter(portfolio=ingested).values(*summary_fields).get(),
+            PortfolioSummary.objects.filter(portfolio=saved).values(*summary_fields).get(),
+        )
+
+
+class LookupTests(TestCase):
+    def setUp(self):
+        self.portfolio = Portfolio.objects.create(name='Long Term')
+        Portfolio.objects.create(name='Trading')
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(email='lookup@example.com', password='x'))
+
+    def test_symbols_are_stored_uppercase_and_fetched_in_one_query(self):
+        for symbol in ('tcs', 'Infy'):
+            StockTrade.objects.create(symbol=symbol, total_buy_qty=1, buy_price=Decimal('1.00'), portfolio=self.portfolio)
+
+        self.assertEqual(self.client.get('/api/stocks/trades/by_symbol/?symbol=tcs').json()['symbol'], 'TCS')
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/stocks/trades/by_symbol/?symbols=infy,tcs,WIPRO')
+        self.assertEqual([row['symbol'] for row in response.json()['data']], ['INFY', 'TCS'])
+        self.assertEqual(response.json()['missing'], ['WIPRO'])
+
+    def test_names_match_ignoring_case_through_lower_index(self):
+        response = self.client.get('/api/stocks/portfolios/by_name/?name=long term')
+        self.assertEqual(response.json()['id'], self.portfolio.id)
+
+        response = self.client.get('/api/stocks/portfolios/by_name/?names=TRADING&names=long term&names=Nope')
+        self.assertEqual(sorted(row['name'] for row in response.json()['data']), ['Long Term', 'Trading'])
+        self.assertEqual(response.json()['missing'], ['Nope'])
+
+        if connection.vendor == 'sqlite':
+            plan = Portfolio.objects.named('a', 'b').explain()
+            self.assertIn('stocks_pf_name_lower_idx', plan)
+
+
+class PositionMoveTests(TestCase):
+    def test_moving_a_position_revalues_both_portfolios(self):
+        source = Portfolio.objects.create(name='Source')
+        target = Portfolio.objects.create(name='Target')
+        with self.captureOnCommitCallbacks(execute=True):
+            trade = StockTrade.objects.create(
+                symbol='TCS', total_buy_qty=10, buy_price=Decimal('100.00'), ltp=Decimal('130.00'), portfolio=source,
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            trade.portfolio = target
+            trade.save()
+
+        summaries = {summary.portfolio_id: summary for summary in PortfolioSummary.objects.all()}
+        self.assertEqual(summaries[source.id].total_current_value, Decimal('0.00'))
+        self.assertEqual(summaries[target.id].total_current_value, Decimal('1300.00'))
+        expected = PortfolioSummary.objects.compute()
+        for portfolio_id, summary in summaries.items():
+            for field, value in expected[portfolio_id].items():
+                self.assertEqual(getattr(summary, field), value, field)
+
+
+class PortfolioEventTests(TestCase):
+    def setUp(self):
+        self.portfolio = Portfolio.objects.create(name='Events')
+
+    def listen(self, events, portfolio_id):
+        subscription = _ThreadSubscription(100)
+        events._subscribe(portfolio_id, subscription, None)
+        self.addCleanup(events._unsubscribe, portfolio_id, subscription)
+        events._snapshot(portfolio_id)
+        return subscription
+
+    def received(self, subscription):
+        payloads = []
+        while not subscription.queue.empty():
+            event = subscription.queue.get()
+            payloads.append(json.loads(event.split(b'data: ', 1)[1]))
+        return payloads
+
+    def create(self, symbol, portfolio):
+        return StockTrade.objects.create(
+            symbol=symbol, total_buy_qty=1, buy_price=Decimal('1.00'), portfolio=portfolio,
+        )
+
+    def test_move_sends_removed_event_to_old_portfolio(self):
+        trade = self.create('TCS', self.portfolio)
+        subscription = self.listen(broadcaster, self.portfolio.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            trade.portfolio = Portfolio.objects.create(name='Elsewhere')
+            trade.save()
+
+        removed = [id for payload in self.received(subscription) for id in payload['removed']]
+        self.assertEqual(removed, [trade.id])
+
+    def test_rows_committed_behind_the_watermark_are_sent_once(self):
+        events = Broadcaster(channel=LocalChannel())
+        subscription = self.listen(events, self.portfolio.id)
+        first = self.create('TCS', self.portfolio)
+        events.notify([self.portfolio.id])
+        # Stamped before the last event but committed after it
+        late = self.create('INFY', self.portfolio)
+        StockTrade.objects.filter(pk=late.pk).update(updated_at=first.updated_at - timedelta(seconds=1))
+        events.notify([self.portfolio.id])
+        events.notify([self.portfolio.id])
+
+        sent = [[row['id'] for row in payload['positions']] for payload in self.received(subscription)]
+        self.assertEqual(sent, [[first.id], [late.id]])
+
+
+class ExtremesTests(TestCase):
+    def setUp(self):
+        tracker.reset()
+        self.addCleanup(tracker.reset)
+        self.trade = StockTrade.objects.create(
+            symbol='TCS', total_buy_qty=1, buy_price=Decimal('1.00'),
+            wk_52_high=Decimal('200.00'), wk_52_low=Decimal('50.00'),
+        )
+
+    def extremes(self):
+        self.trade.refresh_from_db()
+        return self.trade.wk_52_high, self.trade.wk_52_low
+
+    def test_short_history_only_widens_stored_values(self):
+        record_prices({'TCS': Decimal('130.00')}, time.time())
+        self.assertEqual(self.extremes(), (Decimal('200.00'), Decimal('50.00')))
+
+        record_prices({'TCS': Decimal('250.00')}, time.time())
+        self.assertEqual(self.extremes(), (Decimal('250.00'), Decimal('50.00')))
+
+    def test_full_window_of_history_replaces_stored_values(self):
+        record_prices({'TCS': Decimal('90.00')}, time.time() - 400 * 86400)
+        tracker.reset()
+        record_prices({'TCS': Decimal('130.00')}, time.time())
+        self.assertEqual(self.extremes(), (Decimal('130.00'), Decimal('130.00')))
+
+    def test_backfill_only_widens_for_short_history(self):
+        record_prices({'TCS': Decimal('130.00')}, time.time())
+        as_of = timezone.now().astimezone(HISTORY_TIMEZONE).date()
+        call_command('backfill_52_week', '--as-of', as_of.isoformat(), stdout=io.StringIO())
+        self.assertEqual(self.extremes(), (Decimal('200.00'), Decimal('50.00')))
+
+        record_prices({'TCS': Decimal('90.00')}, time.time() - 400 * 86400)
+        call_command('backfill_52_week', '--as-of', as_of.isoformat(), stdout=io.StringIO())
+        self.assertEqual(self.extremes(), (Decimal('130.00'), Decimal('130.00')))
+
+    def test_rolling_window_drops_days_that_leave_it(self):
+        window = RollingExtremes(timedelta(days=3))
+        for day, high, low in ((1, 10, 5), (2, 8, 6), (3, 9, 7), (4, 7, 7)):
+            window.push(date(2025, 1, day), high, low)
+        self.assertEqual((window.high, window.low), (9, 6))
+        self.assertFalse(window.push(date(2025, 1, 2), 100, 1))
+
+    def test_ltp_update_keeps_extremes_sent_with_it(self):
+        # A full window of history, so the bars alone would replace the values
+        record_prices({'TCS': Decimal('90.00')}, time.time() - 400 * 86400)
+        tracker.reset()
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user(email='ltp@example.com', password='x'))
+        response = client.post('/api/stocks/trades/ltp/', [
+            {'symbol': 'TCS', 'ltp': '130.00', 'wk_52_high': '500.00', 'wk_52_low': '40.00'},
+        ], format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.extremes(), (Decimal('500.00'), Decimal('40.00')))
+
+
+class TickIngestTests(TestCase):
+    def setUp(self):
+        tracker.reset()
+        self.addCleanup(tracker.reset)
+        for symbol in ('TCS', 'INFY'):
+            StockTrade.objects.create(symbol=symbol, total_buy_qty=1, buy_price=Decimal('1.00'))
+
+    def ltp(self, symbol):
+        return StockTrade.objects.get(symbol=symbol).ltp
+
+    def run_async(self, coalescer, steps):
+        async def run():
+            try:
+                return await steps()
+            finally:
+                coalescer._flusher.cancel()
+        return async_to_sync(run)()
+
+    def test_parse_tick_rejects_prices_the_ltp_column_cannot_hold(self):
+        self.assertEqual(parse_tick('{"symbol": "tcs", "price": 12.346, "ts": 5}')[:2], ('TCS', Decimal('12.35')))
+        with self.assertRaises(TickError):
+            parse_tick(f'{{"symbol": "TCS", "price": {MAX_PRICE + 1}}}')
+
+    def test_coalesces_to_latest_tick_and_writes_prices_and_bars(self):
+        coalescer = TickCoalescer(flush_interval=3600, max_pending=2)
+        now = time.time()
+
+        async def steps():
+            results = [
+                coalescer.offer('TCS', Decimal('100.00'), now),
+                coalescer.offer('TCS', Decimal('101.00'), now + 1),
+                coalescer.offer('TCS', Decimal('99.00'), now - 1),
+                coalescer.offer('INFY', Decimal('50.00'), now),
+                coalescer.offer('HDFC', Decimal('10.00'), now),
+            ]
+            return results, await coalescer.flush(final=True)
+
+        results, written = self.run_async(coalescer, steps)
+        self.assertEqual(results, [True, True, False, True, False])
+        self.assertEqual(written, 2)
+        self.assertEqual(
+            {name: coalescer.counters[name] for name in ('coalesced', 'stale', 'dropped', 'bars_written')},
+            {'coalesced': 1, 'stale': 1, 'dropped': 1, 'bars_written': 2},
+        )
+        self.assertEqual(self.ltp('TCS'), Decimal('101.00'))
+        bar = decode_bars(PriceBlock.objects.get(symbol='TCS').bars)
+        self.assertEqual(list(bar.values()), [[10000, 10100, 10000, 10100]])
+
+    def test_failed_flush_is_retried_then_dropped(self):
+        coalescer = TickCoalescer(flush_interval=3600, max_attempts=2)
+        now = time.time()
+
+        async def steps():
+            coalescer.offer('TCS', Decimal('100.00'), now)
+            with mock.patch('stocks.ticks._write_batch', side_effect=RuntimeError('down')):
+                first = await coalescer.flush()
+                retained = dict(coalescer.pending)
+                await coalescer.flush()
+            coalescer.offer('INFY', Decimal('60.00'), now)
+            return first, retained, await coalescer.flush(final=True)
+
+        with self.assertLogs('stocks.ticks', 'ERROR'):
+            first, retained, written = self.run_async(coalescer, steps)
+        self.assertEqual((first, list(retained)), (0, ['TCS']))
+        self.assertEqual((coalescer.counters['flush_errors'], coalescer.counters['batches_dropped']), (2, 1))
+        self.assertEqual(written, 1)
+        self.assertEqual((self.ltp('TCS'), self.ltp('INFY')), (Decimal('0.00'), Decimal('60.00')))
+
+    def test_write_batch_is_atomic(self):
+        with mock.patch('stocks.ticks.write_minute_bars', side_effect=RuntimeError('down')):
+            with self.assertRaises(RuntimeError):
+                _write_batch([{'symbol': 'TCS', 'ltp': Decimal('100.00')}], [])
+        self.assertEqual(self.ltp('TCS'), Decimal('0.00'))
+
+
+class PriceHistoryTests(TestCase):
+    def setUp(self):
+        tracker.reset()
+        self.addCleanup(tracker.reset)
+
+    def test_bars_pack_any_ltp_value(self):
+        top = int(MAX_PRICE * 100)
+        bars = {}
+        merge_bar(bars, 600, 100, 100, 100, 100)
+        merge_bar(bars, 600, top, top, top, top)
+        merge_bar(bars, 555, 5, 7, 3, 6)
+        self.assertEqual(decode_bars(encode_bars(bars)), {555: [5, 7, 3, 6], 600: [100, top, 100, top]})
+
+    def test_minute_buffer_closes_bars_on_later_minute_or_drain(self):
+        buffer = MinuteBarBuffer()
+        buffer.record('TCS', Decimal('1.00'), 60)
+        buffer.record('TCS', Decimal('3.00'), 90)
+        buffer.record('TCS', Decimal('2.00'), 121)
+        self.assertEqual(buffer.drain(now=121), [('TCS', 1, 100, 300, 100, 300)])
+        self.assertEqual(buffer.drain(), [('TCS', 2, 200, 200, 200, 200)])
+        self.assertFalse(buffer)
+
+    def test_query_bars_by_minute_hour_and_day(self):
+        opening = datetime(2025, 1, 2, 9, 15, tzinfo=HISTORY_TIMEZONE)
+        for minutes, price in ((0, '100.00'), (1, '104.00'), (50, '98.00'), (51, '101.00')):
+            record_prices({'TCS': Decimal(price)}, (opening + timedelta(minutes=minutes)).timestamp())
+        end = opening + timedelta(hours=2)
+
+        minutes = query_bars('TCS', '1m', opening, end)
+        self.assertEqual([bar[4] for bar in minutes], [Decimal(p) for p in ('100', '104', '98', '101')])
+        self.assertEqual(
+            [(bar[0].hour, bar[1:]) for bar in query_bars('TCS', '1h', opening, end)],
+            [(9, (Decimal('100'), Decimal('104'), Decimal('100'), Decimal('104'))),
+             (10, (Decimal('98'), Decimal('101'), Decimal('98'), Decimal('101')))],
+        )
+        self.assertEqual(
+            [bar[1:] for bar in query_bars('TCS', '1d', opening, end)],
+            [(Decimal('100.00'), Decimal('104.00'), Decimal('98.00'), Decimal('101.00'))],
+        )
+        self.assertEqual(query_bars('TCS', '1m', opening + timedelta(minutes=2), end)[0][4], Decimal('98'))
+
+
+class PositionEngineTests(TestCase):
+    def setUp(self):
+        self.portfolio = Portfolio.objects.create(name='Fills')
+
+    def fill(self, side, quantity, price, method):
+        with self.captureOnCommitCallbacks(execute=True):
+            return record_fill(self.portfolio.id, 'tcs', side, quantity, Decimal(price), method=method)[1]
+
+    def test_fills_book_profit_by_cost_method_and_replay_to_the_same_state(self):
+        for method, booked in ((AVERAGE, Decimal('300.00')), (FIFO, Decimal('350.00'))):
+            with self.subTest(method=method):
+                StockTrade.objects.all().delete()
+                Trade.objects.all().delete()
+                self.fill(Trade.BUY, 10, '100.00', method)
+                self.fill(Trade.BUY, 10, '120.00', method)
+                position = self.fill(Trade.SELL, 15, '130.00', method)
+
+                self.assertEqual(position.symbol, 'TCS')
+                self.assertEqual(
+                    (position.total_buy_qty, position.buy_price, position.total_sell_qty, position.booked_profit_loss),
+                    (20, Decimal('110.00'), 15, booked),
+                )
+                if method == FIFO:
+                    self.assertEqual(list(Lot.objects.values_list('remaining_qty', 'price')), [(5, Decimal('120.00'))])
+
+                fields = ('total_buy_qty', 'buy_price', 'total_sell_qty', 'sell_price', 'booked_profit_loss')
+                live = StockTrade.objects.values(*fields).get()
+                replay_trades(method=method)
+                self.assertEqual(StockTrade.objects.values(*fields).get(), live)
+
+    def test_overselling_is_rejected_without_a_ledger_entry(self):
+        self.fill(Trade.BUY, 5, '100.00', AVERAGE)
+        with self.assertRaises(PositionError):
+            self.fill(Trade.SELL, 6, '100.00', AVERAGE)
+        self.assertEqual(Trade.objects.count(), 1)
+        self.assertEqual(StockTrade.objects.get().total_sell_qty, 0)
+
+
+class ValuationTests(TestCase):
+    def test_value_positions_in_paise_with_portfolio_weights(self):
+        def paise(*values):
+            return np.array(values, dtype=np.int64)
+
+        values = value_positions(
+            paise(1, 1, 2),
+            paise(10, 10, 4),
+            paise(0, 5, 0),
+            paise(10000, 1000, 500),
+            paise(0, 1200, 0),
+            paise(15000, 1000, 0),
+        )
+        self.assertEqual(values['current_value'].tolist(), [150000, 5000, 0])
+        self.assertEqual(values['unrealised_profit_loss'].tolist(), [50000, 0, -2000])
+        self.assertEqual(values['total_profit_loss'].tolist(), [50000, 1000, -2000])
+        self.assertEqual(values['percent_holding'].tolist(), [9677, 323, 0])
+
+    def test_price_update_revalues_positions_and_summary(self):
+        portfolio = Portfolio.objects.create(name='Valued')
+        for symbol, quantity in (('TCS', 10), ('INFY', 30)):
+            StockTrade.objects.create(
+                symbol=symbol, total_buy_qty=quantity, buy_price=Decimal('100.00'), portfolio=portfolio,
+            )
+        StockTrade.objects.update_prices([{'symbol': 'TCS', 'ltp': Decimal('300.00')}])
+        revalue_symbols(['TCS'])
+
+        tcs = StockTrade.objects.get(symbol='TCS')
+        self.assertEqual(
+            (tcs.current_value, tcs.unrealised_profit_loss, tcs.percent_holding),
+            (Decimal('3000.00'), Decimal('2000.00'), Decimal('100.00')),
+        )
+        summary = PortfolioSummary.objects.get(portfolio=portfolio)
+        self.assertEqual(
+            (summary.total_acquisition_cost, summary.total_current_value, summary.unrealised_profit_loss),
+            (Decimal('4000.00'), Decimal('3000.00'), Decimal('-1000.00')),
+        )
+
+
+    def test_mass_correction_keeps_summaries_and_valuation_consistent(self):
+        portfolio = Portfolio.objects.create(name='Corrected')
+        StockTrade.objects.create(
+            symbol='TCS', total_buy_qty=10, buy_price=Decimal('100.00'), ltp=Decimal('150.00'), portfolio=portfolio,
+        )
+        correct_positions(StockTrade.objects.filter(symbol='TCS'), total_buy_qty=7)
+
+        tcs = StockTrade.objects.get()
+        self.assertEqual((tcs.total_buy_value, tcs.balance_qty, tcs.current_value), (Decimal('700.00'), 7, Decimal('1050.00')))
+        call_command('rebuild_portfolio_summaries', '--verify', stdout=io.StringIO())
+
+        StockTrade.objects.update(total_buy_qty=5)
+        with self.assertRaisesMessage(CommandError, 'mismatches found'):
+            call_command('rebuild_portfolio_summaries', '--verify', stdout=io.StringIO())
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(email='pages@example.com', password='x'))
+        for index in range(7):
+            StockTrade.objects.create(
+                symbol=f'S{index}', total_buy_qty=1, buy_price=Decimal('1.00'), ltp=Decimal(index % 3),
+            )
+        # Ties on the ordering column are broken by id
+        StockTrade.objects.filter(symbol__in=['S2', 'S3', 'S4']).update(
+            created_at=StockTrade.objects.get(symbol='S2').created_at
+        )
+
+    def walk(self, url, link):
+        pages = []
+        while url:
+            body = self.client.get(url).json()
+            pages.append([row['id'] for row in body['data']])
+            url = body[link]
+        return pages
+
+    def test_pages_forward_and_back_in_keyset_order(self):
+        for query, ordering in (('', ('-created_at', '-id')), ('&ordering=ltp', ('ltp', 'id'))):
+            with self.subTest(query=query):
+                expected = list(StockTrade.objects.order_by(*ordering).values_list('id', flat=True))
+                pages = self.walk(f'/api/stocks/trades/?page_size=3{query}', 'next')
+                self.assertEqual([len(page) for page in pages], [3, 3, 1])
+                self.assertEqual(sum(pages, []), expected)
+
+                last = self.client.get(f'/api/stocks/trades/?page_size=3{query}').json()['next']
+                last = self.client.get(last).json()['next']
+                self.assertEqual(self.walk(last, 'previous'), pages[::-1])
+
+    def test_unknown_or_double_negated_ordering_is_a_400(self):
+        for ordering in ('bogus', '--ltp', '-'):
+            with self.subTest(ordering=ordering):
+                response = self.client.get(f'/api/stocks/trades/?ordering={ordering}')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+    def test_invalid_or_foreign_cursor_is_not_found(self):
+        ltp_cursor = self.client.get('/api/stocks/trades/?page_size=3&ordering=ltp').json()['next']
+        cursor = ltp_cursor.split('cursor=')[1].split('&')[0]
+        for url in ('/api/stocks/trades/?cursor=bogus', f'/api/stocks/trades/?page_size=3&cursor={cursor}'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class ReportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.portfolio = Portfolio.objects.create(name='Report', description='Core holdings')
+        with self.captureOnCommitCallbacks(execute=True):
+            for symbol, buy_qty, sell_qty in (('TCS', 10, 4), ('INFY', 5, 0), ('HDFC', 3, 3)):
+                StockTrade.objects.create(
+                    symbol=symbol, total_buy_qty=buy_qty, buy_price=Decimal('100.00'),
+                    total_sell_qty=sell_qty, sell_price=Decimal('120.00'),
+                    ltp=Decimal('110.00'), portfolio=self.portfolio,
+                )
+        self.client = APIClient()
+        self.url = f'/api/stocks/trades/download_report/?portfolio_id={self.portfolio.id}'
+
+    def test_deleting_newest_row_invalidates_conditional_get(self):
+        first = self.client.get(self.url)
+        self.assertNotIn('Last-Modified', first)
+
+        StockTrade.objects.order_by('-updated_at').first().delete()
+
+        for headers in ({'HTTP_IF_NONE_MATCH': first['ETag']}, {'HTTP_IF_MODIFIED_SINCE': http_date(time.time() + 60)}):
+            with self.subTest(headers=headers):
+                response = self.client.get(self.url, **headers)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], first['ETag'])
+
+    def test_streamed_report_matches_buffered_report(self):
+        for query in ('', f'portfolio_id={self.portfolio.id}'):
+            with self.subTest(query=query):
+                cache.clear()
+                streamed = self.client.get(f'/api/stocks/trades/download_report/?stream=true&{query}')
+                self.assertTrue(streamed.streaming)
+                cache.clear()
+                buffered = self.client.get(f'/api/stocks/trades/download_report/?{query}')
+                self.assertFalse(buffered.streaming)
+                self.assertEqual(b''.join(streamed.streaming_content), buffered.content)
+
+        view = StockTradeViewSet()
+        stocks = StockTrade.objects.order_by('symbol')
+        chunks = list(view._iter_html_report(stocks, 'ALL', '', chunk_size=1))
+        self.assertGreater(len(chunks), 3)
+        self.assertEqual(b''.join(chunks), view._generate_html_report(stocks, 'ALL', ''))
+
+    def test_totals_come_from_one_aggregate_query(self):
+        stocks = StockTrade.objects.filter(portfolio=self.portfolio)
+        with self.assertNumQueries(1):
+            totals = stocks.report_totals()
+
+        self.assertEqual(totals['total_buy_qty'], 18)
+        self.assertEqual(totals['total_buy_value'], Decimal('1800.00'))
+        self.assertEqual(totals['total_sell_qty'], 7)
+        self.assertEqual(totals['total_sell_value'], Decimal('840.00'))
+        # (4 * 120 - 4 * 100) + (3 * 120 - 3 * 100)
+        self.assertEqual(totals['total_realised_profit_loss'], Decimal('140.00'))
+        self.assertEqual(totals['total_acquisition_cost'], sum(stock.acquisition_cost for stock in stocks))
+
+        # Version stamp, totals and one values() projection for the rows
+        with self.assertNumQueries(3):
+            self.client.get('/api/stocks/trades/download_report/')
+
+    def test_matching_etag_is_not_modified_and_renders_are_cached(self):
+        with mock.patch.object(
+            StockTradeViewSet, '_generate_html_report', autospec=True,
+            side_effect=StockTradeViewSet._generate_html_report,
+        ) as render:
+            first = self.client.get(self.url)
+            second = self.client.get(self.url)
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], first['ETag'])
+
+    def test_concurrent_miss_waits_for_the_lock_holder(self):
+        key = report_cache_key('test', 'fingerprint')
+        cache.add(f'{key}:lock', 1)
+        render = mock.Mock(return_value=b'mine')
+
+        # The lock holder stores its result while this worker is polling.
+        with mock.patch('stocks.report_cache.time.sleep', side_effect=lambda _: cache.set(key, b'theirs')):
+            self.assertEqual(get_or_render_report(key, render), b'theirs')
+        render.assert_not_called()
+
+        # Once the holder releases the lock without a result, render locally.
+        cache.clear()
+        cache.add(f'{key}:lock', 1)
+        with mock.patch('stocks.report_cache.time.sleep', side_effect=lambda _: cache.delete(f'{key}:lock')):
+            self.assertEqual(get_or_render_report(key, render), b'mine')
+        render.assert_called_once_with()
+
+    def test_snapshot_is_precompressed_stable_and_immutable(self):
+        root = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.enterContext(mock.patch('stocks.snapshots.SNAPSHOT_ROOT', root))
+        self.client.force_authenticate(get_user_model().objects.create_user(email='snap@example.com', password='x'))
+        url = '/api/stocks/trades/publish_snapshot/'
+        report = self.client.get(self.url).content
+
+        first = self.client.post(url, {'portfolio_id': self.portfolio.id}, format='json')
+        self.assertEqual(first.status_code, 201)
+        name = first.json()['data']['name']
+        path = root / name
+        self.assertEqual(path.read_bytes(), report)
+        self.assertEqual(gzip.decompress((root / f'{name}.gz').read_bytes()), report)
+        self.assertEqual(brotli.decompress((root / f'{name}.br').read_bytes()), report)
+        written = {suffix: (root / f'{name}{suffix}').stat().st_mtime_ns for suffix in ('', '.gz', '.br')}
+
+        again = self.client.post(url, {'portfolio_id': self.portfolio.id}, format='json')
+        self.assertEqual(again.json()['data']['url'], first.json()['data']['url'])
+        self.assertEqual(
+            {suffix: (root / f'{name}{suffix}').stat().st_mtime_ns for suffix in written}, written
+        )
+
+        trade = StockTrade.objects.get(symbol='TCS')
+        trade.ltp = Decimal('150.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            trade.save()
+        changed = self.client.post(url, {'portfolio_id': self.portfolio.id}, format='json')
+        self.assertNotEqual(changed.json()['data']['name'], name)
+        self.assertEqual(path.read_bytes(), report)
+
+    def test_batch_report_has_one_section_per_portfolio(self):
+        other = Portfolio.objects.create(name='Other')
+        with self.captureOnCommitCallbacks(execute=True):
+            StockTrade.objects.create(
+                symbol='WIPRO', total_buy_qty=7, buy_price=Decimal('10.00'),
+                total_sell_qty=2, sell_price=Decimal('12.00'), ltp=Decimal('11.00'), portfolio=other,
+            )
+        empty = Portfolio.objects.create(name='Empty', description='Nothing yet')
+        # Exercise the GROUP BY fallback for a portfolio without a summary row
+        PortfolioSummary.objects.filter(portfolio=other).delete()
+        portfolios = (self.portfolio, other, empty)
+
+        with self.assertNumQueries(4):
+            response = self.client.get(
+                f'/api/stocks/trades/download_report/?portfolio_ids={empty.id},{other.id},{self.portfolio.id}'
+            )
+            body = b''.join(response.streaming_content)
+
+        sections = []
+        for portfolio in portfolios:
+            single = self.client.get(f'/api/stocks/trades/download_report/?portfolio_id={portfolio.id}').content
+            sections.append(single[len(DOCUMENT_HEAD):-len(DOCUMENT_END)])
+            totals = StockTrade.objects.filter(portfolio=portfolio).report_totals()
+            self.assertIn(render_section_footer(totals), body)
+        self.assertEqual(body, DOCUMENT_HEAD + SECTION_SPACER.join(sections) + DOCUMENT_END)
+        self.assertEqual(
+            b''.join(self.client.get('/api/stocks/trades/download_report/?all=grouped').streaming_content),
+            body,
+        )
+
+    def test_snapshot_rejects_malformed_body(self):
+        self.client.force_authenticate(get_user_model().objects.create_user(email='body@example.com', password='x'))
+        for body, status_code in (([self.portfolio.id], 400), (7, 400), ({'portfolio_id': [1]}, 404)):
+            with self.subTest(body=body):
+                response = self.client.post('/api/stocks/trades/publish_snapshot/', body, format='json')
+                self.assertEqual(response.status_code, status_code)
+                self.assertIn('error', response.json())
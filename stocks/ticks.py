@@ -0,0 +1,438 @@
+"""
+Streaming price-tick ingestion over ASGI.
+
+Ticks (``symbol``, ``price``, ``ts``) arrive as newline-delimited JSON,
+either as a chunked HTTP POST body or as WebSocket messages. They are
+coalesced per symbol in memory, keeping only the latest tick, and every
+flush window the surviving prices are written to ``StockTrade.ltp`` with
+one ``update_prices`` call. A burst of thousands of ticks per second
+becomes a handful of batched writes. Every accepted tick also feeds the
+minute OHLC bars of the price history (``stocks.history``); finished
+minutes are written with the same flush.
+
+When the number of pending symbols reaches the limit, ingest connections
+stop reading until the next flush drains the buffer. The TCP window then
+pushes back on the sender; ticks for new symbols that still arrive are
+dropped and counted. Counters are exposed at ``/api/stocks/ticks/stats/``.
+"""
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from .history import MinuteBarBuffer, write_minute_bars
+from .models import StockTrade
+from .valuation import revalue_symbols
+
+logger = logging.getLogger(__name__)
+
+TICK_FLUSH_INTERVAL = getattr(settings, 'STOCKS_TICK_FLUSH_INTERVAL', 0.5)
+TICK_MAX_PENDING = getattr(settings, 'STOCKS_TICK_MAX_PENDING', 50000)
+# Failed flushes of the same batch before it is dropped
+TICK_MAX_FLUSH_ATTEMPTS = getattr(settings, 'STOCKS_TICK_MAX_FLUSH_ATTEMPTS', 3)
+
+# A single NDJSON line longer than this is rejected instead of buffered.
+TICK_MAX_LINE_LENGTH = 4096
+
+TICK_PATH_PREFIX = '/api/stocks/ticks/'
+
+CENT = Decimal('0.01')
+
+# Largest value of StockTrade.ltp (max_digits=10, decimal_places=2)
+MAX_PRICE = Decimal('99999999.99')
+
+
+class TickError(ValueError):
+    """Raised for a tick line that cannot be parsed"""
+
+
+def parse_tick(line):
+    """
+    Parse one NDJSON tick line into ``(symbol, price, ts)``.
+
+    ``ts`` may be epoch seconds or an ISO 8601 datetime and defaults to the
+    time of receipt.
+    """
+    try:
+        data = json.loads(line)
+        symbol = str(data['symbol']).strip().upper()
+        price = Decimal(str(data['price'])).quantize(CENT)
+    except (ValueError, KeyError, TypeError, InvalidOperation):
+        raise TickError('Expected {"symbol": ..., "price": ..., "ts": ...}')
+    if not symbol or len(symbol) > 50:
+        raise TickError('Invalid symbol')
+    if not price.is_finite() or not 0 <= price <= MAX_PRICE:
+        raise TickError('Invalid price')
+
+    ts = data.get('ts')
+    if ts is None:
+        ts = time.time()
+    elif isinstance(ts, str):
+        try:
+            ts = datetime.fromisoformat(ts).timestamp()
+        except ValueError:
+            raise TickError('Invalid ts')
+    elif not isinstance(ts, (int, float)):
+        raise TickError('Invalid ts')
+    return symbol, price, float(ts)
+
+
+class TickCoalescer:
+    """
+    Keeps the latest pending price per symbol and flushes them periodically.
+
+    Ticks older than the pending (or last written) tick for the same symbol
+    are discarded as stale. A failed flush is retried with the next one; after
+    ``max_attempts`` failures in a row the batch is dropped so a batch that can
+    never be written does not hold up every later one.
+    """
+
+    def __init__(self, flush_interval=TICK_FLUSH_INTERVAL, max_pending=TICK_MAX_PENDING,
+                 max_attempts=TICK_MAX_FLUSH_ATTEMPTS):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.failed_attempts = 0
+        self.pending = {}
+        self.last_written_ts = {}
+        self.minute_bars = MinuteBarBuffer()
+        self.counters = dict.fromkeys(
+            (
+                'received',
+                'accepted',
+                'coalesced',
+                'stale',
+                'dropped',
+                'rejected',
+                'backpressure_waits',
+                'flushes',
+                'flush_errors',
+                'batches_dropped',
+                'prices_written',
+                'unknown_symbols',
+                'bars_written',
+            ),
+            0,
+        )
+        self.last_flush = None
+        self._window_started = None
+        self._flusher = None
+        self._drained = None
+
+    @property
+    def saturated(self):
+        return len(self.pending) >= self.max_pending
+
+    def offer(self, symbol, price, ts):
+        """Add a tick to the current window; return False if it was discarded"""
+        self.counters['received'] += 1
+        current = self.pending.get(symbol)
+        newest_ts = current[1] if current else self.last_written_ts.get(symbol)
+        if newest_ts is not None and ts < newest_ts:
+            self.counters['stale'] += 1
+            return False
+
+        if current is not None:
+            self.counters['coalesced'] += 1
+        elif self.saturated:
+            self.counters['dropped'] += 1
+            return False
+
+        if not self.pending:
+            self._window_started = time.monotonic()
+        self.pending[symbol] = (price, ts)
+        self.minute_bars.record(symbol, price, ts)
+        self.counters['accepted'] += 1
+        self._ensure_flusher()
+        return True
+
+    def reject(self):
+        self.counters['received'] += 1
+        self.counters['rejected'] += 1
+
+    async def wait_for_capacity(self):
+        """Block the caller while the buffer is full (backpressure)"""
+        while self.saturated:
+            self.counters['backpressure_waits'] += 1
+            self._ensure_flusher()
+            self._drained.clear()
+            await self._drained.wait()
+
+    async def flush(self, final=False):
+        """
+        Write the surviving prices (and finished minute bars) in one batch;
+        return how many prices were written. ``final`` also writes the
+        minute bars that are still open.
+        """
+        bars = self.minute_bars.drain(None if final else time.time())
+        if not self.pending and not bars:
+            return 0
+        batch, self.pending = self.pending, {}
+        window_started, self._window_started = self._window_started, None
+        entries = [{'symbol': symbol, 'ltp': price} for symbol, (price, _) in batch.items()]
+
+        started = time.monotonic()
+        try:
+            updated = await sync_to_async(_write_batch)(entries, bars)
+        except Exception:
+            self.counters['flush_errors'] += 1
+            self.failed_attempts += 1
+            if self.failed_attempts >= self.max_attempts:
+                self.failed_attempts = 0
+                self.counters['batches_dropped'] += 1
+                logger.exception(
+                    'Tick flush of %d prices and %d bars failed %d times; dropping it',
+                    len(entries), len(bars), self.max_attempts,
+                )
+                return 0
+            logger.exception('Tick flush of %d prices failed', len(entries))
+            # Put the batch back unless newer ticks arrived meanwhile.
+            for symbol, tick in batch.items():
+                self.pending.setdefault(symbol, tick)
+            self.minute_bars.closed.extend(bars)
+            if self._window_started is None:
+                self._window_started = window_started
+            return 0
+        finally:
+            if self._drained is not None:
+                self._drained.set()
+
+        finished = time.monotonic()
+        self.failed_attempts = 0
+        for symbol, (_, ts) in batch.items():
+            self.last_written_ts[symbol] = ts
+        self.counters['flushes'] += 1
+        self.counters['prices_written'] += len(entries)
+        self.counters['bars_written'] += len(bars)
+        self.counters['unknown_symbols'] += sum(1 for count in updated.values() if not count)
+        self.last_flush = {
+            'at': time.time(),
+            'prices': len(entries),
+            'bars': len(bars),
+            'duration_ms': round((finished - started) * 1000, 2),
+            # Age of the oldest tick in the batch when it reached the database
+            'lag_ms': round((finished - window_started) * 1000, 2) if window_started else None,
+        }
+        return len(entries)
+
+    async def close(self):
+        """Stop the flusher and write whatever is still pending"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush(final=True)
+
+    def stats(self):
+        return {
+            **self.counters,
+            'pending': len(self.pending),
+            'max_pending': self.max_pending,
+            'saturated': self.saturated,
+            'flush_interval': self.flush_interval,
+            'last_flush': self.last_flush,
+        }
+
+    def _ensure_flusher(self):
+        if self._flusher is None or self._flusher.done():
+            self._drained = self._drained or asyncio.Event()
+            self._flusher = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+
+def _write_batch(entries, bars):
+    """
+    Write one flush in one transaction: latest prices and revaluation, then
+    finished minute bars. A failure leaves nothing behind to retry around.
+    """
+    with transaction.atomic():
+        updated = StockTrade.objects.update_prices(entries) if entries else {}
+        revalue_symbols([symbol for symbol, count in updated.items() if count])
+        write_minute_bars(bars)
+    return updated
+
+
+coalescer = TickCoalescer()
+
+
+@sync_to_async
+def _authenticate(token_key):
+    """Return the active user for a DRF auth token, or None"""
+    from rest_framework.authtoken.models import Token
+
+    try:
+        token = Token.objects.select_related('user').get(key=token_key)
+    except Token.DoesNotExist:
+        return None
+    return token.user if token.user.is_active else None
+
+
+def _token_from_scope(scope):
+    for name, value in scope.get('headers', []):
+        if name == b'authorization':
+            keyword, _, key = value.decode('latin-1').partition(' ')
+            if keyword == 'Token' and key:
+                return key.strip()
+    # Browsers cannot set headers on WebSocket connections
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    return query.get('token', [None])[0]
+
+
+async def _send_json(send, status, data):
+    body = json.dumps(data).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode('ascii')),
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+class TickLineReader:
+    """Splits incoming bytes into NDJSON lines and offers them to the coalescer"""
+
+    def __init__(self, coalescer):
+        self.coalescer = coalescer
+        self.buffer = b''
+        self.counts = {'received': 0, 'accepted': 0, 'rejected': 0}
+
+    def feed(self, data, final=False):
+        self.buffer += data
+        *lines, self.buffer = self.buffer.split(b'\n')
+        if final:
+            lines.append(self.buffer)
+            self.buffer = b''
+        elif len(self.buffer) > TICK_MAX_LINE_LENGTH:
+            lines.append(self.buffer)
+            self.buffer = b''
+        for line in lines:
+            if line.strip():
+                self._offer(line)
+
+    def _offer(self, line):
+        self.counts['received'] += 1
+        try:
+            if len(line) > TICK_MAX_LINE_LENGTH:
+                raise TickError('Line too long')
+            tick = parse_tick(line)
+        except TickError:
+            self.counts['rejected'] += 1
+            self.coalescer.reject()
+            return
+        if self.coalescer.offer(*tick):
+            self.counts['accepted'] += 1
+
+
+class TickRouter:
+    """
+    ASGI entry point: serves the tick routes natively and passes every other
+    HTTP request to Django.
+
+    Routes:
+        POST /api/stocks/ticks/ingest/   chunked NDJSON body
+        WS   /api/stocks/ticks/ws/       NDJSON text or binary messages
+        GET  /api/stocks/ticks/stats/    coalescer counters
+    """
+
+    def __init__(self, django_application, coalescer=coalescer):
+        self.django_application = django_application
+        self.coalescer = coalescer
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+
+        path = scope.get('path', '')
+        if not path.startswith(TICK_PATH_PREFIX):
+            if scope['type'] == 'websocket':
+                await send({'type': 'websocket.close', 'code': 4404})
+                return
+            return await self.django_application(scope, receive, send)
+
+        route = path[len(TICK_PATH_PREFIX):].strip('/')
+        if scope['type'] == 'websocket' and route == 'ws':
+            return await self.ingest_websocket(scope, receive, send)
+        if scope['type'] == 'http' and route == 'ingest':
+            return await self.ingest_http(scope, receive, send)
+        if scope['type'] == 'http' and route == 'stats':
+            return await self.stats(scope, receive, send)
+        if scope['type'] == 'websocket':
+            await send({'type': 'websocket.close', 'code': 4404})
+            return
+        await _send_json(send, 404, {'error': 'Not found'})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.coalescer.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def ingest_http(self, scope, receive, send):
+        if scope['method'] != 'POST':
+            return await _send_json(send, 405, {'error': 'Method not allowed'})
+        if await _authenticate(_token_from_scope(scope)) is None:
+            return await _send_json(send, 401, {'error': 'Authentication credentials were not provided.'})
+
+        reader = TickLineReader(self.coalescer)
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            more_body = message.get('more_body', False)
+            reader.feed(message.get('body', b''), final=not more_body)
+            if not more_body:
+                break
+            # Stop reading the body until a flush makes room.
+            await self.coalescer.wait_for_capacity()
+
+        await _send_json(send, 200, {
+            'message': 'Ticks accepted',
+            'data': reader.counts,
+        })
+
+    async def ingest_websocket(self, scope, receive, send):
+        message = await receive()
+        if message['type'] != 'websocket.connect':
+            return
+        if await _authenticate(_token_from_scope(scope)) is None:
+            await send({'type': 'websocket.close', 'code': 4401})
+            return
+        await send({'type': 'websocket.accept'})
+
+        reader = TickLineReader(self.coalescer)
+        while True:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                return
+            data = message.get('bytes')
+            if data is None:
+                data = (message.get('text') or '').encode('utf-8')
+            reader.feed(data, final=True)
+            await self.coalescer.wait_for_capacity()
+
+    async def stats(self, scope, receive, send):
+        if scope['method'] != 'GET':
+            return await _send_json(send, 405, {'error': 'Method not allowed'})
+        if await _authenticate(_token_from_scope(scope)) is None:
+            return await _send_json(send, 401, {'error': 'Authentication credentials were not provided.'})
+        await _send_json(send, 200, {
+            'message': 'Tick ingestion stats retrieved successfully',
+            'data': self.coalescer.stats(),
+        })
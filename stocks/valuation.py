@@ -0,0 +1,271 @@
+"""
+Valuation engine: balance, acquisition cost, current value at ltp,
+unrealised and total profit/loss and portfolio weight for every position.
+
+Positions are loaded per call into NumPy arrays of integer paise, so each
+column is computed for all rows at once and the results are exact. Only
+rows whose values changed are written back, with one ``UPDATE ... SET col
+= CASE id WHEN ...`` statement per chunk, and each portfolio's valuation
+totals are stored on its PortfolioSummary in the same transaction.
+
+``StockTrade.valuation_values`` computes the per-row values the same way
+for save(); ``percent_holding`` needs the whole portfolio and is only set
+here.
+"""
+import threading
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .events import broadcaster
+from .models import (
+    VALUATION_SUMMARY_FIELDS,
+    CaseMapping,
+    PortfolioSummary,
+    StockTrade,
+    _batched,
+)
+
+# Columns written by the engine; money in paise and percent_holding in
+# hundredths of a percent while computed.
+VALUATION_FIELDS = (
+    'balance_qty',
+    'acquisition_cost',
+    'current_value',
+    'unrealised_profit_loss',
+    'total_profit_loss',
+    'percent_holding',
+)
+
+# Rows per UPDATE statement when writing results back.
+VALUATION_CHUNK_SIZE = 500
+
+# percent_holding is DecimalField(max_digits=5, decimal_places=2)
+PERCENT_LIMIT = 99999
+
+# Decimal columns read by the engine; fetched as floats (see _to_paise) to
+# skip building a Decimal per value.
+_PRICE_FIELDS = ('buy_price', 'sell_price', 'ltp')
+_STORED_FIELDS = VALUATION_FIELDS[1:]
+
+_pending = threading.local()
+
+
+def _to_paise(values):
+    """Floats with at most 2 decimal places -> exact int64 paise"""
+    return np.rint(np.array(values, dtype=np.float64) * 100).astype(np.int64)
+
+
+def _from_paise(value):
+    return Decimal(int(value)).scaleb(-2)
+
+
+def value_positions(portfolio_ids, total_buy_qty, total_sell_qty, buy_price, sell_price, ltp):
+    """
+    Value positions given as parallel int64 arrays (prices in paise).
+
+    Returns ``{field: array}`` for ``VALUATION_FIELDS``, with money in paise
+    and ``percent_holding`` in hundredths of a percent of the position's
+    portfolio current value.
+    """
+    balance = total_buy_qty - total_sell_qty
+    acquisition_cost = balance * buy_price
+    current_value = balance * ltp
+    unrealised = current_value - acquisition_cost
+    realised = np.where(
+        (total_buy_qty > 0) & (total_sell_qty > 0),
+        total_sell_qty * (sell_price - buy_price),
+        0,
+    )
+
+    _, group = np.unique(portfolio_ids, return_inverse=True)
+    portfolio_value = np.bincount(group, weights=current_value)[group]
+    weight = np.divide(
+        current_value * 10000.0,
+        portfolio_value,
+        out=np.zeros(len(current_value)),
+        where=portfolio_value != 0,
+    )
+    return {
+        'balance_qty': balance,
+        'acquisition_cost': acquisition_cost,
+        'current_value': current_value,
+        'unrealised_profit_loss': unrealised,
+        'total_profit_loss': realised + unrealised,
+        'percent_holding': np.clip(np.rint(weight), -PERCENT_LIMIT, PERCENT_LIMIT).astype(np.int64),
+    }
+
+
+def revalue_portfolios(portfolio_ids=None, chunk_size=VALUATION_CHUNK_SIZE):
+    """
+    Revalue every position in the given (or all) portfolios and store the
+    portfolio valuation totals. Returns ``(positions_valued, positions_written)``.
+    """
+    positions = StockTrade.objects.filter(portfolio__isnull=False)
+    summaries = PortfolioSummary.objects.all()
+    if portfolio_ids is not None:
+        positions = positions.filter(portfolio_id__in=portfolio_ids)
+        summaries = summaries.filter(portfolio_id__in=portfolio_ids)
+
+    with transaction.atomic():
+        floats = {
+            f'{field}_float': Cast(field, FloatField())
+            for field in (*_PRICE_FIELDS, *_STORED_FIELDS)
+        }
+        rows = list(
+            positions.select_for_update()
+            .order_by()
+            .annotate(**floats)
+            .values_list('id', 'portfolio_id', 'total_buy_qty', 'total_sell_qty', 'balance_qty', *floats)
+        )
+        totals = {
+            portfolio_id: [0] * len(VALUATION_SUMMARY_FIELDS)
+            for portfolio_id in summaries.values_list('portfolio_id', flat=True)
+        }
+        written = 0
+
+        if rows:
+            columns = list(zip(*rows))
+            ids = np.array(columns[0], dtype=np.int64)
+            portfolios = np.array(columns[1], dtype=np.int64)
+            values = value_positions(
+                portfolios,
+                np.array(columns[2], dtype=np.int64),
+                np.array(columns[3], dtype=np.int64),
+                *(_to_paise(column) for column in columns[5:8]),
+            )
+
+            changed = values['balance_qty'] != np.array(columns[4], dtype=np.int64)
+            for field, column in zip(_STORED_FIELDS, columns[8:]):
+                changed |= values[field] != _to_paise(column)
+            written = _write_positions(ids[changed], {
+                field: array[changed] for field, array in values.items()
+            }, chunk_size)
+
+            unique, group = np.unique(portfolios, return_inverse=True)
+            for index, field in enumerate(('acquisition_cost', 'current_value', 'unrealised_profit_loss')):
+                sums = np.zeros(len(unique), dtype=np.int64)
+                np.add.at(sums, group, values[field])
+                for portfolio_id, total in zip(unique.tolist(), sums.tolist()):
+                    totals.setdefault(portfolio_id, [0] * len(VALUATION_SUMMARY_FIELDS))[index] = total
+
+        _write_summaries(totals, chunk_size)
+        broadcaster.notify_on_commit(list(totals))
+
+    return len(rows), written
+
+
+def _write_positions(ids, values, chunk_size):
+    """Write computed valuation arrays for ``ids`` in chunked CASE updates"""
+    now = timezone.now()
+    fields = {field: StockTrade._meta.get_field(field) for field in VALUATION_FIELDS}
+    ids = ids.tolist()
+    columns = {
+        field: (
+            array.tolist()
+            if field == 'balance_qty'
+            else [_from_paise(value) for value in array.tolist()]
+        )
+        for field, array in values.items()
+    }
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        StockTrade.objects.filter(id__in=chunk).update(
+            updated_at=now,
+            **{
+                field: CaseMapping(
+                    'id',
+                    dict(zip(chunk, columns[field][start:start + chunk_size])),
+                    default=field,
+                    output_field=fields[field],
+                )
+                for field in VALUATION_FIELDS
+            },
+        )
+    return len(ids)
+
+
+def _write_summaries(totals, chunk_size):
+    """Store ``{portfolio_id: [acquisition, current, unrealised]}`` (paise)"""
+    fields = {field: PortfolioSummary._meta.get_field(field) for field in VALUATION_SUMMARY_FIELDS}
+    for chunk in _batched(totals.items(), chunk_size):
+        PortfolioSummary.objects.filter(portfolio_id__in=[key for key, _ in chunk]).update(**{
+            field: CaseMapping(
+                'portfolio_id',
+                {portfolio_id: _from_paise(values[index]) for portfolio_id, values in chunk},
+                default=field,
+                output_field=fields[field],
+            )
+            for index, field in enumerate(VALUATION_SUMMARY_FIELDS)
+        })
+
+
+def correct_positions(positions, **changes):
+    """
+    Apply a mass correction (quantities, prices, a move) to the
+    ``positions`` queryset as one UPDATE, then restore what save() would
+    have maintained: the generated columns follow from the UPDATE itself,
+    the valuation columns are recomputed and the summaries of the affected
+    portfolios rebuilt. A bare ``.update()`` leaves both stale until
+    ``rebuild_portfolio_summaries`` runs. Positions outside any portfolio
+    are revalued on their next save. Returns the number of rows updated.
+    """
+    changes.setdefault('updated_at', timezone.now())
+    with transaction.atomic():
+        portfolio_ids = set(positions.order_by().values_list('portfolio_id', flat=True).distinct())
+        target = changes.get('portfolio', changes.get('portfolio_id'))
+        portfolio_ids.add(getattr(target, 'pk', target))
+        portfolio_ids.discard(None)
+
+        updated = positions.update(**changes)
+        if portfolio_ids:
+            revalue_portfolios(portfolio_ids)
+            PortfolioSummary.objects.rebuild(portfolio_ids)
+    return updated
+
+
+def holding_portfolios(symbols, chunk_size=VALUATION_CHUNK_SIZE):
+    """Return the ids of the portfolios holding any of ``symbols``"""
+    portfolio_ids = set()
+    for chunk in _batched(symbols, chunk_size):
+        portfolio_ids.update(
+            StockTrade.objects.filter(symbol__in=chunk, portfolio__isnull=False)
+            .order_by()
+            .values_list('portfolio_id', flat=True)
+            .distinct()
+        )
+    return portfolio_ids
+
+
+def revalue_symbols(symbols, chunk_size=VALUATION_CHUNK_SIZE):
+    """Revalue every portfolio holding any of ``symbols`` (e.g. after an ltp update)"""
+    portfolio_ids = holding_portfolios(symbols, chunk_size)
+    if not portfolio_ids:
+        return 0, 0
+    return revalue_portfolios(portfolio_ids, chunk_size)
+
+
+def schedule_revaluation(portfolio_ids, using=None):
+    """
+    Revalue ``portfolio_ids`` once the current transaction commits (at once
+    outside a transaction). Portfolios scheduled by several saves in one
+    transaction are revalued together by the first callback to run.
+    """
+    portfolio_ids = set(portfolio_ids)
+    portfolio_ids.discard(None)
+    if not portfolio_ids:
+        return
+    if not hasattr(_pending, 'portfolio_ids'):
+        _pending.portfolio_ids = set()
+    _pending.portfolio_ids.update(portfolio_ids)
+    transaction.on_commit(_revalue_pending, using=using)
+
+
+def _revalue_pending():
+    portfolio_ids, _pending.portfolio_ids = _pending.portfolio_ids, set()
+    if portfolio_ids:
+        revalue_portfolios(portfolio_ids)
@@ -1,19 +1,68 @@
 from rest_framework import status, viewsets
 # from playwright.sync_api import sync_playwright
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.http import HttpResponse
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import quote_etag
+from datetime import datetime, time, timedelta
 from decimal import Decimal
 
 import stocks
-from .models import StockTrade, Portfolio
-from .serializers import StockTradeSerializer, PortfolioSerializer
+from .models import StockTrade, Portfolio, PortfolioSummary
+from .serializers import (
+    StockTradeSerializer, PortfolioSerializer, StockTradeIngestSerializer, TradeSerializer,
+    PriceUpdateSerializer, StockTradeReadSerializer,
+)
+from .positions import PositionError, record_fill
+from .fieldsets import FieldSelectionError, select_fields
+from .filters import StockTradeFilterBackend, parse_moment
+from .history import INTERVALS, query_bars, record_prices
+from .valuation import revalue_portfolios, revalue_symbols
+from .report_cache import get_or_render_report, report_cache_key, report_fingerprint
+from .snapshots import write_snapshot
+from .exports import EXPORT_CHUNK_SIZE, EXPORT_FIELDS, iter_csv, iter_ndjson
+from .renderers import CSVExportRenderer, EventStreamRenderer, NDJSONExportRenderer
+from .events import broadcaster
+from .report_renderer import (
+    EMPTY_REPORT_TOTALS,
+    REPORT_ROW_FIELDS,
+    iter_batch_report,
+    iter_report,
+)
 from django.http import HttpResponse
 from rest_framework.decorators import action
 from decimal import Decimal
 import tempfile
 import os
+from itertools import groupby
+from operator import itemgetter
+
+# Number of rows fetched per database round trip and emitted per chunk
+# when the HTML report is streamed.
+REPORT_CHUNK_SIZE = 500
+
+# ?mode= of the bulk action: all-or-nothing, or write the valid rows
+BULK_INGEST_MODES = ('atomic', 'partial')
+
+# Most keys one ?symbols= / ?names= batch lookup may ask for
+MAX_LOOKUP_KEYS = getattr(settings, 'STOCKS_MAX_LOOKUP_KEYS', 500)
+
+# Range served by the bars action when no start is given
+DEFAULT_BAR_RANGES = {
+    '1m': timedelta(days=1),
+    '1h': timedelta(days=7),
+    '1d': timedelta(days=365),
+}
 
 class StockTradeViewSet(viewsets.ModelViewSet):
     """
@@ -30,21 +79,34 @@ class StockTradeViewSet(viewsets.ModelViewSet):
     serializer_class = StockTradeSerializer
     permission_classes = [IsAuthenticated]
     lookup_field = 'id'
+    filter_backends = [StockTradeFilterBackend]
+    pagination_message = 'Stock trades retrieved successfully'
 
     def get_queryset(self):
         """Return all stock trades"""
-        return StockTrade.objects.all().order_by('-created_at')
+        return StockTrade.objects.all().order_by('-created_at', '-id')
 
     def list(self, request, *args, **kwargs):
-        """Get all stock trades"""
-        queryset = self.filter_queryset(self.get_queryset())
+        """
+        Get a page of stock trades, newest first (see stocks.pagination).
+        ``?fields=`` / ``?exclude=`` select the returned fields; filters
+        and ``?ordering=`` are described in stocks.filters.
+        """
+        try:
+            fields = select_fields(request.query_params, StockTradeReadSerializer.fields)
+        except FieldSelectionError as exc:
+            return Response(
+                {'error': str(exc)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        queryset = StockTradeReadSerializer.values(self.filter_queryset(self.get_queryset()), fields)
         page = self.paginate_queryset(queryset)
         
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
+            serializer = StockTradeReadSerializer(page, many=True, fields=fields)
             return self.get_paginated_response(serializer.data)
         
-        serializer = self.get_serializer(queryset, many=True)
+        serializer = StockTradeReadSerializer(queryset, many=True, fields=fields)
         return Response(
             {
                 'message': 'Stock trades retrieved successfully',
@@ -54,6 +116,31 @@ class StockTradeViewSet(viewsets.ModelViewSet):
             status=status.HTTP_200_OK
         )
 
+    def retrieve(self, request, *args, **kwargs):
+        """Get a stock trade; ``?fields=`` / ``?exclude=`` select the returned fields"""
+        try:
+            fields = select_fields(request.query_params, StockTradeReadSerializer.fields)
+        except FieldSelectionError as exc:
+            return Response(
+                {'error': str(exc)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        queryset = StockTradeReadSerializer.values(self.filter_queryset(self.get_queryset()), fields)
+        row = get_object_or_404(queryset, **{self.lookup_field: kwargs[self.lookup_url_kwarg or self.lookup_field]})
+        self.check_object_permissions(request, row)
+        return Response(StockTradeReadSerializer(row, fields=fields).data)
+
+    @action(detail=False, methods=['get'])
+    def count(self, request):
+        """Total number of stock trades; the list pages do not carry it"""
+        return Response(
+            {
+                'message': 'Stock trade count retrieved successfully',
+                'count': self.filter_queryset(self.get_queryset()).order_by().count()
+            },
+            status=status.HTTP_200_OK
+        )
+
     def create(self, request, *args, **kwargs):
         """Create a new stock trade"""
         serializer = self.get_serializer(data=request.data)
@@ -93,26 +180,365 @@ class StockTradeViewSet(viewsets.ModelViewSet):
             status=status.HTTP_200_OK
         )
 
+    @action(detail=False, methods=['post'])
+    def fill(self, request):
+        """
+        Record one fill in the trade ledger and apply it to its position.
+
+        The position is updated in place (running average prices and booked
+        P/L), so no client-side read-modify-write of the row is needed.
+        """
+        serializer = TradeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        try:
+            trade, position = record_fill(
+                data['portfolio'].id,
+                data['symbol'],
+                data['side'],
+                data['quantity'],
+                data['price'],
+                executed_at=data.get('executed_at'),
+            )
+        except PositionError as exc:
+            return Response(
+                {'error': str(exc)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(
+            {
+                'message': 'Trade recorded successfully',
+                'data': {
+                    'trade': TradeSerializer(trade).data,
+                    'position': self.get_serializer(position).data
+                }
+            },
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(detail=False, methods=['post'])
+    def ltp(self, request):
+        """
+        Update last-traded prices for many symbols in one request.
+
+        Accepts a list of ``{symbol, ltp, wk_52_high?, wk_52_low?}`` (or
+        ``{"prices": [...]}``). Every position holding a symbol is updated,
+        across portfolios, and the result reports how many were changed.
+        """
+        entries = request.data.get('prices') if isinstance(request.data, dict) else request.data
+        if not isinstance(entries, list) or not entries:
+            return Response(
+                {'error': 'A non-empty list of prices is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer = PriceUpdateSerializer(data=entries, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        symbols = [entry['symbol'] for entry in serializer.validated_data]
+        if len(set(symbols)) != len(symbols):
+            return Response(
+                {'error': 'Each symbol may appear only once per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Prices, valuation and price history commit together or not at all
+        with transaction.atomic():
+            updated = StockTrade.objects.update_prices(serializer.validated_data)
+            revalue_symbols([symbol for symbol, count in updated.items() if count])
+            record_prices(
+                {entry['symbol']: entry['ltp'] for entry in serializer.validated_data},
+                timezone.now().timestamp(),
+                # Extremes sent with the price win over the bar-derived ones
+                keep_extremes={
+                    entry['symbol'] for entry in serializer.validated_data
+                    if 'wk_52_high' in entry or 'wk_52_low' in entry
+                },
+            )
+        results = [
+            {
+                'symbol': symbol,
+                'status': 'updated' if count else 'not_found',
+                'positions': count
+            }
+            for symbol, count in updated.items()
+        ]
+        return Response(
+            {
+                'message': 'Prices updated successfully',
+                'updated': sum(1 for result in results if result['positions']),
+                'not_found': sum(1 for result in results if not result['positions']),
+                'data': results
+            },
+            status=status.HTTP_200_OK
+        )
+
+    @action(detail=False, methods=['get'])
+    def bars(self, request):
+        """
+        OHLC price bars for one symbol from the price history.
+
+        Query params: symbol (required), interval (1m, 1h or 1d; default 1m),
+        start / end (ISO date or datetime; default the last day, week or
+        year of bars for 1m, 1h and 1d respectively).
+        """
+        symbol = request.query_params.get('symbol')
+        if not symbol:
+            return Response(
+                {'error': 'Symbol parameter is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        interval = request.query_params.get('interval', '1m')
+        if interval not in INTERVALS:
+            return Response(
+                {'error': f"interval must be one of {', '.join(INTERVALS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        start = parse_moment(request.query_params.get('start'))
+        end = parse_moment(request.query_params.get('end'))
+        if start is False or end is False:
+            return Response(
+                {'error': 'start and end must be ISO dates or datetimes'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        end = end or timezone.now()
+        start = start or end - DEFAULT_BAR_RANGES[interval]
+
+        bars = query_bars(symbol.upper(), interval, start, end)
+        return Response(
+            {
+                'message': 'Price bars retrieved successfully',
+                'symbol': symbol.upper(),
+                'interval': interval,
+                'count': len(bars),
+                'data': [
+                    {
+                        'time': bar_start.isoformat(),
+                        'open': f'{o:.2f}',
+                        'high': f'{h:.2f}',
+                        'low': f'{l:.2f}',
+                        'close': f'{c:.2f}',
+                    }
+                    for bar_start, o, h, l, c in bars
+                ]
+            },
+            status=status.HTTP_200_OK
+        )
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_ingest(self, request):
+        """
+        Create or update many stock trades in one request, keyed by
+        (portfolio_id, symbol).
+
+        Accepts a list of trades (or ``{"trades": [...]}``) and writes them
+        with ``StockTrade.objects.bulk_ingest`` instead of one save() per row.
+        The batch is validated with one portfolio lookup and errors are
+        reported per item (``index`` into the list). ``?mode=atomic`` (the
+        default) writes nothing if any item is invalid; ``?mode=partial``
+        writes the valid items and reports the rest. Valid items are
+        written in one transaction.
+        """
+        mode = request.query_params.get('mode', 'atomic')
+        if mode not in BULK_INGEST_MODES:
+            return Response(
+                {'error': f"mode must be one of: {', '.join(BULK_INGEST_MODES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        rows = request.data.get('trades') if isinstance(request.data, dict) else request.data
+        if not isinstance(rows, list) or not rows:
+            return Response(
+                {'error': 'A non-empty list of trades is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        valid, errors = self._validate_bulk_trades(rows)
+        if errors and (mode == 'atomic' or not valid):
+            return Response(
+                {
+                    'error': 'Some trades are invalid; nothing was written',
+                    'failed': len(errors),
+                    'errors': errors
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        portfolio_ids = {row['portfolio_id'] for row in valid}
+        with transaction.atomic():
+            count = StockTrade.objects.bulk_ingest(valid)
+            revalue_portfolios(portfolio_ids)
+        return Response(
+            {
+                'message': 'Stock trades ingested successfully',
+                'count': count,
+                'failed': len(errors),
+                'errors': errors
+            },
+            status=status.HTTP_200_OK
+        )
+
+    def _validate_bulk_trades(self, rows):
+        """
+        Validate bulk trade rows with one query for the referenced
+        portfolios. Returns ``(valid_rows, errors)`` where ``errors`` lists
+        ``{'index', 'errors'}`` for each rejected row.
+        """
+        serializer = StockTradeIngestSerializer()
+        candidates = {}
+        errors = {}
+        for index, row in enumerate(rows):
+            try:
+                candidates[index] = serializer.run_validation(row)
+            except ValidationError as exc:
+                errors[index] = exc.detail
+
+        portfolios = Portfolio.objects.only('id').in_bulk(
+            {row['portfolio_id'] for row in candidates.values()}
+        )
+        seen = {}
+        for index, row in candidates.items():
+            key = (row['portfolio_id'], row['symbol'])
+            if row['portfolio_id'] not in portfolios:
+                errors[index] = {'portfolio_id': [f"Portfolio with ID {row['portfolio_id']} not found"]}
+            elif key in seen:
+                errors[index] = {'symbol': [f'Duplicate of item {seen[key]} in this portfolio']}
+            else:
+                seen[key] = index
+
+        valid = [row for index, row in candidates.items() if index not in errors]
+        return valid, [{'index': index, 'errors': errors[index]} for index in sorted(errors)]
+
     @action(detail=False, methods=['get'])
     def by_symbol(self, request):
-        """Get stock trade by symbol"""
+        """
+        Get stock trade by symbol, optionally within one portfolio.
+
+        Symbols are unique per portfolio, so without portfolio_id a symbol
+        held in several portfolios is ambiguous.
+
+        ``?symbols=TCS,INFY`` (comma-separated or repeated) instead returns
+        every position in any of the symbols from one query, with the
+        symbols nobody holds under ``missing``.
+        """
+        portfolio_id = request.query_params.get('portfolio_id')
+        stock_trades = StockTrade.objects.all()
+        if portfolio_id:
+            try:
+                stock_trades = stock_trades.filter(portfolio_id=int(portfolio_id))
+            except ValueError:
+                return Response(
+                    {'error': 'portfolio_id must be an integer'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        if 'symbols' in request.query_params:
+            return self._by_symbols(request, stock_trades)
+
         symbol = request.query_params.get('symbol', None)
         if not symbol:
             return Response(
                 {'error': 'Symbol parameter is required'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
-        try:
-            stock_trade = StockTrade.objects.get(symbol=symbol.upper())
-            serializer = self.get_serializer(stock_trade)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except StockTrade.DoesNotExist:
+
+        matches = list(stock_trades.filter(symbol=symbol.upper())[:2])
+        if not matches:
             return Response(
                 {'error': f'Stock trade with symbol {symbol} not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        if len(matches) > 1:
+            return Response(
+                {'error': f'Symbol {symbol} exists in several portfolios; pass portfolio_id'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer = self.get_serializer(matches[0])
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    def _by_symbols(self, request, stock_trades):
+        """Positions in any of ``?symbols=``, one ``symbol IN (...)`` query"""
+        symbols = list(dict.fromkeys(
+            symbol.strip().upper()
+            for value in request.query_params.getlist('symbols')
+            for symbol in value.split(',')
+            if symbol.strip()
+        ))
+        if not symbols:
+            return Response({'error': 'symbols parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(symbols) > MAX_LOOKUP_KEYS:
+            return Response(
+                {'error': f'At most {MAX_LOOKUP_KEYS} symbols per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
+        rows = StockTradeReadSerializer.values(
+            stock_trades.filter(symbol__in=symbols).order_by('symbol', 'portfolio_id', 'id')
+        )
+        data = StockTradeReadSerializer(rows, many=True).data
+        found = {row['symbol'] for row in data}
+        return Response({
+            'message': 'Stock trades retrieved successfully',
+            'count': len(data),
+            'data': data,
+            'missing': [symbol for symbol in symbols if symbol not in found],
+        }, status=status.HTTP_200_OK)
+
+
+    @action(
+        detail=False,
+        methods=['get'],
+        renderer_classes=[CSVExportRenderer, NDJSONExportRenderer],
+    )
+    def export(self, request):
+        """
+        Stream all stock trades as CSV (default) or NDJSON, chosen with
+        ``?format=csv|ndjson`` or the Accept header.
+
+        Optional filters: ``portfolio_id`` and ``updated_since`` (ISO date or
+        datetime).
+        """
+        trades = StockTrade.objects.order_by('id')
+
+        portfolio_id = request.query_params.get('portfolio_id')
+        if portfolio_id:
+            try:
+                trades = trades.filter(portfolio_id=int(portfolio_id))
+            except ValueError:
+                return Response(
+                    {'error': 'portfolio_id must be an integer'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        updated_since = request.query_params.get('updated_since')
+        if updated_since:
+            since = parse_datetime(updated_since)
+            if since is None:
+                since_date = parse_date(updated_since)
+                if since_date is not None:
+                    since = datetime.combine(since_date, time.min)
+            if since is None:
+                return Response(
+                    {'error': 'updated_since must be an ISO date or datetime'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+            trades = trades.filter(updated_at__gte=since)
+
+        rows = trades.values_list(*EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+        export_format = request.accepted_renderer.format
+        encode = iter_ndjson if export_format == 'ndjson' else iter_csv
+        response = StreamingHttpResponse(
+            encode(rows),
+            content_type=request.accepted_renderer.media_type
+        )
+        response['Content-Disposition'] = f'attachment; filename="stock_trades.{export_format}"'
+        return response
 
     # @action(detail=False, methods=["get"])
     # def download_report_image(self, request):
@@ -142,498 +568,232 @@ class StockTradeViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], permission_classes=[])
     def download_report(self, request):
-        """Download HTML report of all stock trades"""
+        """Download HTML report of all stock trades
+
+        Pass ``stream=true`` to send the report through a StreamingHttpResponse,
+        reading rows in chunks so memory stays flat for large portfolios.
+
+        Responses carry an ``ETag`` derived from the portfolio's row count and
+        latest ``updated_at``; a matching ``If-None-Match`` gets a 304, and
+        rendered reports are kept in Django's cache. No ``Last-Modified`` is
+        sent: the latest ``updated_at`` moves backwards when that row is
+        deleted, so it cannot validate on its own.
+
+        Pass ``portfolio_ids=1,2,3`` or ``all=grouped`` for a batch report with
+        one section per portfolio, always streamed.
+        """
+        if 'portfolio_ids' in request.query_params or request.query_params.get('all') == 'grouped':
+            return self._download_batch_report(request)
+
         # Get portfolio_id from query parameters
         portfolio_id = request.query_params.get('portfolio_id')
-        
-        if portfolio_id:
-            # Filter stocks by specific portfolio
+        stream = request.query_params.get('stream', '').lower() in ('1', 'true', 'yes')
+
+        report_scope = self._get_report_scope(portfolio_id)
+        if report_scope is None:
+            return Response(
+                {'error': f'Portfolio with ID {portfolio_id} not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        stocks, portfolio_name, description, scope = report_scope
+
+        # ---- CONDITIONAL REQUEST ----
+        version = stocks.report_version()
+        fingerprint = report_fingerprint(scope, version, portfolio_name, description)
+        etag = quote_etag(fingerprint)
+
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return self._with_report_validators(not_modified, etag)
+
+        cache_key = report_cache_key(scope, fingerprint)
+
+        if stream:
+            # Streamed reports are too large to hold in the cache; only serve
+            # them from it when a buffered request already put them there.
+            cached = cache.get(cache_key)
+            if cached is not None:
+                response = HttpResponse(cached, content_type="text/html")
+            else:
+                response = StreamingHttpResponse(
+                    self._iter_html_report(stocks, portfolio_name, description, scope),
+                    content_type="text/html"
+                )
+            return self._with_report_validators(response, etag)
+
+        html_content = get_or_render_report(
+            cache_key,
+            lambda: self._generate_html_report(stocks, portfolio_name, description, scope),
+        )
+
+        response = HttpResponse(html_content, content_type="text/html")
+        return self._with_report_validators(response, etag)
+
+    def _download_batch_report(self, request):
+        """Stream a sectioned report for several portfolios"""
+        portfolio_ids = request.query_params.get('portfolio_ids')
+
+        if portfolio_ids is None:
+            # all=grouped: every portfolio, one section each
+            portfolios = list(Portfolio.objects.order_by('id'))
+            stocks = StockTrade.objects.filter(portfolio__isnull=False)
+        else:
             try:
-                portfolio = Portfolio.objects.get(id=portfolio_id)
-                stocks = StockTrade.objects.filter(portfolio=portfolio).order_by('symbol')
-                portfolio_name = portfolio.name
-                description = portfolio.description or ""
-            except Portfolio.DoesNotExist:
+                ids = sorted({int(pid) for pid in portfolio_ids.split(',') if pid.strip()})
+            except ValueError:
+                return Response(
+                    {'error': 'portfolio_ids must be a comma-separated list of integers'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if not ids:
                 return Response(
-                    {'error': f'Portfolio with ID {portfolio_id} not found'},
+                    {'error': 'portfolio_ids parameter is required'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            portfolios = list(Portfolio.objects.filter(id__in=ids).order_by('id'))
+            missing = sorted(set(ids) - {portfolio.id for portfolio in portfolios})
+            if missing:
+                return Response(
+                    {'error': f'Portfolios with IDs {missing} not found'},
                     status=status.HTTP_404_NOT_FOUND
                 )
-        else:
-            # Get all stocks
-            stocks = StockTrade.objects.all().order_by('symbol')
-            portfolio_name = "ALL PORTFOLIOS"
-            description = "Combined report of all portfolios"
-
-        # ---- SAFE TOTAL CALCULATIONS ----
-        total_buy_qty = sum(to_int(s.total_buy_qty) for s in stocks)
-        total_buy_value = sum(to_decimal(s.total_buy_value) for s in stocks)
-        total_sell_qty = sum(to_int(s.total_sell_qty) for s in stocks)
-        total_sell_value = sum(to_decimal(s.total_sell_value) for s in stocks)
-
-        # ---- REALISED PROFIT / LOSS ----
-        total_realised_profit_loss = Decimal('0.00')
-
-        for stock in stocks:
-            buy_qty = int(clean_number(stock.total_buy_qty))
-            sell_qty = int(clean_number(stock.total_sell_qty))
-            buy_value = clean_number(stock.total_buy_value)
-            sell_value = clean_number(stock.total_sell_value)
-
-            if buy_qty > 0 and sell_qty > 0:
-                avg_buy_price = buy_value / buy_qty
-                buy_value_for_sold = avg_buy_price * sell_qty
-                total_realised_profit_loss += sell_value - buy_value_for_sold
-
-        # ---- DATE TIME ----
-        if stocks.exists():
-            first_stock = stocks.first()
-            date_time = first_stock.date_time_field or first_stock.format_date_time()
-        else:
-            date_time = ""
-
-        html_content = self._generate_html_report(
-            stocks,
-            total_buy_qty,
-            total_buy_value,
-            total_sell_qty,
-            total_sell_value,
-            total_realised_profit_loss,
-            portfolio_name,
-            description,
-            date_time,
+            stocks = StockTrade.objects.filter(portfolio_id__in=ids)
+
+        return StreamingHttpResponse(
+            self._iter_batch_html_report(portfolios, stocks),
+            content_type="text/html"
         )
 
-        return HttpResponse(html_content, content_type="text/html")
+    @action(detail=False, methods=['post'])
+    def publish_snapshot(self, request):
+        """
+        Render the download_report output once and publish it as an immutable,
+        precompressed snapshot file. Returns the snapshot's stable URL.
+        """
+        if not isinstance(request.data, dict):
+            return Response(
+                {'error': 'Request body must be an object'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        portfolio_id = request.data.get('portfolio_id') or request.query_params.get('portfolio_id')
+
+        report_scope = self._get_report_scope(portfolio_id)
+        if report_scope is None:
+            return Response(
+                {'error': f'Portfolio with ID {portfolio_id} not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        stocks, portfolio_name, description, scope = report_scope
+
+        fingerprint = report_fingerprint(scope, stocks.report_version(), portfolio_name, description)
+        html_content = get_or_render_report(
+            report_cache_key(scope, fingerprint),
+            lambda: self._generate_html_report(stocks, portfolio_name, description, scope),
+        )
+
+        snapshot = write_snapshot(scope, html_content)
+        snapshot['url'] = request.build_absolute_uri(snapshot['url'])
+        return Response(
+            {
+                'message': 'Report snapshot published successfully',
+                'data': snapshot
+            },
+            status=status.HTTP_201_CREATED
+        )
+
+    def _get_report_scope(self, portfolio_id):
+        """
+        Resolve the report scope for an optional portfolio_id.
 
+        Returns ``(stocks, portfolio_name, description, scope)``, or None when
+        the portfolio does not exist.
+        """
+        if portfolio_id:
+            # Filter stocks by specific portfolio
+            try:
+                portfolio = Portfolio.objects.get(id=portfolio_id)
+            except (Portfolio.DoesNotExist, TypeError, ValueError):
+                return None
+            stocks = StockTrade.objects.filter(portfolio=portfolio).order_by('symbol')
+            return stocks, portfolio.name, portfolio.description or "", portfolio.id
+
+        # Get all stocks
+        stocks = StockTrade.objects.all().order_by('symbol')
+        return stocks, "ALL PORTFOLIOS", "Combined report of all portfolios", 'all'
+
+    def _with_report_validators(self, response, etag):
+        """Attach the ETag and force clients to revalidate"""
+        response['ETag'] = etag
+        patch_cache_control(response, no_cache=True)
         return response
 
 # ... rest of StockTradeViewSet ...
     
-    def _generate_html_report(self, stocks, total_buy_qty, total_buy_value, 
-                            total_sell_qty, total_sell_value, total_realised_profit_loss,
-                            portfolio_name, description, date_time):
-        """Generate HTML report content"""
-        
-        html = f"""<!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Stock Portfolio Report</title>
-        <style>
-            * {{
-                margin: 0;
-                padding: 0;
-                box-sizing: border-box;
-            }}
-            body {{
-                font-family: Arial, sans-serif;
-                background-color: #f5f5f5;
-                width: 100%;
-                overflow-x: hidden;
-            }}
-            .container {{
-                width: 100%;
-                background-color: white;
-                padding: 15px;
-            }}
-            .header {{
-                margin-bottom: 20px;
-                padding-bottom: 15px;
-                
-            }}
-            .portfolio-title {{
-                font-size: 18px;
-                color: #331866;
-                margin-bottom: 8px;
-                font-weight: bold;
-                word-break: break-word;
-            }}
-            .portfolio-description {{
-                font-size: 14px;
-                color: #666;
-                margin-bottom: 5px;
-                line-height: 1.4;
-                word-break: break-word;
-            }}
-            .date {{
-                font-size: 12px;
-                color: #999;
-                text-align: right;
-            }}
-            table {{
-                width: 100%;
-                border-collapse: collapse;
-                table-layout: fixed;
-            }}
-            th {{
-                background-color: #331866;
-                color: white;
-                padding: 10px 4px;
-                text-align: center;
-                font-weight: bold;
-                border: 1px solid #444;
-                font-size: 10px;
-                word-wrap: break-word;
-                overflow-wrap: break-word;
-                line-height: 1.2;
-            }}
-            td {{
-                padding: 8px 4px;
-                text-align: right;
-                border: 1px solid #ddd;
-                font-size: 10px;
-                word-wrap: break-word;
-                overflow-wrap: break-word;
-                line-height: 1.2;
-            }}
-            .symbol {{
-                text-align: left;
-                font-weight: bold;
-                color: #0d6efd;
-            }}
-            tr:nth-child(even) {{
-                background-color: #f9f9f9;
-            }}
-            .total-row {{
-                background-color: #e8f4f8 !important;
-                font-weight: bold;
-                border-top: 2px solid #333;
-            }}
-            .total-row td {{
-                font-weight: bold;
-            }}
-            .positive {{
-                color: #28a745;
-            }}
-            .negative {{
-                color: #dc3545;
-            }}
-            .cell-color {{
-                text-align: center;
-                color: #3B3B3D;
-            }}
-            .ltp {{
-                color: #0d6efd;
-            }}
-            .unrealised {{
-                color: #28a745;
-            }}
-            
-            /* Set specific column widths for better fit */
-            th:nth-child(1), td:nth-child(1) {{ /* SYMBOL */
-                width: 8%;
-                min-width: 60px;
-                max-width: 80px;
-            }}
-            th:nth-child(2), td:nth-child(2) {{ /* TOTAL BUY QTY */
-                width: 6%;
-                min-width: 50px;
-            }}
-            th:nth-child(3), td:nth-child(3) {{ /* TOTAL BUY VALUE */
-                width: 9%;
-                min-width: 60px;
-            }}
-            th:nth-child(4), td:nth-child(4) {{ /* TOTAL SELL QTY */
-                width: 6%;
-                min-width: 50px;
-            }}
-            th:nth-child(5), td:nth-child(5) {{ /* TOTAL SELL VALUE */
-                width: 9%;
-                min-width: 60px;
-            }}
-            th:nth-child(6), td:nth-child(6) {{ /* BALANCE QTY */
-                width: 6%;
-                min-width: 50px;
-            }}
-            th:nth-child(7), td:nth-child(7) {{ /* ACQUISITION COST */
-                width: 6%;
-                min-width: 60px;
-            }}
-            th:nth-child(8), td:nth-child(8) {{ /* % HOLDING */
-                width: 5%;
-                min-width: 40px;
-            }}
-            th:nth-child(9), td:nth-child(9) {{ /* LTP */
-                width: 5%;
-                min-width: 40px;
-            }}
-            th:nth-child(10), td:nth-child(10) {{ /* CURRENT VALUE */
-                width: 7%;
-                min-width: 60px;
-            }}
-            th:nth-child(11), td:nth-child(11) {{ /* REALISED PROFIT/LOSS */
-                width: 8%;
-                min-width: 70px;
-            }}
-            th:nth-child(12), td:nth-child(12) {{ /* UN-REALISED PROFIT/LOSS */
-                width: 8%;
-                min-width: 70px;
-            }}
-            th:nth-child(13), td:nth-child(13) {{ /* TOTAL PROFIT/LOSS */
-                width: 7%;
-                min-width: 60px;
-            }}
-            th:nth-child(14), td:nth-child(14) {{ /* 52WK HIGH */
-                width: 6%;
-                min-width: 50px;
-            }}
-            th:nth-child(15), td:nth-child(15) {{ /* 52WK LOW */
-                width: 6%;
-                min-width: 50px;
-            }}
-            
-            /* Mobile-specific optimizations */
-            @media screen and (max-width: 768px) {{
-                body {{
-                    padding: 5px;
-                }}
-                .container {{
-                    padding: 8px;
-                }}
-                .portfolio-title {{
-                    font-size: 16px;
-                }}
-                table {{
-                    font-size: 9px;
-                }}
-                th, td {{
-                    padding: 6px 2px;
-                    font-size: 9px;
-                }}
-                th {{
-                    font-size: 9px;
-                    padding: 8px 2px;
-                }}
-                
-                /* Shorter column headers for mobile */
-                th:nth-child(11):before {{ content: "R P/L"; }}
-                th:nth-child(12):before {{ content: "UR P/L"; }}
-                th:nth-child(13):before {{ content: "T P/L"; }}
-                th:nth-child(14):before {{ content: "52H"; }}
-                th:nth-child(15):before {{ content: "52L"; }}
-                
-                th:nth-child(11) span,
-                th:nth-child(12) span,
-                th:nth-child(13) span,
-                th:nth-child(14) span,
-                th:nth-child(15) span {{
-                    display: none;
-                }}
-            }}
-            
-            /* Tablet optimizations */
-            @media screen and (min-width: 769px) and (max-width: 1024px) {{
-                body {{
-                    padding: 10px;
-                }}
-                .container {{
-                    padding: 15px;
-                }}
-                table {{
-                    font-size: 10px;
-                }}
-                th, td {{
-                    padding: 8px 3px;
-                    font-size: 10px;
-                }}
-            }}
-            
-            /* Desktop */
-            @media screen and (min-width: 1025px) {{
-                body {{
-                    padding: 20px;
-                }}
-                .container {{
-                    max-width: 1800px;
-                    margin: 0 auto;
-                    padding: 25px;
-                    box-shadow: 0 0 10px rgba(0,0,0,0.1);
-                }}
-                table {{
-                    font-size: 11px;
-                }}
-                th, td {{
-                    padding: 10px 5px;
-                    font-size: 11px;
-                }}
-                
-                /* Show full column headers on desktop */
-                th:nth-child(11):before,
-                th:nth-child(12):before,
-                th:nth-child(13):before,
-                th:nth-child(14):before,
-                th:nth-child(15):before {{
-                    display: none;
-                }}
-                th:nth-child(11) span,
-                th:nth-child(12) span,
-                th:nth-child(13) span,
-                th:nth-child(14) span,
-                th:nth-child(15) span {{
-                    display: inline;
-                }}
-            }}
-            
-            /* Very small phones */
-            @media screen and (max-width: 480px) {{
-                body {{
-                    padding: 2px;
-                }}
-                .container {{
-                    padding: 5px;
-                }}
-                table {{
-                    font-size: 8px;
-                }}
-                th, td {{
-                    padding: 4px 1px;
-                    font-size: 8px;
-                }}
-                th {{
-                    padding: 6px 1px;
-                }}
-                
-                /* Even shorter headers for very small screens */
-                th:nth-child(3):before {{ content: "B VAL"; }}
-                th:nth-child(5):before {{ content: "S VAL"; }}
-                th:nth-child(7):before {{ content: "ACQ"; }}
-                th:nth-child(10):before {{ content: "C VAL"; }}
-                
-                th:nth-child(3) span,
-                th:nth-child(5) span,
-                th:nth-child(7) span,
-                th:nth-child(10) span {{
-                    display: none;
-                }}
-            }}
-            
-            /* Print styles */
-            @media print {{
-                body {{
-                    background-color: white;
-                    padding: 0;
-                    margin: 0;
-                }}
-                .container {{
-                    box-shadow: none;
-                    padding: 10px;
-                    width: 100%;
-                }}
-                table {{
-                    width: 100%;
-                    font-size: 8pt;
-                }}
-                th, td {{
-                    padding: 4px 2px;
-                    border: 1px solid #000;
-                }}
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <div>CURRENT PORTFOLIO: {portfolio_name.upper()}</div>
-                <div style="text-align:right">{description}</div>
-            </div>
-            
-            <table>
-                <thead>
-                    <tr>
-                        <th>SYMBOL</th>
-                        <th>TOTAL BUY QTY</th>
-                        <th><span>TOTAL BUY VALUE</span></th>
-                        <th>TOTAL SELL QTY</th>
-                        <th><span>TOTAL SELL VALUE</span></th>
-                        <th>BALANCE QTY</th>
-                        <th><span>ACQUISITION COST</span></th>
-                        <th>% HOLDING</th>
-                        <th>LTP</th>
-                        <th><span>CURRENT VALUE</span></th>
-                        <th><span>REALISED PROFIT/ LOSS</span></th>
-                        <th><span>UN-REALISED PROFIT/ LOSS</span></th>
-                        <th><span>TOTAL PROFIT/ LOSS</span></th>
-                        <th><span>52WK HIGH</span></th>
-                        <th><span>52WK LOW</span></th>
-                    </tr>
-                </thead>
-                <tbody>"""
-        
-        # Add rows for each stock
-        for stock in stocks:
-            # Calculate realised profit/loss
-            buy_qty = to_int(stock.total_buy_qty)
-            sell_qty = to_int(stock.total_sell_qty)
-            buy_value = to_decimal(stock.total_buy_value)
-            sell_value = to_decimal(stock.total_sell_value)
-
-            if buy_qty > 0 and sell_qty > 0:
-                avg_buy_price = buy_value / buy_qty
-                buy_value_for_sold = avg_buy_price * sell_qty
-                realised_pl = sell_value - buy_value_for_sold
-            else:
-                realised_pl = Decimal('0.00')
-
-            unrealised_pl = Decimal('0.00')
-            total_pl = realised_pl + unrealised_pl
-            
-            profit_class = "positive" if total_pl >= 0 else "negative"
-            profit_sign = "+" if total_pl >= 0 else ""
-            
-            html += f"""
-                    <tr>
-                        <td class="symbol">{stock.symbol}</td>
-                        <td class="cell-color">{to_int(stock.total_buy_qty):,}</td>
-                        <td class="cell-color">{format_number(stock.total_buy_value)}</td>
-                        <td class="cell-color">{to_int(stock.total_sell_qty):,}</td>
-                        <td class="cell-color">{format_number(stock.total_sell_value)}</td>
-                        <td class="cell-color">{to_int(stock.balance_qty):,}</td>
-                        <td class="cell-color">{format_number(stock.acquisition_cost)}</td>
-                        <td class="cell-color">{format_number(stock.percent_holding)}</td>
-                        <td style="text-align:center" class="ltp">{format_number(stock.ltp)}</td>
-                        <td class="cell-color">{format_number(stock.current_value)}</td>
-                        <td class="cell-color">{profit_sign}{format_number(realised_pl)}</td>
-                        <td class="cell-color unrealised">{format_number(unrealised_pl)}</td>
-                        <td style="text-align:center" class="{profit_class}">{profit_sign}{format_number(total_pl)}</td>
-                        <td class="cell-color">{format_number(stock.wk_52_high)}</td>
-                        <td class="cell-color">{format_number(stock.wk_52_low)}</td>
-                    </tr>"""
-        
-        # Add total row
-        total_unrealised_pl = Decimal('0.00')
-        total_profit_loss = total_realised_profit_loss + total_unrealised_pl
-        profit_class = "positive" if total_profit_loss >= 0 else "negative"
-        profit_sign = "+" if total_profit_loss >= 0 else ""
-        
-        # Calculate total balance qty
-        total_balance_qty = total_buy_qty - total_sell_qty
-        
-        html += f"""
-                    <tr class="total-row">
-                        <td class="symbol">TOTAL</td>
-                        <td style="text-align: center">{total_buy_qty:,}</td>
-                        <td style="text-align: center">{format_number(total_buy_value)}</td>
-                        <td style="text-align: center">{total_sell_qty:,}</td>
-                        <td style="text-align: center">{format_number(total_sell_value)}</td>
-                        <td style="text-align: center">0</td>
-                        <td style="text-align: center">0.00</td>
-                        <td style="text-align: center">0.00</td>
-                        <td></td>
-                        <td style="text-align: center">0.00</td>
-                        <td style="text-align: center">{profit_sign}{format_number(total_realised_profit_loss)}</td>
-                        <td style="text-align: center" class="unrealised">0.00</td>
-                        <td style="text-align: center" class="{profit_class}">{profit_sign}{format_number(total_profit_loss)}</td>
-                        <td></td>
-                        <td></td>
-                    </tr>
-                </tbody>
-            </table>
-        </div>
-    </body>
-    </html>"""
-        
-        return html
+    def _generate_html_report(self, stocks, portfolio_name, description, scope='all'):
+        """Generate HTML report content as UTF-8 bytes"""
+        return b"".join(self._iter_html_report(stocks, portfolio_name, description, scope))
+
+    def _iter_html_report(self, stocks, portfolio_name, description, scope='all',
+                          chunk_size=REPORT_CHUNK_SIZE):
+        """
+        Yield the HTML report piece by piece: the static head, the table rows
+        in chunks of ``chunk_size``, then the totals footer.
+
+        Totals for a single portfolio are read from its PortfolioSummary row;
+        rows come from a single ``values(*REPORT_ROW_FIELDS)`` projection read
+        with ``iterator()``.
+        """
+        # ---- TOTALS ----
+        totals = None
+        if scope != 'all':
+            totals = PortfolioSummary.objects.report_totals([scope]).get(scope)
+        if totals is None:
+            # Combined report, or a portfolio without a summary row yet
+            totals = stocks.report_totals()
+
+        rows = stocks.values(*REPORT_ROW_FIELDS).iterator(chunk_size=chunk_size)
+        yield from iter_report(rows, totals, portfolio_name, description, chunk_size)
+
+    def _iter_batch_html_report(self, portfolios, stocks, chunk_size=REPORT_CHUNK_SIZE):
+        """
+        Yield one sectioned report covering several portfolios.
+
+        ``portfolios`` must be ordered by id. Subtotals come from the
+        PortfolioSummary rows (falling back to one GROUP BY portfolio_id query
+        for portfolios without a summary) and all rows from one query ordered
+        by (portfolio_id, symbol), which is split into sections as it streams.
+        """
+        portfolio_ids = [portfolio.id for portfolio in portfolios]
+        subtotals = PortfolioSummary.objects.report_totals(portfolio_ids)
+        missing = [pid for pid in portfolio_ids if pid not in subtotals]
+        if missing:
+            subtotals.update(
+                stocks.filter(portfolio_id__in=missing).report_totals_by_portfolio()
+            )
+        rows = (
+            stocks.order_by('portfolio_id', 'symbol')
+            .values('portfolio_id', *REPORT_ROW_FIELDS)
+            .iterator(chunk_size=chunk_size)
+        )
+
+        def sections():
+            groups = groupby(rows, key=itemgetter('portfolio_id'))
+            group_id, group_rows = next(groups, (None, None))
+            for portfolio in portfolios:
+                has_rows = group_id == portfolio.id
+                yield (
+                    portfolio.name,
+                    portfolio.description or "",
+                    group_rows if has_rows else (),
+                    subtotals.get(portfolio.id, EMPTY_REPORT_TOTALS),
+                )
+                # Advance only once the renderer has consumed this group.
+                if has_rows:
+                    group_id, group_rows = next(groups, (None, None))
+
+        yield from iter_batch_report(sections(), chunk_size)
+
+
 class PortfolioViewSet(viewsets.ModelViewSet):
     """
     ViewSet for managing portfolios
@@ -643,16 +803,49 @@ class PortfolioViewSet(viewsets.ModelViewSet):
     update/partial_update: Update a portfolio
     destroy: Delete a portfolio
     """
-    queryset = Portfolio.objects.all().order_by('-created_at')
+    queryset = Portfolio.objects.select_related('summary').order_by('-created_at', '-id')
     serializer_class = PortfolioSerializer
     permission_classes = [IsAuthenticated]
     lookup_field = 'id'
+    pagination_message = 'Portfolios retrieved'
 
     def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
+        try:
+            fields = select_fields(request.query_params, PortfolioSerializer.Meta.fields)
+        except FieldSelectionError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = self._sparse_queryset(fields)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True, fields=fields)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True, fields=fields)
         return Response({'message': 'Portfolios retrieved', 'count': len(serializer.data), 'data': serializer.data}, status=status.HTTP_200_OK)
 
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            fields = select_fields(request.query_params, PortfolioSerializer.Meta.fields)
+        except FieldSelectionError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        instance = get_object_or_404(self._sparse_queryset(fields), id=kwargs['id'])
+        self.check_object_permissions(request, instance)
+        return Response(self.get_serializer(instance, fields=fields).data)
+
+    def _sparse_queryset(self, fields):
+        """The list queryset loading only the columns behind ``fields``"""
+        queryset = self.filter_queryset(self.get_queryset())
+        if fields is None:
+            return queryset
+        if 'summary' not in fields:
+            queryset = queryset.select_related(None)
+        # created_at is the pagination key; 'summary' keeps its select_related
+        return queryset.only('created_at', *(name for name in fields if name in ('name', 'description', 'summary')))
+
+    @action(detail=False, methods=['get'])
+    def count(self, request):
+        count = self.filter_queryset(self.get_queryset()).order_by().count()
+        return Response({'message': 'Portfolio count retrieved', 'count': count}, status=status.HTTP_200_OK)
+
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -672,30 +865,93 @@ class PortfolioViewSet(viewsets.ModelViewSet):
         self.perform_destroy(instance)
         return Response({'message': 'Portfolio deleted'}, status=status.HTTP_200_OK)
 
+    @action(detail=True, methods=['get'], renderer_classes=[EventStreamRenderer])
+    def events(self, request, id=None):
+        """
+        Server-Sent Events stream of this portfolio's changes.
+
+        Starts with a ``snapshot`` event of every position and the summary,
+        then sends a ``positions`` event with the changed rows, removed ids
+        and updated summary whenever trades or prices change. Reconnecting
+        with ``Last-Event-ID`` (or ``?last_event_id=``) resumes after it.
+        """
+        portfolio = self.get_object()
+        last_event_id = (
+            request.headers.get('Last-Event-ID') or request.query_params.get('last_event_id')
+        )
+        if isinstance(request._request, ASGIRequest):
+            events = broadcaster.astream(portfolio.id, last_event_id)
+        else:
+            events = broadcaster.stream(portfolio.id, last_event_id)
+        response = StreamingHttpResponse(events, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Stop reverse proxies from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
     @action(detail=False, methods=['get'])
     def by_name(self, request):
+        """
+        Get a portfolio by name, ignoring case.
+
+        Repeated ``?names=`` (names may contain commas) instead returns every
+        matching portfolio from one query, with unmatched names under
+        ``missing``.
+        """
+        if 'names' in request.query_params:
+            return self._by_names(request)
         name = request.query_params.get('name', None)
         if not name:
             return Response({'error': 'name parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
-        try:
-            portfolio = Portfolio.objects.get(name__iexact=name)
-            serializer = self.get_serializer(portfolio)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except Portfolio.DoesNotExist:
-            return Response({'error': f'Portfolio with name {name} not found'}, status=status.HTTP_404_NOT_FOUND)
+        portfolio, error = self._get_by_name(name)
+        if error:
+            return error
+        serializer = self.get_serializer(portfolio)
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['delete'])
     def delete_by_name(self, request):
         name = request.query_params.get('name', None)
         if not name:
             return Response({'error': 'name parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
-        try:
-            portfolio = Portfolio.objects.get(name__iexact=name)
-            portfolio.delete()
-            return Response({'message': f'Portfolio {name} deleted'}, status=status.HTTP_200_OK)
-        except Portfolio.DoesNotExist:
-            return Response({'error': f'Portfolio with name {name} not found'}, status=status.HTTP_404_NOT_FOUND)
+        portfolio, error = self._get_by_name(name)
+        if error:
+            return error
+        portfolio.delete()
+        return Response({'message': f'Portfolio {name} deleted'}, status=status.HTTP_200_OK)
+
+    def _get_by_name(self, name):
+        """``(portfolio, None)`` for the one portfolio named ``name``, else ``(None, error response)``"""
+        matches = list(self.get_queryset().named(name)[:2])
+        if not matches:
+            return None, Response({'error': f'Portfolio with name {name} not found'}, status=status.HTTP_404_NOT_FOUND)
+        if len(matches) > 1:
+            return None, Response(
+                {'error': f'Several portfolios are named {name} ignoring case; use the id'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return matches[0], None
+
+    def _by_names(self, request):
+        """Portfolios named any of ``?names=``, one ``LOWER(name) IN (...)`` query"""
+        names = list(dict.fromkeys(name for name in request.query_params.getlist('names') if name))
+        if not names:
+            return Response({'error': 'names parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(names) > MAX_LOOKUP_KEYS:
+            return Response(
+                {'error': f'At most {MAX_LOOKUP_KEYS} names per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
+        portfolios = list(self.get_queryset().named(*names))
+        found = {portfolio.name.lower() for portfolio in portfolios}
+        serializer = self.get_serializer(portfolios, many=True)
+        return Response({
+            'message': 'Portfolios retrieved',
+            'count': len(serializer.data),
+            'data': serializer.data,
+            'missing': [name for name in names if name.lower() not in found],
+        }, status=status.HTTP_200_OK)
 
 def to_int(value):
     if value is None: